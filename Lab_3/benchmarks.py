@@ -0,0 +1,430 @@
+import os
+import json
+import math
+import time
+import random
+import argparse
+import contextlib
+from typing import Dict, List
+
+from main import (
+    Event, EventManager, PathPlanner, RescueRobotFSM, RobotActuators, RobotFleet, SensorSystem, SimulationClock,
+    State, STATE_ORDINALS, WorldModel, simulation_tick
+)
+
+
+@contextlib.contextmanager
+def quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def build_scalar_robot(rng: random.Random) -> tuple:
+    event_manager = EventManager()
+    actuators = RobotActuators(SimulationClock(), rng)
+    robot_fsm = RescueRobotFSM(event_manager, actuators)
+    sensors = SensorSystem(event_manager, rng)
+    return sensors, actuators, robot_fsm, event_manager
+
+
+def benchmark_scalar_fleet(robots: int, steps: int, seed: int = 1) -> Dict:
+    rng = random.Random(seed)
+    with quiet():
+        fleet = [build_scalar_robot(random.Random(rng.random())) for _ in range(robots)]
+        started = time.perf_counter()
+        for _ in range(steps):
+            for robot in fleet:
+                if robot[1].battery_level > 0:
+                    simulation_tick(*robot)
+        elapsed = time.perf_counter() - started
+    states = [robot[2].state for robot in fleet]
+    return {
+        "path": "scalar",
+        "robots": robots,
+        "steps": steps,
+        "seconds": round(elapsed, 3),
+        "robot_steps_per_sec": round(robots * steps / elapsed),
+        "alive": sum(1 for robot in fleet if robot[1].battery_level > 0),
+        "states": {state.value: states.count(state) for state in State}
+    }
+
+
+def benchmark_vectorized_fleet(robots: int, steps: int, seed: int = 1) -> Dict:
+    fleet = RobotFleet(robots, seed=seed)
+    started = time.perf_counter()
+    fleet.run(steps)
+    elapsed = time.perf_counter() - started
+    summary = fleet.summary()
+    return {
+        "path": "vectorized",
+        "robots": robots,
+        "steps": steps,
+        "seconds": round(elapsed, 3),
+        "robot_steps_per_sec": round(robots * steps / elapsed),
+        "alive": summary["alive"],
+        "states": summary["states"]
+    }
+
+
+CHI_SQUARE_CRITICAL_0_001 = {1: 10.83, 2: 13.82, 3: 16.27, 4: 18.47, 5: 20.52, 6: 22.46}
+
+
+def robot_outcome(battery: float, docked: bool, state: State, carrying: bool) -> str:
+    if battery <= 0:
+        return "dead"
+    outcome = "docked" if docked else state.value
+    return f"{outcome}+victim" if carrying else outcome
+
+
+def benchmark_fleet_agreement(robots: int, steps: int, seed: int = 1) -> Dict:
+    rng = random.Random(seed)
+    with quiet():
+        scalar = [build_scalar_robot(random.Random(rng.random())) for _ in range(robots)]
+        for _ in range(steps):
+            for robot in scalar:
+                if robot[1].battery_level > 0:
+                    simulation_tick(*robot)
+    fleet = RobotFleet(robots, seed=seed)
+    fleet.run(steps)
+    
+    states = list(State)
+    outcomes = {
+        "scalar": [robot_outcome(robot[1].battery_level, robot[2].docked(), robot[2].state, robot[1].carrying_victim)
+                   for robot in scalar],
+        "vectorized": [robot_outcome(battery, docked, states[ordinal], carrying) for battery, docked, ordinal, carrying
+                       in zip(fleet.battery.tolist(), fleet.docked().tolist(), fleet.state.tolist(),
+                              fleet.carrying.tolist())]
+    }
+    categories = sorted(set(outcomes["scalar"]) | set(outcomes["vectorized"]))
+    counts = {path: [labels.count(category) for category in categories] for path, labels in outcomes.items()}
+    
+    chi_square = 0.0
+    for scalar_count, fleet_count in zip(counts["scalar"], counts["vectorized"]):
+        expected = (scalar_count + fleet_count) / 2
+        chi_square += ((scalar_count - expected) ** 2 + (fleet_count - expected) ** 2) / expected
+    degrees = len(categories) - 1
+    critical = CHI_SQUARE_CRITICAL_0_001.get(degrees, 0.0)
+    return {
+        "robots": robots,
+        "steps": steps,
+        "seed": seed,
+        "outcomes": {path: dict(zip(categories, path_counts)) for path, path_counts in counts.items()},
+        "chi_square": round(chi_square, 2),
+        "degrees_of_freedom": degrees,
+        "critical_p001": critical,
+        "matches": degrees == 0 or chi_square <= critical
+    }
+
+
+def benchmark_event_storm(burst: int, managed: bool, ticks: int = 200, seed: int = 1) -> Dict:
+    rng = random.Random(seed)
+    hazard = {'type': 'fire', 'location': (0, 0), 'severity': 0.9}
+    victim = {'location': (2, 2), 'severity': 'critical', 'id': 101}
+    victim_delays = []
+    with quiet():
+        event_manager = EventManager(capacity=ticks * (burst + 1))
+        actuators = RobotActuators(SimulationClock(), rng)
+        robot_fsm = RescueRobotFSM(event_manager, actuators)
+        if not managed:
+            event_manager.priorities.clear()
+            event_manager.policies.clear()
+        
+        tick_start = [0]
+        event_manager.subscribe(
+            Event.VICTIM_DETECTED,
+            lambda data: data is victim and victim_delays.append(event_manager.stats['dispatched'] - tick_start[0] - 1)
+        )
+        started = time.perf_counter()
+        for _ in range(ticks):
+            robot_fsm.state = State.SEARCHING
+            for _ in range(burst):
+                event_manager.publish(Event.HAZARD_DETECTED, hazard)
+            event_manager.publish(Event.VICTIM_DETECTED, victim)
+            tick_start[0] = event_manager.stats['dispatched']
+            event_manager.process_events()
+        elapsed = time.perf_counter() - started
+    stats = event_manager.queue_stats()
+    return {
+        "dispatch": "managed" if managed else "fifo",
+        "burst": burst,
+        "ticks": ticks,
+        "us_per_tick": round(elapsed / ticks * 1e6, 1),
+        "dispatched": stats["dispatched"],
+        "coalesced": stats["coalesced"],
+        "dropped": stats["dropped"],
+        "max_depth": stats["max_depth"],
+        "victim_events_ahead_mean": round(sum(victim_delays) / len(victim_delays), 1),
+        "victim_events_ahead_max": max(victim_delays)
+    }
+
+
+def legacy_next_state(state: State, event: Event) -> State:
+    if event == Event.VICTIM_DETECTED:
+        if state == State.SEARCHING:
+            return State.RESCUING
+        elif state == State.IDLE:
+            return State.SEARCHING
+    elif event == Event.HAZARD_DETECTED:
+        if state not in [State.AVOIDING, State.RETURNING_HOME]:
+            return State.AVOIDING
+    elif event == Event.HAZARD_CLEARED:
+        return State.SEARCHING
+    elif event == Event.RESCUE_COMPLETE:
+        return State.RETURNING_HOME
+    elif event == Event.AT_BASE:
+        return State.IDLE
+    elif event == Event.BATTERY_LOW:
+        return State.RETURNING_HOME
+    return state
+
+
+def table_next_state(state: State, event: Event) -> State:
+    for guard, action, target in RescueRobotFSM.transitions.candidates(state, event):
+        return target if target is not None else state
+    return state
+
+
+def benchmark_fsm_dispatch(instances: int, events_per_instance: int = 20, seed: int = 1) -> List[Dict]:
+    import numpy as np
+    
+    rng = np.random.default_rng(seed)
+    events = list(Event)
+    stream = rng.integers(0, len(events), size=(events_per_instance, instances))
+    total = instances * events_per_instance
+    results = []
+    finals = {}
+    
+    for path, next_state in (("if-elif", legacy_next_state), ("table", table_next_state)):
+        current = [State.IDLE] * instances
+        started = time.perf_counter()
+        for row in stream.tolist():
+            for index, event_ordinal in enumerate(row):
+                current[index] = next_state(current[index], events[event_ordinal])
+        elapsed = time.perf_counter() - started
+        finals[path] = [STATE_ORDINALS[state] for state in current]
+        results.append({"path": path, "instances": instances, "transitions": total,
+                        "transitions_per_sec": round(total / elapsed)})
+    
+    current = np.full(instances, STATE_ORDINALS[State.IDLE], dtype=np.int8)
+    started = time.perf_counter()
+    for row in stream:
+        current = RescueRobotFSM.transitions.step(current, row)
+    elapsed = time.perf_counter() - started
+    finals["batched"] = current.tolist()
+    results.append({"path": "batched", "instances": instances, "transitions": total,
+                    "transitions_per_sec": round(total / elapsed)})
+    
+    for result in results:
+        result["matches_legacy"] = finals[result["path"]] == finals["if-elif"]
+    return results
+
+
+def brute_force_nearest(world: WorldModel, location: tuple) -> float:
+    x, y = location
+    return min(((entity.location[0] - x) ** 2 + (entity.location[1] - y) ** 2) ** 0.5
+               for entity in world.entities.values() if entity.kind == "victim" and not entity.rescued)
+
+
+def brute_force_within(world: WorldModel, location: tuple, radius: float) -> int:
+    x, y = location
+    return sum(1 for entity in world.entities.values() if entity.kind == "hazard"
+               and (entity.location[0] - x) ** 2 + (entity.location[1] - y) ** 2 <= radius * radius)
+
+
+def benchmark_world_queries(entities: int, queries: int = 2000, radius: float = 10.0, brute_force_queries: int = 5,
+                            density: float = 0.02, seed: int = 1) -> Dict:
+    rng = random.Random(seed)
+    extent = int((entities / density) ** 0.5 / 2)
+    world = WorldModel()
+    started = time.perf_counter()
+    world.populate(entities // 2, entities - entities // 2, extent, rng)
+    build_seconds = time.perf_counter() - started
+    
+    points = [(rng.randint(-extent, extent), rng.randint(-extent, extent)) for _ in range(queries)]
+    started = time.perf_counter()
+    nearest = [world.nearest_victim(point) for point in points]
+    nearest_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    hazard_counts = [len(world.hazards_within(point, radius)) for point in points]
+    within_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    for victim in nearest:
+        world.rescue(victim.entity_id)
+        world.add_victim(victim.location, victim.severity)
+    churn_seconds = time.perf_counter() - started
+    
+    checked = points[:brute_force_queries]
+    started = time.perf_counter()
+    exact_nearest = [brute_force_nearest(world, point) for point in checked]
+    exact_within = [brute_force_within(world, point, radius) for point in checked]
+    brute_seconds = (time.perf_counter() - started) / (2 * len(checked))
+    indexed_nearest = [world.victims.nearest(point)[0] for point in checked]
+    
+    return {
+        "entities": entities,
+        "extent": extent,
+        "build_inserts_per_sec": round(entities / build_seconds),
+        "nearest_us": round(nearest_seconds / queries * 1e6, 1),
+        "within_us": round(within_seconds / queries * 1e6, 1),
+        "mean_hazards_within": round(sum(hazard_counts) / queries, 2),
+        "rescue_and_insert_us": round(churn_seconds / queries * 1e6, 1),
+        "brute_force_query_us": round(brute_seconds * 1e6, 1),
+        "matches_brute_force": indexed_nearest == exact_nearest and exact_within == hazard_counts[:len(checked)]
+    }
+
+
+def straight_line_cells(start: tuple, goal: tuple) -> List[tuple]:
+    steps = max(abs(goal[0] - start[0]), abs(goal[1] - start[1]), 1)
+    return [(round(start[0] + (goal[0] - start[0]) * i / steps), round(start[1] + (goal[1] - start[1]) * i / steps))
+            for i in range(steps + 1)]
+
+
+def path_cost(planner: PathPlanner, path: List[tuple]) -> float:
+    return sum(math.dist(a, b) * (1 + (planner.cell_cost(a) + planner.cell_cost(b)) / 2) for a, b in zip(path, path[1:]))
+
+
+def benchmark_path_planning(hazards: int, extent: int = 60, sites: int = 20, trips: int = 400,
+                            hazard_changes: int = 20, checks: int = 200, seed: int = 1) -> Dict:
+    rng = random.Random(seed)
+    world = WorldModel()
+    world.populate(sites, hazards, extent, rng)
+    planner = PathPlanner(world)
+    base = (0, 0)
+    destinations = [entity.location for entity in world.entities.values() if entity.kind == "victim"]
+    
+    cold, warm = [], []
+    planned_exposure = straight_exposure = planned_length = straight_length = 0.0
+    for trip in range(trips):
+        site = destinations[trip % len(destinations)]
+        for start, goal in ((base, site), (site, base)):
+            misses = planner.stats["misses"]
+            started = time.perf_counter()
+            path = planner.plan(start, goal)
+            elapsed = time.perf_counter() - started
+            (cold if planner.stats["misses"] > misses else warm).append(elapsed)
+            if trip < len(destinations) and start == base:
+                line = straight_line_cells(start, goal)
+                planned_length += PathPlanner.path_length(path)
+                straight_length += PathPlanner.path_length(line)
+                planned_exposure += sum(planner.cell_cost(cell) for cell in path)
+                straight_exposure += sum(planner.cell_cost(cell) for cell in line)
+    
+    cached_before = 0
+    invalidated_before = planner.stats["invalidated"]
+    started = time.perf_counter()
+    for _ in range(hazard_changes):
+        cached_before += len(planner.path_cache)
+        location = (rng.randint(-extent, extent), rng.randint(-extent, extent))
+        world.add_hazard(location, "fire", rng.uniform(0.5, 1.0))
+        for site in destinations:
+            planner.plan(base, site)
+    change_seconds = time.perf_counter() - started
+    invalidated = planner.stats["invalidated"] - invalidated_before
+    
+    fresh = PathPlanner(world)
+    hits_before = planner.stats["hits"]
+    mismatches = 0
+    for _ in range(checks):
+        if rng.random() < 0.2:
+            placed = [key for key, entity in world.entities.items() if entity.kind == "hazard"]
+            if placed and rng.random() < 0.5:
+                world.remove(rng.choice(placed))
+            else:
+                location = (rng.randint(-extent, extent), rng.randint(-extent, extent))
+                world.add_hazard(location, "fire", rng.uniform(0.5, 1.0))
+        if rng.random() < 0.5:
+            start, goal = base, rng.choice(destinations)
+        else:
+            start = (rng.randint(-extent, extent), rng.randint(-extent, extent))
+            goal = rng.choice(destinations)
+        fresh.path_cache.clear()
+        fresh.cost_field.clear()
+        expected = path_cost(fresh, fresh.plan(start, goal))
+        if abs(path_cost(fresh, planner.plan(start, goal)) - expected) > 1e-6:
+            mismatches += 1
+    
+    return {
+        "hazards": hazards,
+        "sites": len(destinations),
+        "searches": len(cold),
+        "cache_hits": len(warm),
+        "search_ms": round(sum(cold) / len(cold) * 1000, 3),
+        "cache_hit_us": round(sum(warm) / max(1, len(warm)) * 1e6, 2),
+        "expanded_per_search": round(planner.stats["expanded"] / planner.stats["misses"]),
+        "path_vs_straight_length": round(planned_length / straight_length, 3),
+        "hazard_exposure_straight": round(straight_exposure, 1),
+        "hazard_exposure_planned": round(planned_exposure, 1),
+        "hazard_changes": hazard_changes,
+        "invalidated_per_change": round(invalidated / hazard_changes, 1),
+        "cached_paths_per_change": round(cached_before / hazard_changes, 1),
+        "replan_ms_per_change": round(change_seconds / hazard_changes * 1000, 2),
+        "cache_checks": checks,
+        "cache_check_hits": planner.stats["hits"] - hits_before,
+        "cache_matches_fresh": mismatches == 0,
+        "cache_mismatches": mismatches
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lab 3 rescue robot benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    
+    fleet = subparsers.add_parser("fleet", help="robot-steps per second: one FSM object per robot vs NumPy fleet arrays")
+    fleet.add_argument("--robots", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    fleet.add_argument("--steps", type=int, default=100)
+    fleet.add_argument("--scalar-limit", type=int, default=1000,
+                       help="skip the scalar path above this many robots")
+    fleet.add_argument("--seed", type=int, default=1)
+    
+    agreement = subparsers.add_parser("fleet-check", help="final state distribution: scalar FSM robots vs NumPy fleet")
+    agreement.add_argument("--robots", type=int, default=1000)
+    agreement.add_argument("--steps", type=int, nargs="+", default=[10, 50, 200])
+    agreement.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3])
+    
+    events = subparsers.add_parser("events", help="hazard storms: FIFO event queue vs priority dispatch with coalescing")
+    events.add_argument("--bursts", type=int, nargs="+", default=[1, 10, 100, 1000])
+    events.add_argument("--ticks", type=int, default=200)
+    
+    fsm = subparsers.add_parser("fsm", help="transitions per second: if/elif handlers vs compiled table vs batched table")
+    fsm.add_argument("--instances", type=int, nargs="+", default=[100, 10000, 100000])
+    fsm.add_argument("--events", type=int, default=20, help="events fed to each instance")
+    
+    world = subparsers.add_parser("world", help="nearest-victim and hazards-within-radius queries on the grid index")
+    world.add_argument("--entities", type=int, nargs="+", default=[10000, 100000, 1000000])
+    world.add_argument("--queries", type=int, default=2000)
+    world.add_argument("--radius", type=float, default=10.0)
+    
+    planner = subparsers.add_parser("planner", help="A* planning: cold searches vs LRU cache hits and hazard-change invalidation")
+    planner.add_argument("--hazards", type=int, nargs="+", default=[0, 100, 400])
+    planner.add_argument("--trips", type=int, default=400)
+    planner.add_argument("--sites", type=int, default=20)
+    planner.add_argument("--checks", type=int, default=200,
+                         help="random plans compared against a fresh, cache-free planner")
+    
+    args = parser.parse_args(argv)
+    
+    if args.benchmark == "fleet":
+        results = []
+        for robots in args.robots:
+            if robots <= args.scalar_limit:
+                results.append(benchmark_scalar_fleet(robots, args.steps, args.seed))
+            results.append(benchmark_vectorized_fleet(robots, args.steps, args.seed))
+    elif args.benchmark == "fleet-check":
+        results = [benchmark_fleet_agreement(args.robots, steps, seed) for seed in args.seeds for steps in args.steps]
+    elif args.benchmark == "events":
+        results = [benchmark_event_storm(burst, managed, args.ticks) for burst in args.bursts for managed in (False, True)]
+    elif args.benchmark == "fsm":
+        results = [result for instances in args.instances for result in benchmark_fsm_dispatch(instances, args.events)]
+    elif args.benchmark == "world":
+        results = [benchmark_world_queries(entities, args.queries, args.radius) for entities in args.entities]
+    elif args.benchmark == "planner":
+        results = [benchmark_path_planning(hazards, sites=args.sites, trips=args.trips, checks=args.checks)
+                   for hazards in args.hazards]
+    
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
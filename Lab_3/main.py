@@ -3,12 +3,20 @@ Lab 3: Goals, Events, and Reactive Behavior
 Rescue Robot Simulation with Finite State Machine
 """
 
+import math
 import time
+import heapq
 import random
+import argparse
 from enum import Enum
 from typing import Dict, List, Optional
 from dataclasses import dataclass
-from collections import deque
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 
@@ -30,6 +38,9 @@ class Event(Enum):
     SEARCH_TIMEOUT = "search_timeout"
     BATTERY_LOW = "battery_low"
 
+STATE_ORDINALS = {state: ordinal for ordinal, state in enumerate(State)}
+EVENT_ORDINALS = {event: ordinal for ordinal, event in enumerate(Event)}
+
 @dataclass
 class SensorReading:
     """Represents a sensor reading"""
@@ -49,13 +60,104 @@ class Goal:
 
 
 
+class SimulationClock:
+    """Virtual clock: sleeping advances simulated time instantly"""
+    
+    def __init__(self, start: float = 0.0):
+        self.current_time = start
+    
+    def now(self) -> float:
+        """Current simulated time in seconds"""
+        return self.current_time
+    
+    def sleep(self, seconds: float):
+        """Let simulated time pass without blocking"""
+        if seconds > 0:
+            self.current_time += seconds
+    
+    def advance_to(self, timestamp: float):
+        """Jump forward to a scheduled event time"""
+        if timestamp > self.current_time:
+            self.current_time = timestamp
+
+class RealTimeClock(SimulationClock):
+    """Wall-clock time, optionally sped up, for live demos"""
+    
+    def __init__(self, speed: float = 1.0):
+        super().__init__()
+        self.speed = speed
+        self.origin = time.monotonic()
+    
+    def now(self) -> float:
+        """Scaled seconds since the clock was created"""
+        return (time.monotonic() - self.origin) * self.speed
+    
+    def sleep(self, seconds: float):
+        """Block for the scaled duration"""
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+    
+    def advance_to(self, timestamp: float):
+        """Block until the scheduled event time"""
+        self.sleep(timestamp - self.now())
+
+class DiscreteEventScheduler:
+    """Runs timed callbacks in simulated-time order"""
+    
+    def __init__(self, clock: SimulationClock):
+        self.clock = clock
+        self.timeline = []
+        self.sequence = 0
+        self.processed = 0
+        self.running = True
+    
+    def schedule(self, delay: float, callback, *args):
+        """Run callback after delay seconds of simulated time"""
+        self.schedule_at(self.clock.now() + delay, callback, *args)
+    
+    def schedule_at(self, timestamp: float, callback, *args):
+        """Run callback at an absolute simulated time"""
+        heapq.heappush(self.timeline, (timestamp, self.sequence, callback, args))
+        self.sequence += 1
+    
+    def stop(self):
+        """Stop after the callback currently running"""
+        self.running = False
+    
+    def run(self, until: Optional[float] = None) -> int:
+        """Process events in time order; returns how many ran"""
+        processed = 0
+        while self.timeline and self.running:
+            timestamp, _, callback, args = self.timeline[0]
+            if until is not None and timestamp > until:
+                break
+            heapq.heappop(self.timeline)
+            self.clock.advance_to(timestamp)
+            callback(*args)
+            processed += 1
+        self.processed += processed
+        return processed
+
+
+
+EVENT_POLICIES = ("queue", "coalesce", "drop")
+
 class EventManager:
-    """Manages event queue and dispatches events to subscribers"""
+    """Bounded, priority-ordered event queue with run-to-completion dispatch"""
     
-    def __init__(self):
+    def __init__(self, capacity: int = 256):
         self.subscribers = {}
-        self.event_queue = deque()
+        self.event_queue = []
+        self.capacity = capacity
+        self.priorities = {}
+        self.policies = {}
+        self.pending = {}
+        self.depth = 0
+        self.sequence = 0
+        self.dispatching = False
         self.running = True
+        self.stats = {'published': 0, 'dispatched': 0, 'coalesced': 0, 'dropped': 0, 'max_depth': 0}
+        self.dropped_by_event = {}
     
     def subscribe(self, event_type: Event, callback):
         """Subscribe to a specific event type"""
@@ -63,53 +165,465 @@ class EventManager:
             self.subscribers[event_type] = []
         self.subscribers[event_type].append(callback)
     
+    def set_priority(self, event_type: Event, priority: int):
+        """Dispatch event_type ahead of lower-priority events"""
+        self.priorities[event_type] = priority
+    
+    def set_policy(self, event_type: Event, policy: str, key=None):
+        """Choose how repeats of event_type are queued; only repeats with equal key(data) count as repeats"""
+        if policy not in EVENT_POLICIES:
+            raise ValueError(f"Unknown event policy {policy!r}; expected one of {EVENT_POLICIES}")
+        self.policies[event_type] = (policy, key)
+    
+    def _drop(self, event: Event, reason: str):
+        """Count and log an event that will never be dispatched"""
+        self.stats['dropped'] += 1
+        self.dropped_by_event[event] = self.dropped_by_event.get(event, 0) + 1
+        print(f"[EVENT] {event.value} dropped ({reason})")
+    
+    def _evict_for(self, priority: int) -> bool:
+        """Make room by discarding the newest queued event of the lowest priority below priority"""
+        victim = None
+        for entry in self.event_queue:
+            if entry[2] is not None and -entry[0] < priority:
+                if victim is None or (entry[0], entry[1]) > (victim[0], victim[1]):
+                    victim = entry
+        if victim is None:
+            return False
+        event = victim[2]
+        if self.pending.get(victim[4]) is victim:
+            del self.pending[victim[4]]
+        victim[2] = None
+        self.depth -= 1
+        self._drop(event, "evicted")
+        return True
+    
     def publish(self, event: Event, data=None):
-        """Publish an event to the queue"""
-        self.event_queue.append((event, data))
+        """Publish an event to the queue, applying its coalescing policy"""
+        self.stats['published'] += 1
+        policy, key = self.policies.get(event, ("queue", None))
+        pending_key = (event, key(data)) if key is not None else event
+        queued = self.pending.get(pending_key)
+        if queued is not None:
+            if policy == "coalesce":
+                queued[3] = data
+                self.stats['coalesced'] += 1
+                print(f"[EVENT] {event.value} coalesced")
+                return
+            if policy == "drop":
+                self._drop(event, "duplicate")
+                return
+        
+        priority = self.priorities.get(event, 0)
+        if self.depth >= self.capacity and not self._evict_for(priority):
+            self._drop(event, "queue full")
+            return
+        
+        entry = [-priority, self.sequence, event, data, pending_key]
+        self.sequence += 1
+        heapq.heappush(self.event_queue, entry)
+        if policy != "queue":
+            self.pending[pending_key] = entry
+        self.depth += 1
+        self.stats['max_depth'] = max(self.stats['max_depth'], self.depth)
         print(f"[EVENT] {event.value} published")
     
     def process_events(self):
-        """Process all events in the queue"""
-        while self.event_queue and self.running:
-            event, data = self.event_queue.popleft()
-            if event in self.subscribers:
-                for callback in self.subscribers[event]:
+        """Dispatch queued events, highest priority first, each to completion"""
+        if self.dispatching:
+            return
+        self.dispatching = True
+        try:
+            while self.event_queue and self.running:
+                entry = heapq.heappop(self.event_queue)
+                event, data = entry[2], entry[3]
+                if event is None:
+                    continue
+                if self.pending.get(entry[4]) is entry:
+                    del self.pending[entry[4]]
+                self.depth -= 1
+                self.stats['dispatched'] += 1
+                for callback in self.subscribers.get(event, ()):
                     callback(data)
+        finally:
+            self.dispatching = False
+    
+    def queue_stats(self) -> Dict:
+        """Queue depth and drop counters"""
+        return dict(self.stats, depth=self.depth,
+                    dropped_by_event={event.value: count for event, count in self.dropped_by_event.items()})
+
+
+
+@dataclass
+class WorldEntity:
+    """A victim or hazard placed in the persistent world"""
+    entity_id: int
+    kind: str
+    location: tuple
+    severity: object
+    hazard_type: Optional[str] = None
+    rescued: bool = False
+    
+    def event_data(self) -> Dict:
+        """Payload published with VICTIM_DETECTED / HAZARD_DETECTED"""
+        if self.kind == 'hazard':
+            return {'id': self.entity_id, 'type': self.hazard_type, 'location': self.location, 'severity': self.severity}
+        return {'id': self.entity_id, 'location': self.location, 'severity': self.severity}
+
+class SpatialGrid:
+    """Uniform-grid point index with incremental insert/remove, radius and nearest-neighbour queries"""
+    
+    def __init__(self, cell_size: float = 8.0):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.locations = {}
+        self.bounds = None
+    
+    def __len__(self) -> int:
+        return len(self.locations)
+    
+    def _cell(self, location: tuple) -> tuple:
+        return (math.floor(location[0] / self.cell_size), math.floor(location[1] / self.cell_size))
+    
+    def insert(self, key: int, location: tuple):
+        """Add (or move) key to location"""
+        if key in self.locations:
+            self.remove(key)
+        cell = self._cell(location)
+        self.cells.setdefault(cell, {})[key] = location
+        self.locations[key] = location
+        if self.bounds is None:
+            self.bounds = [cell[0], cell[1], cell[0], cell[1]]
+        else:
+            self.bounds[0] = min(self.bounds[0], cell[0])
+            self.bounds[1] = min(self.bounds[1], cell[1])
+            self.bounds[2] = max(self.bounds[2], cell[0])
+            self.bounds[3] = max(self.bounds[3], cell[1])
+    
+    def remove(self, key: int) -> bool:
+        """Drop key from the index; False if it was not indexed"""
+        location = self.locations.pop(key, None)
+        if location is None:
+            return False
+        cell = self._cell(location)
+        bucket = self.cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self.cells[cell]
+        return True
+    
+    def within(self, location: tuple, radius: float) -> List[tuple]:
+        """(distance, key) pairs within radius of location, nearest first"""
+        x, y = location
+        low_x, low_y = self._cell((x - radius, y - radius))
+        high_x, high_y = self._cell((x + radius, y + radius))
+        limit = radius * radius
+        found = []
+        for cell_x in range(low_x, high_x + 1):
+            for cell_y in range(low_y, high_y + 1):
+                bucket = self.cells.get((cell_x, cell_y))
+                if bucket:
+                    for key, (px, py) in bucket.items():
+                        distance = (px - x) ** 2 + (py - y) ** 2
+                        if distance <= limit:
+                            found.append((math.sqrt(distance), key))
+        found.sort()
+        return found
+    
+    def nearest(self, location: tuple, max_distance: Optional[float] = None) -> Optional[tuple]:
+        """(distance, key) of the closest indexed point, searching outward ring by ring"""
+        if not self.locations:
+            return None
+        x, y = location
+        center_x, center_y = self._cell(location)
+        min_x, min_y, max_x, max_y = self.bounds
+        last_ring = max(center_x - min_x, max_x - center_x, center_y - min_y, max_y - center_y)
+        if max_distance is not None:
+            last_ring = min(last_ring, math.ceil(max_distance / self.cell_size) + 1)
+        
+        best_distance, best_key = math.inf, None
+        for ring in range(last_ring + 1):
+            for cell in self._ring(center_x, center_y, ring):
+                bucket = self.cells.get(cell)
+                if bucket:
+                    for key, (px, py) in bucket.items():
+                        distance = (px - x) ** 2 + (py - y) ** 2
+                        if distance < best_distance:
+                            best_distance, best_key = distance, key
+            if best_key is not None and math.sqrt(best_distance) <= ring * self.cell_size:
+                break
+        
+        if best_key is None or (max_distance is not None and best_distance > max_distance * max_distance):
+            return None
+        return math.sqrt(best_distance), best_key
+    
+    @staticmethod
+    def _ring(center_x: int, center_y: int, ring: int):
+        """Cells at Chebyshev distance ring from the center cell"""
+        if ring == 0:
+            yield center_x, center_y
+            return
+        for offset in range(-ring, ring + 1):
+            yield center_x + offset, center_y - ring
+            yield center_x + offset, center_y + ring
+        for offset in range(-ring + 1, ring):
+            yield center_x - ring, center_y + offset
+            yield center_x + ring, center_y + offset
+
+class WorldModel:
+    """Persistent victims and hazards, indexed for proximity queries"""
+    
+    HAZARD_TYPES = ['fire', 'toxic_gas', 'structural_damage']
+    SEVERITIES = ['minor', 'moderate', 'critical']
+    
+    def __init__(self, cell_size: float = 8.0):
+        self.entities = {}
+        self.victims = SpatialGrid(cell_size)
+        self.hazards = SpatialGrid(cell_size)
+        self.next_id = 100
+        self.rescued = 0
+        self.hazard_listeners = []
+    
+    def _add(self, kind: str, location: tuple, severity, hazard_type: Optional[str] = None) -> WorldEntity:
+        entity = WorldEntity(self.next_id, kind, location, severity, hazard_type)
+        self.next_id += 1
+        self.entities[entity.entity_id] = entity
+        (self.hazards if kind == 'hazard' else self.victims).insert(entity.entity_id, location)
+        if kind == 'hazard':
+            self._hazard_changed(entity)
+        return entity
+    
+    def _hazard_changed(self, hazard: WorldEntity):
+        for listener in self.hazard_listeners:
+            listener(hazard)
+    
+    def add_victim(self, location: tuple, severity: str) -> WorldEntity:
+        """Place an unrescued victim"""
+        return self._add('victim', location, severity)
+    
+    def add_hazard(self, location: tuple, hazard_type: str, severity: float) -> WorldEntity:
+        """Place a hazard"""
+        return self._add('hazard', location, severity, hazard_type)
+    
+    def remove(self, entity_id: int) -> Optional[WorldEntity]:
+        """Delete an entity from the world and its index"""
+        entity = self.entities.pop(entity_id, None)
+        if entity is not None:
+            (self.hazards if entity.kind == 'hazard' else self.victims).remove(entity_id)
+            if entity.kind == 'hazard':
+                self._hazard_changed(entity)
+        return entity
+    
+    def rescue(self, victim_id: int) -> bool:
+        """Mark a victim rescued so nearest-victim queries skip it"""
+        entity = self.entities.get(victim_id)
+        if entity is None or entity.kind != 'victim' or entity.rescued:
+            return False
+        entity.rescued = True
+        self.victims.remove(victim_id)
+        self.rescued += 1
+        return True
+    
+    def nearest_victim(self, location: tuple, max_distance: Optional[float] = None) -> Optional[WorldEntity]:
+        """Closest unrescued victim, optionally within max_distance"""
+        hit = self.victims.nearest(location, max_distance)
+        return self.entities[hit[1]] if hit else None
+    
+    def hazards_within(self, location: tuple, radius: float) -> List[WorldEntity]:
+        """Hazards within radius, nearest first"""
+        return [self.entities[key] for _, key in self.hazards.within(location, radius)]
+    
+    def populate(self, victims: int, hazards: int, extent: int, rng: random.Random):
+        """Scatter victims and hazards over the square [-extent, extent] around base"""
+        for _ in range(victims):
+            location = (rng.randint(-extent, extent), rng.randint(-extent, extent))
+            self.add_victim(location, rng.choice(self.SEVERITIES))
+        for _ in range(hazards):
+            location = (rng.randint(-extent, extent), rng.randint(-extent, extent))
+            self.add_hazard(location, rng.choice(self.HAZARD_TYPES), rng.uniform(0.5, 1.0))
+
+
+
+class PathPlanner:
+    """A* over integer grid cells with hazard cost fields and an LRU path cache"""
+    
+    NEIGHBOURS = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+                  (1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)), (-1, 1, math.sqrt(2)), (-1, -1, math.sqrt(2))]
+    
+    def __init__(self, world: WorldModel, hazard_radius: int = 3, hazard_penalty: float = 20.0,
+                 cache_size: int = 256):
+        self.world = world
+        self.hazard_radius = hazard_radius
+        self.hazard_penalty = hazard_penalty
+        self.cache_size = cache_size
+        self.cost_field = {}
+        self.path_cache = OrderedDict()
+        self.hazard_version = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evicted': 0, 'invalidated': 0, 'expanded': 0}
+        world.hazard_listeners.append(self.on_hazard_changed)
+    
+    @staticmethod
+    def cell_of(location: tuple) -> tuple:
+        return (int(round(location[0])), int(round(location[1])))
+    
+    def cell_cost(self, cell: tuple) -> float:
+        """Extra cost per unit travelled through cell, from hazards within hazard_radius"""
+        cost = self.cost_field.get(cell)
+        if cost is None:
+            cost = 0.0
+            for hazard in self.world.hazards_within(cell, self.hazard_radius):
+                distance = math.dist(cell, hazard.location)
+                cost += self.hazard_penalty * hazard.severity * (1 - distance / (self.hazard_radius + 1))
+            self.cost_field[cell] = cost
+        return cost
+    
+    def on_hazard_changed(self, hazard: WorldEntity):
+        """Forget cost cells and cached paths whose search area the hazard can reach"""
+        x, y = self.cell_of(hazard.location)
+        reach = self.hazard_radius
+        for cell_x in range(x - reach, x + reach + 1):
+            for cell_y in range(y - reach, y + reach + 1):
+                self.cost_field.pop((cell_x, cell_y), None)
+        
+        self.hazard_version += 1
+        survivors = OrderedDict()
+        for (start, goal, _), (path, bounds) in self.path_cache.items():
+            if bounds[0] - reach <= x <= bounds[2] + reach and bounds[1] - reach <= y <= bounds[3] + reach:
+                self.stats['invalidated'] += 1
+            else:
+                survivors[(start, goal, self.hazard_version)] = (path, bounds)
+        self.path_cache = survivors
+    
+    def _remember(self, start: tuple, goal: tuple, path: List[tuple], bounds: tuple):
+        self.path_cache[(start, goal, self.hazard_version)] = (path, bounds)
+        self.path_cache.move_to_end((start, goal, self.hazard_version))
+        while len(self.path_cache) > self.cache_size:
+            self.path_cache.popitem(last=False)
+            self.stats['evicted'] += 1
+    
+    def plan(self, start_location: tuple, goal_location: tuple) -> List[tuple]:
+        """Cheapest cell path from start to goal, inclusive of both ends"""
+        start, goal = self.cell_of(start_location), self.cell_of(goal_location)
+        key = (start, goal, self.hazard_version)
+        cached = self.path_cache.get(key)
+        if cached is not None:
+            self.path_cache.move_to_end(key)
+            self.stats['hits'] += 1
+            return cached[0]
+        
+        self.stats['misses'] += 1
+        path, bounds = self._search(start, goal)
+        self._remember(start, goal, path, bounds)
+        self._remember(goal, start, path[::-1], bounds)
+        return path
+    
+    @staticmethod
+    def _heuristic(cell: tuple, goal: tuple) -> float:
+        """Octile distance: exact on an empty grid, never above the true cost"""
+        dx, dy = abs(cell[0] - goal[0]), abs(cell[1] - goal[1])
+        return max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)
+    
+    def _search(self, start: tuple, goal: tuple) -> tuple:
+        """A* search; returns the path and the bounding box of every cell it generated"""
+        frontier = [(self._heuristic(start, goal), 0.0, start)]
+        best = {start: 0.0}
+        came_from = {start: None}
+        min_x = max_x = start[0]
+        min_y = max_y = start[1]
+        
+        while frontier:
+            _, cost, cell = heapq.heappop(frontier)
+            if cell == goal:
+                break
+            if cost > best[cell]:
+                continue
+            self.stats['expanded'] += 1
+            
+            cell_cost = self.cell_cost(cell)
+            for dx, dy, length in self.NEIGHBOURS:
+                neighbour = (cell[0] + dx, cell[1] + dy)
+                step = cost + length * (1 + (cell_cost + self.cell_cost(neighbour)) / 2)
+                if step < best.get(neighbour, math.inf):
+                    best[neighbour] = step
+                    came_from[neighbour] = cell
+                    heapq.heappush(frontier, (step + self._heuristic(neighbour, goal), step, neighbour))
+                    min_x, max_x = min(min_x, neighbour[0]), max(max_x, neighbour[0])
+                    min_y, max_y = min(min_y, neighbour[1]), max(max_y, neighbour[1])
+        
+        path = [goal]
+        while came_from[path[-1]] is not None:
+            path.append(came_from[path[-1]])
+        path.reverse()
+        return path, (min_x, min_y, max_x, max_y)
+    
+    def safe_cell_near(self, location: tuple, max_reach: int = 10) -> Optional[tuple]:
+        """Closest cell with no hazard cost, searching outward ring by ring"""
+        x, y = self.cell_of(location)
+        for ring in range(max_reach + 1):
+            candidates = [cell for cell in SpatialGrid._ring(x, y, ring) if self.cell_cost(cell) == 0]
+            if candidates:
+                return min(candidates, key=lambda cell: (math.dist(cell, (x, y)), cell))
+        return None
+    
+    @staticmethod
+    def path_length(path: List[tuple]) -> float:
+        return sum(math.dist(a, b) for a, b in zip(path, path[1:]))
 
 
 
 class SensorSystem:
     """Simulates sensors that detect victims and hazards"""
     
-    def __init__(self, event_manager: EventManager):
+    VICTIM_RANGE = 5
+    HAZARD_RANGE = 3
+    
+    def __init__(self, event_manager: EventManager, rng: Optional[random.Random] = None,
+                 world: Optional[WorldModel] = None):
         self.event_manager = event_manager
+        self.rng = rng or random.Random()
+        self.world = world
         self.scanning = True
         self.current_location = (0, 0)
         
     def scan_environment(self):
         """Simulate scanning the environment"""
         
-        detection = random.random()
+        if self.world is not None:
+            self.scan_world()
+            return
+        
+        detection = self.rng.random()
         
         if detection < 0.3:  
             victim_data = {
                 'location': (
-                    self.current_location[0] + random.randint(-5, 5),
-                    self.current_location[1] + random.randint(-5, 5)
+                    self.current_location[0] + self.rng.randint(-5, 5),
+                    self.current_location[1] + self.rng.randint(-5, 5)
                 ),
-                'severity': random.choice(['minor', 'moderate', 'critical']),
-                'id': random.randint(100, 999)
+                'severity': self.rng.choice(['minor', 'moderate', 'critical']),
+                'id': self.rng.randint(100, 999)
             }
             self.event_manager.publish(Event.VICTIM_DETECTED, victim_data)
             
         elif detection < 0.5:  
             hazard_data = {
-                'type': random.choice(['fire', 'toxic_gas', 'structural_damage']),
+                'type': self.rng.choice(['fire', 'toxic_gas', 'structural_damage']),
                 'location': self.current_location,
-                'severity': random.uniform(0.5, 1.0)
+                'severity': self.rng.uniform(0.5, 1.0)
             }
             self.event_manager.publish(Event.HAZARD_DETECTED, hazard_data)
     
+    def scan_world(self):
+        """Report the nearest hazard and unrescued victim actually in sensor range"""
+        hazards = self.world.hazards_within(self.current_location, self.HAZARD_RANGE)
+        if hazards:
+            self.event_manager.publish(Event.HAZARD_DETECTED, hazards[0].event_data())
+        
+        victim = self.world.nearest_victim(self.current_location, self.VICTIM_RANGE)
+        if victim is not None:
+            self.event_manager.publish(Event.VICTIM_DETECTED, victim.event_data())
+    
     def update_location(self, new_location):
         """Update robot's current location"""
         self.current_location = new_location
@@ -119,25 +633,58 @@ class SensorSystem:
 class RobotActuators:
     """Controls robot movements and actions"""
     
-    def __init__(self):
+    HOME = (0, 0)
+    LOW_BATTERY = 20
+    FULL_BATTERY = 100
+    CHARGE_RATE = 10
+    
+    def __init__(self, clock: Optional[SimulationClock] = None, rng: Optional[random.Random] = None,
+                 planner: Optional[PathPlanner] = None):
+        self.clock = clock or RealTimeClock()
+        self.rng = rng or random.Random()
+        self.planner = planner
         self.position = (0, 0)
         self.battery_level = 100
         self.carrying_victim = False
+        self.charging = False
         
     def move_to(self, target_location):
-        """Move robot to target location"""
-        distance = ((target_location[0] - self.position[0]) ** 2 + 
-                   (target_location[1] - self.position[1]) ** 2) ** 0.5
-        time.sleep(distance * 0.1)  
+        """Move robot to target location, along a planned path when a planner is attached"""
+        if self.planner is not None:
+            path = self.planner.plan(self.position, target_location)
+            distance = PathPlanner.path_length(path)
+            route = f" along a {len(path) - 1}-cell path"
+        else:
+            distance = ((target_location[0] - self.position[0]) ** 2 + 
+                       (target_location[1] - self.position[1]) ** 2) ** 0.5
+            route = ""
+        self.clock.sleep(distance * 0.1)  
         self.position = target_location
         self.battery_level -= distance * 0.5
-        print(f"[ACTUATOR] Moved to {target_location}, battery: {self.battery_level:.1f}%")
+        print(f"[ACTUATOR] Moved to {target_location}{route}, battery: {self.battery_level:.1f}%")
         return self.position
     
+    def move_toward(self, target_location, max_distance: float):
+        """Advance at most max_distance along the route to target_location"""
+        if self.planner is not None:
+            waypoint, travelled = self.position, 0.0
+            path = self.planner.plan(self.position, target_location)
+            for start, end in zip(path, path[1:]):
+                travelled += math.dist(start, end)
+                if travelled > max_distance:
+                    break
+                waypoint = end
+        else:
+            distance = math.dist(self.position, target_location)
+            fraction = min(1.0, max_distance / distance) if distance else 1.0
+            waypoint = (round(self.position[0] + (target_location[0] - self.position[0]) * fraction),
+                        round(self.position[1] + (target_location[1] - self.position[1]) * fraction))
+        return self.move_to(waypoint)
+    
     def perform_rescue(self, victim_data):
         """Perform rescue operation"""
         print(f"[ACTUATOR] Performing rescue on victim {victim_data.get('id', 'unknown')}")
-        time.sleep(2)  
+        self.clock.sleep(2)  
         self.battery_level -= 10
         self.carrying_victim = True
         return True
@@ -145,33 +692,141 @@ class RobotActuators:
     def return_to_base(self):
         """Return to home base"""
         print("[ACTUATOR] Returning to base")
-        home = (0, 0)
-        return self.move_to(home)
+        return self.move_to(self.HOME)
+    
+    def at_base(self) -> bool:
+        """Whether the robot is standing on its home base"""
+        return tuple(self.position) == self.HOME
+    
+    def recharge(self):
+        """One tick on the charger; charging stays on until the battery is full"""
+        self.battery_level = min(self.FULL_BATTERY, self.battery_level + self.CHARGE_RATE)
+        self.charging = self.battery_level < self.FULL_BATTERY
+        print(f"[ACTUATOR] Charging at base, battery: {self.battery_level:.1f}%")
     
     def avoid_hazard(self, hazard_data):
         """Take evasive action from hazard"""
         print(f"[ACTUATOR] Avoiding {hazard_data.get('type', 'unknown')} hazard")
         
-        escape_vector = (random.randint(-10, 10), random.randint(-10, 10))
+        if self.planner is not None:
+            safe_cell = self.planner.safe_cell_near(self.position)
+            if safe_cell is not None:
+                return self.move_to(safe_cell)
+        
+        escape_vector = (self.rng.randint(-10, 10), self.rng.randint(-10, 10))
         new_pos = (self.position[0] + escape_vector[0], 
                   self.position[1] + escape_vector[1])
         return self.move_to(new_pos)
 
 
 
+def require_numpy(feature: str):
+    """Fail with an install hint when a NumPy-backed feature is used without NumPy"""
+    if np is None:
+        raise ImportError(f"{feature} needs NumPy; install it with 'pip install numpy'")
+
+
+
+class TransitionTable:
+    """(state, event, guard) -> (action, next_state) rows compiled into ordinal-indexed dispatch arrays"""
+    
+    def __init__(self, owner, rows: List[tuple], hierarchy: Optional[Dict] = None,
+                 entry_actions: Optional[Dict] = None):
+        self.rows = rows
+        self.hierarchy = hierarchy or {}
+        self.event_count = len(Event)
+        self.dispatch = [()] * (len(State) * self.event_count)
+        self.next_state = [[-1] * self.event_count for _ in State]
+        self.next_state_array = None
+        self.batchable = all(row[2] is None for row in rows)
+        self._compile(owner, entry_actions or {})
+    
+    @staticmethod
+    def _resolve(owner, handler):
+        """Method names become plain functions called as handler(fsm, data)"""
+        return getattr(owner, handler) if isinstance(handler, str) else handler
+    
+    def lineage(self, state) -> List:
+        """The state followed by its enclosing superstates, innermost first"""
+        chain = [state]
+        while chain[-1] in self.hierarchy:
+            chain.append(self.hierarchy[chain[-1]])
+        return chain
+    
+    def _compile(self, owner, entry_actions: Dict):
+        """Flatten the hierarchy so every (state, event) cell holds its candidate rows in match order"""
+        superstates = set(self.hierarchy.values())
+        by_source = {}
+        for source, event, guard, action, target in self.rows:
+            if not isinstance(source, State) and source not in superstates:
+                raise ValueError(f"Unknown state or superstate {source!r} in transition table")
+            by_source.setdefault((source, event), []).append(
+                (self._resolve(owner, guard), self._resolve(owner, action), target)
+            )
+        
+        for state in State:
+            lineage = self.lineage(state)
+            for event in Event:
+                candidates = tuple(row for source in lineage for row in by_source.get((source, event), ()))
+                self.dispatch[STATE_ORDINALS[state] * self.event_count + EVENT_ORDINALS[event]] = candidates
+                if candidates and candidates[0][2] is not None:
+                    self.next_state[STATE_ORDINALS[state]][EVENT_ORDINALS[event]] = STATE_ORDINALS[candidates[0][2]]
+        
+        self.entry_actions = [self._resolve(owner, entry_actions.get(state)) for state in State]
+    
+    def candidates(self, state: State, event: Event) -> tuple:
+        """(guard, action, target) rows to try, in order, for event in state"""
+        return self.dispatch[STATE_ORDINALS[state] * self.event_count + EVENT_ORDINALS[event]]
+    
+    def step(self, states: 'np.ndarray', events: 'np.ndarray') -> 'np.ndarray':
+        """Next state ordinals for many machines at once (guard-free tables only)"""
+        if not self.batchable:
+            raise ValueError("Batch stepping needs a transition table without guards")
+        if self.next_state_array is None:
+            require_numpy("Batch stepping")
+            self.next_state_array = np.array(self.next_state, dtype=np.int8)
+        next_states = self.next_state_array[states, events]
+        return np.where(next_states >= 0, next_states, states)
+    
+    def format_diagram(self) -> str:
+        """Text rendering of the compiled transitions, one line per state and event"""
+        lines = []
+        for state in State:
+            for event in Event:
+                for guard, action, target in self.candidates(state, event):
+                    arrow = target.value if target is not None else "(stay)"
+                    notes = [name for name in (getattr(guard, '__name__', None), getattr(action, '__name__', None)) if name]
+                    suffix = f"  [{', '.join(notes)}]" if notes else ""
+                    lines.append(f"{state.value:>15} --{event.value}--> {arrow}{suffix}")
+                    if guard is None:
+                        break
+        return "\n".join(lines)
+
+
+
 class RescueRobotFSM:
-    """Finite State Machine for rescue robot behavior"""
+    """Finite State Machine for rescue robot behavior, driven by a compiled transition table"""
+    
+    transitions = None
+    
+    SEARCH_RADIUS_STEP = 3
+    EXPLORE_STEP = 10
     
-    def __init__(self, event_manager: EventManager, actuators: RobotActuators):
+    def __init__(self, event_manager: EventManager, actuators: RobotActuators,
+                 rng: Optional[random.Random] = None, world: Optional[WorldModel] = None):
         self.state = State.IDLE
         self.event_manager = event_manager
         self.actuators = actuators
+        self.world = world
+        self.clock = actuators.clock
+        self.rng = rng or actuators.rng
         self.goals = self._initialize_goals()
         self.current_victim = None
         self.hazard_active = False
         
         
         self._subscribe_to_events()
+        self._configure_event_policies()
         
         print(f"[FSM] Initialized in {self.state.value} state")
     
@@ -192,94 +847,132 @@ class RescueRobotFSM:
         self.event_manager.subscribe(Event.AT_BASE, self.on_at_base)
         self.event_manager.subscribe(Event.BATTERY_LOW, self.on_battery_low)
     
+    def _configure_event_policies(self):
+        """Order events by goal priority and collapse repeats already waiting in the queue"""
+        for goal in self.goals.values():
+            for condition in goal.conditions:
+                self.event_manager.set_priority(Event(condition), goal.priority)
+        
+        self.event_manager.set_policy(Event.VICTIM_DETECTED, "coalesce")
+        self.event_manager.set_policy(
+            Event.HAZARD_DETECTED, "coalesce",
+            key=lambda data: (data.get('type'), tuple(data.get('location', ())))
+        )
+        self.event_manager.set_policy(Event.BATTERY_LOW, "drop")
+    
     
     
     def on_victim_detected(self, data):
         """Handle victim detection event"""
         print(f"[HANDLER] Victim detected: {data}")
-        self.current_victim = data
-        
-        if self.state == State.SEARCHING:
-            self.transition_to(State.RESCUING)
-        elif self.state == State.IDLE:
-            self.transition_to(State.SEARCHING)
+        self.dispatch(Event.VICTIM_DETECTED, data)
     
     def on_hazard_detected(self, data):
         """Handle hazard detection event"""
         print(f"[HANDLER] Hazard detected: {data}")
-        self.hazard_active = True
-        
-        
-        if self.state not in [State.AVOIDING, State.RETURNING_HOME]:
-            self.transition_to(State.AVOIDING, hazard_data=data)
+        self.dispatch(Event.HAZARD_DETECTED, data)
     
     def on_hazard_cleared(self, data=None):
         """Handle hazard cleared event"""
         print("[HANDLER] Hazard cleared")
-        self.hazard_active = False
-        self.transition_to(State.SEARCHING)
+        self.dispatch(Event.HAZARD_CLEARED, data)
     
     def on_rescue_complete(self, data=None):
         """Handle rescue completion event"""
         print("[HANDLER] Rescue complete")
-        self.transition_to(State.RETURNING_HOME)
+        self.dispatch(Event.RESCUE_COMPLETE, data)
     
     def on_at_base(self, data=None):
         """Handle reaching base event"""
         print("[HANDLER] At base")
-        self.actuators.carrying_victim = False
-        self.transition_to(State.IDLE)
+        self.dispatch(Event.AT_BASE, data)
     
     def on_battery_low(self, data=None):
         """Handle low battery event"""
         print("[HANDLER] Battery low")
-        self.transition_to(State.RETURNING_HOME)
+        self.dispatch(Event.BATTERY_LOW, data)
     
     
     
-    def transition_to(self, new_state: State, **kwargs):
+    def record_victim(self, data):
+        """Transition action: remember the latest victim"""
+        self.current_victim = data
+    
+    def raise_hazard(self, data):
+        """Transition action: flag an active hazard"""
+        self.hazard_active = True
+    
+    def clear_hazard(self, data):
+        """Transition action: clear the hazard flag"""
+        self.hazard_active = False
+    
+    def unload_victim(self, data):
+        """Transition action: hand over the carried victim at base"""
+        self.actuators.carrying_victim = False
+    
+    
+    
+    def dispatch(self, event: Event, data=None) -> bool:
+        """Fire the first table row whose guard passes; False if the event is unhandled here"""
+        for guard, action, target in self.transitions.candidates(self.state, event):
+            if guard is not None and not guard(self, data):
+                continue
+            if action is not None:
+                action(self, data)
+            if target is not None:
+                self.transition_to(target, data)
+            return True
+        return False
+    
+    def transition_to(self, new_state: State, data=None):
         """Handle state transition"""
         print(f"[FSM] State transition: {self.state.value} -> {new_state.value}")
         self.state = new_state
         
         
-        if new_state == State.SEARCHING:
-            self.enter_searching()
-        elif new_state == State.RESCUING:
-            self.enter_rescuing(kwargs.get('victim_data', self.current_victim))
-        elif new_state == State.AVOIDING:
-            self.enter_avoiding(kwargs.get('hazard_data'))
-        elif new_state == State.RETURNING_HOME:
-            self.enter_returning_home()
-        elif new_state == State.IDLE:
-            self.enter_idle()
+        entry_action = self.transitions.entry_actions[STATE_ORDINALS[new_state]]
+        if entry_action is not None:
+            entry_action(self, data)
     
     
     
-    def enter_searching(self):
+    def enter_searching(self, data=None):
         """Actions to perform when entering SEARCHING state"""
         print("[STATE] Entering SEARCHING mode")
         
-        for _ in range(5):  
+        for scan in range(5):  
             if self.state == State.SEARCHING:  
                 print("[ROBOT] Scanning area for victims...")
-                time.sleep(1)
+                self.clock.sleep(1)
                 
                 
-                if random.random() < 0.4:  
+                if self.world is not None:
+                    radius = self.SEARCH_RADIUS_STEP * (scan + 1)
+                    victim = self.world.nearest_victim(self.actuators.position, radius)
+                    if victim is not None:
+                        self.event_manager.publish(Event.VICTIM_DETECTED, victim.event_data())
+                        break
+                elif self.rng.random() < 0.4:  
                     victim_found = {
                         'location': (
-                            self.actuators.position[0] + random.randint(-3, 3),
-                            self.actuators.position[1] + random.randint(-3, 3)
+                            self.actuators.position[0] + self.rng.randint(-3, 3),
+                            self.actuators.position[1] + self.rng.randint(-3, 3)
                         ),
-                        'severity': random.choice(['minor', 'moderate', 'critical']),
-                        'id': random.randint(100, 999)
+                        'severity': self.rng.choice(['minor', 'moderate', 'critical']),
+                        'id': self.rng.randint(100, 999)
                     }
                     self.event_manager.publish(Event.VICTIM_DETECTED, victim_found)
                     break
     
-    def enter_rescuing(self, victim_data):
+    def enter_rescuing(self, victim_data=None):
         """Actions to perform when entering RESCUING state"""
+        victim_data = victim_data or self.current_victim
+        if self.world is not None:
+            victim_data = self.confirm_victim(victim_data)
+            if victim_data is None:
+                print("[ROBOT] No unrescued victims left in the world")
+                self.event_manager.publish(Event.RESCUE_COMPLETE)
+                return
         print(f"[STATE] Entering RESCUING mode for victim at {victim_data.get('location')}")
         
         
@@ -287,9 +980,23 @@ class RescueRobotFSM:
         
         
         if self.actuators.perform_rescue(victim_data):
+            if self.world is not None:
+                self.world.rescue(victim_data['id'])
             
             self.event_manager.publish(Event.RESCUE_COMPLETE)
     
+    def confirm_victim(self, victim_data: Dict) -> Optional[Dict]:
+        """Re-target to the nearest unrescued victim if the reported one was already saved"""
+        entity = self.world.entities.get(victim_data.get('id'))
+        if entity is not None and entity.kind == 'victim' and not entity.rescued:
+            return victim_data
+        
+        replacement = self.world.nearest_victim(victim_data.get('location', self.actuators.position))
+        if replacement is None:
+            return None
+        print(f"[ROBOT] Victim {victim_data.get('id')} already rescued, heading to victim {replacement.entity_id}")
+        return replacement.event_data()
+    
     def enter_avoiding(self, hazard_data):
         """Actions to perform when entering AVOIDING state"""
         print(f"[STATE] Entering AVOIDING mode for {hazard_data.get('type')} hazard")
@@ -298,11 +1005,11 @@ class RescueRobotFSM:
         new_pos = self.actuators.avoid_hazard(hazard_data)
         
         
-        time.sleep(2)
-        if random.random() < 0.7:  
+        self.clock.sleep(2)
+        if self.rng.random() < 0.7:  
             self.event_manager.publish(Event.HAZARD_CLEARED)
     
-    def enter_returning_home(self):
+    def enter_returning_home(self, data=None):
         """Actions to perform when entering RETURNING_HOME state"""
         print("[STATE] Entering RETURNING_HOME mode")
         
@@ -314,7 +1021,38 @@ class RescueRobotFSM:
         self.actuators.return_to_base()
         self.event_manager.publish(Event.AT_BASE)
     
-    def enter_idle(self):
+    def docked(self) -> bool:
+        """Idle at base and charging: the robot takes no tasks until its battery is full"""
+        return (self.state == State.IDLE and self.actuators.at_base()
+                and (self.actuators.charging or self.actuators.battery_level < self.actuators.LOW_BATTERY))
+    
+    def explore(self):
+        """World-mode step with nothing to react to: leave cleared hazard zones, else head for a victim"""
+        if self.world is None or self.docked():
+            return
+        position = self.actuators.position
+        if self.state == State.AVOIDING:
+            if not self.world.hazards_within(position, SensorSystem.HAZARD_RANGE):
+                self.event_manager.publish(Event.HAZARD_CLEARED)
+            return
+        if self.state not in (State.IDLE, State.SEARCHING):
+            return
+        
+        victim = self.world.nearest_victim(position)
+        if victim is None:
+            return
+        trip = math.dist(position, victim.location) + math.dist(victim.location, self.actuators.HOME)
+        if self.actuators.battery_level - trip * 0.5 - 10 < self.actuators.LOW_BATTERY:
+            print(f"[ROBOT] Not enough battery to reach victim {victim.entity_id} and return")
+            if not self.actuators.at_base():
+                self.event_manager.publish(Event.BATTERY_LOW)
+            elif self.actuators.battery_level < self.actuators.FULL_BATTERY:
+                self.actuators.charging = True
+            return
+        print(f"[ROBOT] Exploring toward victim {victim.entity_id} at {victim.location}")
+        self.actuators.move_toward(victim.location, self.EXPLORE_STEP)
+    
+    def enter_idle(self, data=None):
         """Actions to perform when entering IDLE state"""
         print("[STATE] Entering IDLE mode")
         print("[ROBOT] Waiting for new tasks...")
@@ -322,54 +1060,286 @@ class RescueRobotFSM:
 
 
 
-def run_simulation():
-    """Main simulation loop"""
+RESCUE_STATE_HIERARCHY = {
+    State.IDLE: 'interruptible',
+    State.SEARCHING: 'interruptible',
+    State.RESCUING: 'interruptible',
+    State.AVOIDING: 'operating',
+    State.RETURNING_HOME: 'operating',
+    'interruptible': 'operating'
+}
+
+RESCUE_TRANSITION_ROWS = [
+    (State.IDLE, Event.VICTIM_DETECTED, None, 'record_victim', State.SEARCHING),
+    (State.SEARCHING, Event.VICTIM_DETECTED, None, 'record_victim', State.RESCUING),
+    ('operating', Event.VICTIM_DETECTED, None, 'record_victim', None),
+    ('interruptible', Event.HAZARD_DETECTED, None, 'raise_hazard', State.AVOIDING),
+    ('operating', Event.HAZARD_DETECTED, None, 'raise_hazard', None),
+    ('operating', Event.HAZARD_CLEARED, None, 'clear_hazard', State.SEARCHING),
+    ('operating', Event.RESCUE_COMPLETE, None, None, State.RETURNING_HOME),
+    ('operating', Event.AT_BASE, None, 'unload_victim', State.IDLE),
+    ('operating', Event.BATTERY_LOW, None, None, State.RETURNING_HOME)
+]
+
+RESCUE_ENTRY_ACTIONS = {
+    State.SEARCHING: 'enter_searching',
+    State.RESCUING: 'enter_rescuing',
+    State.AVOIDING: 'enter_avoiding',
+    State.RETURNING_HOME: 'enter_returning_home',
+    State.IDLE: 'enter_idle'
+}
+
+RescueRobotFSM.transitions = TransitionTable(
+    RescueRobotFSM, RESCUE_TRANSITION_ROWS, RESCUE_STATE_HIERARCHY, RESCUE_ENTRY_ACTIONS
+)
+
+
+
+class RobotFleet:
+    """Many rescue robots stepped together, with per-robot state held in NumPy arrays"""
+    
+    VICTIM_CHANCE = 0.3
+    HAZARD_CHANCE = 0.2
+    CLEAR_CHANCE = 0.7
+    SEARCH_HIT = 1 - 0.6 ** 5
+    SCAN_REACH = 5
+    SEARCH_REACH = 3
+    ESCAPE_REACH = 10
+    DRAIN_PER_UNIT = 0.5
+    RESCUE_COST = 10.0
+    BATTERY_LOW = RobotActuators.LOW_BATTERY
+    FULL_BATTERY = RobotActuators.FULL_BATTERY
+    CHARGE_RATE = RobotActuators.CHARGE_RATE
+    
+    def __init__(self, size: int, seed: Optional[int] = None, base: tuple = RobotActuators.HOME):
+        require_numpy("RobotFleet")
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.base = np.array(base, dtype=np.float64)
+        self.position = np.tile(self.base, (size, 1))
+        self.battery = np.full(size, float(self.FULL_BATTERY))
+        self.charging = np.zeros(size, dtype=bool)
+        self.carrying = np.zeros(size, dtype=bool)
+        self.state = np.full(size, STATE_ORDINALS[State.IDLE], dtype=np.int8)
+        self.sim_time = 0.0
+        self.steps = 0
+        self.transitions = 0
+        self.rescued = 0
+    
+    def in_state(self, state: State) -> 'np.ndarray':
+        """Mask of robots currently in state"""
+        return self.state == STATE_ORDINALS[state]
+    
+    def docked(self) -> 'np.ndarray':
+        """Mask of robots idle at base and charging, which take no tasks until full"""
+        at_base = np.all(self.position == self.base, axis=1)
+        return self.in_state(State.IDLE) & at_base & (self.charging | (self.battery < self.BATTERY_LOW))
+    
+    def _transition(self, mask: 'np.ndarray', new_state: State):
+        """Move every robot in mask to new_state"""
+        self.state[mask] = STATE_ORDINALS[new_state]
+        self.transitions += int(np.count_nonzero(mask))
+    
+    def _offsets(self, count: int, reach: int) -> 'np.ndarray':
+        """Random integer (dx, dy) offsets in [-reach, reach]"""
+        return self.rng.integers(-reach, reach + 1, size=(count, 2)).astype(np.float64)
+    
+    def _travel(self, robots: 'np.ndarray', targets: 'np.ndarray'):
+        """Move the robots at the given indices straight to targets, draining battery by distance"""
+        delta = targets - self.position[robots]
+        self.battery[robots] -= np.hypot(delta[:, 0], delta[:, 1]) * self.DRAIN_PER_UNIT
+        self.position[robots] = targets
+    
+    def _rescue(self, rescuing: 'np.ndarray', victims: 'np.ndarray'):
+        """RESCUING -> RETURNING_HOME -> IDLE within one tick, as the scalar FSM does"""
+        robots = np.flatnonzero(rescuing)
+        self._transition(rescuing, State.RESCUING)
+        self._travel(robots, victims)
+        self.battery[robots] -= self.RESCUE_COST
+        self.carrying[robots] = True
+        self._transition(rescuing, State.RETURNING_HOME)
+        self._travel(robots, np.broadcast_to(self.base, victims.shape))
+        self._arrive_at_base(rescuing)
+    
+    def _arrive_at_base(self, arrived: 'np.ndarray'):
+        """AT_BASE for robots in arrived: unload carried victims and go IDLE"""
+        self.rescued += int(np.count_nonzero(arrived & self.carrying))
+        self.carrying &= ~arrived
+        self._transition(arrived, State.IDLE)
+    
+    def step(self, dt: float = 1.0):
+        """One simulation_tick for the whole fleet: scan, dispatch, battery check"""
+        docked = (self.battery > 0) & self.docked()
+        self.battery[docked] = np.minimum(self.battery[docked] + self.CHARGE_RATE, self.FULL_BATTERY)
+        self.charging = docked & (self.battery < self.FULL_BATTERY)
+        active = (self.battery > 0) & ~docked
+        detection = self.rng.random(self.size)
+        victim = active & (detection < self.VICTIM_CHANCE)
+        hazard = active & (detection >= self.VICTIM_CHANCE) & (detection < self.VICTIM_CHANCE + self.HAZARD_CHANCE)
+        idle, searching = self.in_state(State.IDLE), self.in_state(State.SEARCHING)
+        
+        
+        reported = victim & searching
+        victims = self.position[reported] + self._offsets(int(np.count_nonzero(reported)), self.SCAN_REACH)
+        self._rescue(reported, victims)
+        
+        
+        woken = victim & idle
+        self._transition(woken, State.SEARCHING)
+        
+        
+        avoiding = hazard & (idle | searching)
+        escapes = np.flatnonzero(avoiding)
+        self._transition(avoiding, State.AVOIDING)
+        self._travel(escapes, self.position[escapes] + self._offsets(len(escapes), self.ESCAPE_REACH))
+        cleared = avoiding & (self.rng.random(self.size) < self.CLEAR_CHANCE)
+        self._transition(cleared, State.SEARCHING)
+        
+        
+        found = (woken | cleared) & (self.rng.random(self.size) < self.SEARCH_HIT)
+        victims = self.position[found] + self._offsets(int(np.count_nonzero(found)), self.SEARCH_REACH)
+        self._rescue(found, victims)
+        
+        
+        battery_low = active & (self.battery < self.BATTERY_LOW) & ~self.in_state(State.RETURNING_HOME)
+        homing = np.flatnonzero(battery_low)
+        self._transition(battery_low, State.RETURNING_HOME)
+        self._travel(homing, np.broadcast_to(self.base, (len(homing), 2)))
+        self._arrive_at_base(battery_low)
+        
+        
+        self.sim_time += dt
+        self.steps += 1
+    
+    def run(self, steps: int, dt: float = 1.0):
+        """Advance the fleet by steps ticks"""
+        for _ in range(steps):
+            self.step(dt)
+    
+    def summary(self) -> Dict:
+        """Fleet-wide counts for reporting"""
+        counts = np.bincount(self.state, minlength=len(State))
+        return {
+            'robots': self.size,
+            'steps': self.steps,
+            'simulated_time': self.sim_time,
+            'alive': int(np.count_nonzero(self.battery > 0)),
+            'docked': int(np.count_nonzero(self.docked())),
+            'carrying': int(np.count_nonzero(self.carrying)),
+            'mean_battery': round(float(self.battery.mean()), 2),
+            'rescued': self.rescued,
+            'transitions': self.transitions,
+            'states': {state.value: int(counts[ordinal]) for state, ordinal in STATE_ORDINALS.items()}
+        }
+
+
+
+def simulation_tick(sensors: SensorSystem, actuators: RobotActuators,
+                    robot_fsm: RescueRobotFSM, event_manager: EventManager):
+    """One scan / dispatch / battery-check cycle for a single robot"""
+    
+    if robot_fsm.docked():
+        actuators.recharge()
+        return
+    
+    
+    sensors.update_location(actuators.position)
+    
+    
+    sensors.scan_environment()
+    
+    
+    event_manager.process_events()
+    
+    
+    if actuators.battery_level < actuators.LOW_BATTERY and robot_fsm.state != State.RETURNING_HOME:
+        event_manager.publish(Event.BATTERY_LOW)
+        event_manager.process_events()
+    
+    
+    robot_fsm.explore()
+    event_manager.process_events()
+
+
+
+def run_simulation(simulation_steps: int = 10, seed: Optional[int] = None,
+                   realtime: bool = False, speed: float = 1.0,
+                   victims: int = 200, hazards: int = 40, world_extent: int = 50) -> Dict:
+    """Main simulation loop, driven by the discrete-event scheduler"""
     
     print("RESCUE ROBOT SIMULATION - LAB 3: GOALS, EVENTS, AND REACTIVE BEHAVIOR")
     
     
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    print(f"Seed: {seed} ({'real-time' if realtime else 'virtual'} clock)")
     
-    event_manager = EventManager()
-    actuators = RobotActuators()
-    robot_fsm = RescueRobotFSM(event_manager, actuators)
-    sensors = SensorSystem(event_manager)
     
+    clock = RealTimeClock(speed) if realtime else SimulationClock()
+    scheduler = DiscreteEventScheduler(clock)
+    rng = random.Random(seed)
+    world = WorldModel()
+    world.populate(victims, hazards, world_extent, rng)
+    planner = PathPlanner(world)
+    print(f"World: {victims} victims and {hazards} hazards within {world_extent} units of base")
     
-    simulation_steps = 10
-    current_step = 0
+    event_manager = EventManager()
+    actuators = RobotActuators(clock, rng, planner)
+    robot_fsm = RescueRobotFSM(event_manager, actuators, world=world)
+    sensors = SensorSystem(event_manager, rng, world)
     
-    print("\n=== SIMULATION START ===")
     
+    current_step = 0
     
-    while current_step < simulation_steps and actuators.battery_level > 0:
-        print(f"\n--- Simulation Step {current_step + 1} ---")
-        
-        
-        sensors.update_location(actuators.position)
+    def simulation_step():
+        nonlocal current_step
+        if current_step >= simulation_steps or actuators.battery_level <= 0:
+            scheduler.stop()
+            return
         
+        print(f"\n--- Simulation Step {current_step + 1} (t={clock.now():.1f}s) ---")
         
-        sensors.scan_environment()
         
-        
-        event_manager.process_events()
-        
-        
-        if actuators.battery_level < 20 and robot_fsm.state != State.RETURNING_HOME:
-            event_manager.publish(Event.BATTERY_LOW)
-            event_manager.process_events()
+        simulation_tick(sensors, actuators, robot_fsm, event_manager)
         
         
         current_step += 1
-        time.sleep(1)
+        scheduler.schedule(1.0, simulation_step)
+    
+    print("\n=== SIMULATION START ===")
+    
+    
+    scheduler.schedule(0.0, simulation_step)
+    scheduler.run()
     
     print("\n=== SIMULATION END ===")
+    print(f"Steps completed: {current_step}")
+    print(f"Simulated time: {clock.now():.1f}s")
     print(f"Final battery level: {actuators.battery_level:.1f}%")
-    print(f"Final state: {robot_fsm.state.value}")
-    print(f"Victims rescued: {'Yes' if actuators.carrying_victim else 'No'}")
+    print(f"Final state: {robot_fsm.state.value}{' (docked at base, charging)' if robot_fsm.docked() else ''}")
+    print(f"Victims rescued: {world.rescued} of {victims}")
+    
+    queue_stats = event_manager.queue_stats()
+    print(f"Events: {queue_stats['dispatched']} dispatched, {queue_stats['coalesced']} coalesced, "
+          f"{queue_stats['dropped']} dropped, max queue depth {queue_stats['max_depth']}")
+    print(f"Path planner: {planner.stats['hits']} cache hits, {planner.stats['misses']} searches, "
+          f"{planner.stats['expanded']} cells expanded")
+    
+    return {
+        'seed': seed,
+        'steps': current_step,
+        'simulated_time': clock.now(),
+        'battery_level': actuators.battery_level,
+        'state': robot_fsm.state.value,
+        'docked': robot_fsm.docked(),
+        'rescued': world.rescued,
+        'events': queue_stats,
+        'planner': dict(planner.stats)
+    }
 
 
 
-def generate_execution_trace():
+def generate_execution_trace(**options):
     """Generate a detailed execution trace of the simulation"""
     
     print("EXECUTION TRACE")
@@ -385,7 +1355,7 @@ def generate_execution_trace():
     sys.stdout = trace_output
     
     
-    run_simulation()
+    run_simulation(**options)
     
     
     sys.stdout = old_stdout
@@ -404,12 +1374,36 @@ def generate_execution_trace():
 
 
 
+def parse_arguments():
+    """Command-line options for the simulation"""
+    parser = argparse.ArgumentParser(description="Lab 3 rescue robot simulation")
+    parser.add_argument("--steps", type=int, default=10, help="simulation steps to run")
+    parser.add_argument("--seed", type=int, default=None, help="seed for a reproducible trace")
+    parser.add_argument("--realtime", action="store_true", help="sleep in wall-clock time (demo mode)")
+    parser.add_argument("--speed", type=float, default=1.0, help="real-time speed-up factor")
+    parser.add_argument("--victims", type=int, default=200, help="victims placed in the world")
+    parser.add_argument("--hazards", type=int, default=40, help="hazards placed in the world")
+    return parser.parse_args()
+
+
+
 if __name__ == "__main__":
     
-    run_simulation()
+    args = parse_arguments()
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    options = dict(simulation_steps=args.steps, seed=seed, realtime=args.realtime, speed=args.speed,
+                   victims=args.victims, hazards=args.hazards)
+    
+    
+    print("FSM DIAGRAM")
+    print(RescueRobotFSM.transitions.format_diagram())
+    print()
+    
+    
+    run_simulation(**options)
     
     
-    generate_execution_trace()
+    generate_execution_trace(**options)
     
     
     print("LAB 3 COMPLETED SUCCESSFULLY")
@@ -1,161 +1,2568 @@
+import os
+import copy
 import json
 import time
+import asyncio
 import uuid
+import shutil
+import select
 import socket
+import struct
 import threading
+import heapq
+import bisect
+import hashlib
+import itertools
+import tempfile
+import weakref
+import zlib
+import lzma
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+JSON_CODEC_ID = 0
+BINARY_CODEC_ID = 1
+
+PRIORITIES = ("critical", "high", "normal", "low")
+PRIORITY_LEVELS = {name: level for level, name in enumerate(PRIORITIES)}
+DEFAULT_PRIORITY = "normal"
+DEFAULT_PRIORITY_LEVEL = PRIORITY_LEVELS[DEFAULT_PRIORITY]
+
+
+def priority_level(priority: str) -> int:
+    return PRIORITY_LEVELS.get(priority, DEFAULT_PRIORITY_LEVEL)
+
+
+_message_ids = itertools.count(1)
+_MESSAGE_ID_PREFIX = uuid.uuid4().hex[:16]
+_MESSAGE_ID_PREFIX = f"{_MESSAGE_ID_PREFIX[:8]}-{_MESSAGE_ID_PREFIX[8:12]}-{_MESSAGE_ID_PREFIX[12:16]}-"
+
+
+def next_message_id() -> str:
+    counter = next(_message_ids)
+    return f"{_MESSAGE_ID_PREFIX}{(counter >> 48) & 0xFFFF:04x}-{counter & 0xFFFFFFFFFFFF:012x}"
+
+
+def timestamp_to_ns(timestamp: str) -> Optional[int]:
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is not None:
+        return None
+    return int(moment.replace(microsecond=0).timestamp()) * 1_000_000_000 + moment.microsecond * 1000
+
+
+def ns_to_timestamp(timestamp_ns: int) -> str:
+    seconds, remainder = divmod(timestamp_ns, 1_000_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=remainder // 1000).isoformat()
+
+
 class ACLMessage:
-    def __init__(self, performative: str, sender: str, receivers: List[str], content: Any = None):
+    __slots__ = (
+        "performative", "sender", "receivers", "content", "_conversation_id", "_reply_with",
+        "in_reply_to", "language", "ontology", "protocol", "priority", "_timestamp", "_timestamp_ns"
+    )
+    codecs = {}
+    codec_names = {}
+    
+    def __init__(self, performative: str, sender: str, receivers: List[str], content: Any = None,
+                 priority: str = DEFAULT_PRIORITY):
         self.performative = performative
         self.sender = sender
         self.receivers = receivers
         self.content = content
-        self.conversation_id = str(uuid.uuid4())
-        self.reply_with = str(uuid.uuid4())
+        self._conversation_id = None
+        self._reply_with = None
         self.in_reply_to = None
         self.language = "json"
         self.ontology = "rescue_ontology"
         self.protocol = "fipa-request"
-        self.timestamp = datetime.now().isoformat()
+        self.priority = priority
+        self._timestamp = None
+        self._timestamp_ns = time.time_ns()
+    
+    @property
+    def conversation_id(self) -> str:
+        if self._conversation_id is None:
+            self._conversation_id = next_message_id()
+        return self._conversation_id
+    
+    @conversation_id.setter
+    def conversation_id(self, value: str):
+        self._conversation_id = value
+    
+    @property
+    def reply_with(self) -> str:
+        if self._reply_with is None:
+            self._reply_with = next_message_id()
+        return self._reply_with
+    
+    @reply_with.setter
+    def reply_with(self, value: str):
+        self._reply_with = value
+    
+    @property
+    def timestamp(self) -> str:
+        if self._timestamp is None:
+            self._timestamp = ns_to_timestamp(self._timestamp_ns)
+        return self._timestamp
+    
+    @timestamp.setter
+    def timestamp(self, value: str):
+        self._timestamp = value
+        self._timestamp_ns = None
+    
+    @property
+    def timestamp_ns(self) -> Optional[int]:
+        if self._timestamp_ns is None and self._timestamp is not None:
+            self._timestamp_ns = timestamp_to_ns(self._timestamp)
+        return self._timestamp_ns
+    
+    @timestamp_ns.setter
+    def timestamp_ns(self, value: int):
+        self._timestamp_ns = value
+        self._timestamp = None
+    
+    def set_reply_to(self, reply_with: str):
+        self.in_reply_to = reply_with
+    
+    def copy(self) -> "ACLMessage":
+        msg = ACLMessage.__new__(ACLMessage)
+        msg.performative = self.performative
+        msg.sender = self.sender
+        msg.receivers = list(self.receivers)
+        msg.content = copy.copy(self.content)
+        msg._conversation_id = self.conversation_id
+        msg._reply_with = self.reply_with
+        msg.in_reply_to = self.in_reply_to
+        msg.language = self.language
+        msg.ontology = self.ontology
+        msg.protocol = self.protocol
+        msg.priority = self.priority
+        msg._timestamp = self._timestamp
+        msg._timestamp_ns = self._timestamp_ns
+        return msg
+    
+    def to_json(self) -> str:
+        return json.dumps({
+            "performative": self.performative,
+            "sender": self.sender,
+            "receivers": self.receivers,
+            "content": self.content,
+            "conversation_id": self.conversation_id,
+            "reply_with": self.reply_with,
+            "in_reply_to": self.in_reply_to,
+            "language": self.language,
+            "ontology": self.ontology,
+            "protocol": self.protocol,
+            "priority": self.priority,
+            "timestamp": self.timestamp
+        })
+    
+    @classmethod
+    def from_json(cls, json_str: str):
+        if not isinstance(json_str, (str, bytes)):
+            json_str = str(json_str, 'utf-8')
+        data = json.loads(json_str)
+        msg = cls.__new__(cls)
+        msg.performative = data["performative"]
+        msg.sender = data["sender"]
+        msg.receivers = data["receivers"]
+        msg.content = data["content"]
+        msg._conversation_id = data["conversation_id"]
+        msg._reply_with = data["reply_with"]
+        msg.in_reply_to = data["in_reply_to"]
+        msg.language = data["language"]
+        msg.ontology = data["ontology"]
+        msg.protocol = data["protocol"]
+        msg.priority = data.get("priority", DEFAULT_PRIORITY)
+        msg._timestamp = data["timestamp"]
+        msg._timestamp_ns = None
+        return msg
+    
+    @classmethod
+    def register_codec(cls, codec):
+        cls.codecs[codec.codec_id] = codec
+        cls.codec_names[codec.name] = codec.codec_id
+    
+    @classmethod
+    def get_codec(cls, codec):
+        if isinstance(codec, str):
+            codec = cls.codec_names[codec]
+        return cls.codecs[codec]
+    
+    def encode(self, codec=JSON_CODEC_ID) -> bytes:
+        return self.get_codec(codec).encode(self)
+    
+    @classmethod
+    def decode(cls, data, codec=JSON_CODEC_ID):
+        if isinstance(data, ACLMessage):
+            return data
+        return cls.get_codec(codec).decode(data)
+
+
+class JsonCodec:
+    codec_id = JSON_CODEC_ID
+    name = "json"
+    
+    def encode(self, msg: ACLMessage) -> bytes:
+        return msg.to_json().encode('utf-8')
+    
+    def decode(self, data) -> ACLMessage:
+        return ACLMessage.from_json(data)
+
+
+PERFORMATIVES = (
+    "inform", "request", "agree", "refuse", "failure", "not-understood", "cfp", "propose",
+    "accept-proposal", "reject-proposal", "query-if", "query-ref", "subscribe", "cancel",
+    "confirm", "disconfirm", "inform-if", "inform-ref", "propagate", "proxy", "request-when",
+    "request-whenever"
+)
+LANGUAGES = ("json",)
+ONTOLOGIES = ("rescue_ontology",)
+PROTOCOLS = ("fipa-request", "fipa-query", "fipa-contract-net", "fipa-subscribe", "fipa-propose")
+LITERAL_CODE = 0xFF
+
+
+class BinaryCodec:
+    codec_id = BINARY_CODEC_ID
+    name = "binary"
+    header = struct.Struct("!BBBBBqI")
+    length = struct.Struct("!I")
+    
+    LENGTH_PREFIXED = 0x01
+    CONVERSATION_UUID = 0x02
+    HAS_IN_REPLY_TO = 0x04
+    REPLY_WITH_UUID = 0x08
+    LITERAL_TIMESTAMP = 0x10
+    PRIORITY_SHIFT = 5
+    PRIORITY_MASK = 0x03
+    IN_REPLY_TO_UUID = 0x80
+    UUID_SIZE = 16
+    SEPARATOR = "\x00"
+    
+    def __init__(self):
+        self.tables = (PERFORMATIVES, LANGUAGES, ONTOLOGIES, PROTOCOLS)
+        self.codes = tuple({value: code for code, value in enumerate(table)} for table in self.tables)
+    
+    @staticmethod
+    def _uuid_bytes(value: str) -> Optional[bytes]:
+        if len(value) != 36 or value[8] != "-" or value[13] != "-" or value[18] != "-" or value[23] != "-":
+            return None
+        try:
+            return bytes.fromhex(value.replace("-", ""))
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _uuid_str(raw) -> str:
+        digits = raw.hex()
+        return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+    
+    def _pack_id(self, value: str, flag: int, ids: list, fields: list) -> int:
+        raw = self._uuid_bytes(value)
+        if raw is None:
+            fields.append(value)
+            return 0
+        ids.append(raw)
+        return flag
+    
+    def _pack_fields(self, fields: list) -> tuple:
+        block = self.SEPARATOR.join(fields)
+        if block.count(self.SEPARATOR) == len(fields) - 1:
+            return block.encode('utf-8'), 0
+        parts = []
+        for field in fields:
+            data = field.encode('utf-8')
+            if len(data) > 0xFFFFFFFF:
+                raise ValueError(f"Binary codec field of {len(data)} bytes exceeds the 4 GiB length prefix")
+            parts.append(self.length.pack(len(data)))
+            parts.append(data)
+        return b"".join(parts), self.LENGTH_PREFIXED
+    
+    def _unpack_fields(self, data, offset: int, size: int, flags: int) -> list:
+        if not flags & self.LENGTH_PREFIXED:
+            return str(data[offset:offset + size], 'utf-8').split(self.SEPARATOR)
+        fields = []
+        end = offset + size
+        while offset < end:
+            (length,) = self.length.unpack_from(data, offset)
+            offset += self.length.size
+            fields.append(str(data[offset:offset + length], 'utf-8'))
+            offset += length
+        return fields
+    
+    def encode(self, msg: ACLMessage) -> bytes:
+        flags = priority_level(msg.priority) << self.PRIORITY_SHIFT
+        ids = []
+        fields = []
+        flags |= self._pack_id(msg.conversation_id, self.CONVERSATION_UUID, ids, fields)
+        flags |= self._pack_id(msg.reply_with, self.REPLY_WITH_UUID, ids, fields)
+        if msg.in_reply_to is not None:
+            flags |= self.HAS_IN_REPLY_TO
+            flags |= self._pack_id(msg.in_reply_to, self.IN_REPLY_TO_UUID, ids, fields)
+        
+        codes = []
+        for table_codes, value in zip(self.codes, (msg.performative, msg.language, msg.ontology, msg.protocol)):
+            code = table_codes.get(value, LITERAL_CODE)
+            codes.append(code)
+            if code == LITERAL_CODE:
+                fields.append(value)
+        
+        timestamp_ns = msg.timestamp_ns
+        if timestamp_ns is None:
+            flags |= self.LITERAL_TIMESTAMP
+            timestamp_ns = 0
+            fields.append(str(msg.timestamp))
+        
+        fields.append(msg.sender)
+        fields.extend(msg.receivers)
+        block, layout = self._pack_fields(fields)
+        return b"".join((self.header.pack(flags | layout, *codes, timestamp_ns, len(block)), *ids, block,
+                         json.dumps(msg.content).encode('utf-8')))
+    
+    def decode(self, data) -> ACLMessage:
+        flags, *codes, timestamp_ns, size = self.header.unpack_from(data)
+        offset = self.header.size
+        ids = []
+        for flag in (self.CONVERSATION_UUID, self.REPLY_WITH_UUID, self.IN_REPLY_TO_UUID):
+            if flags & flag:
+                ids.append(self._uuid_str(data[offset:offset + self.UUID_SIZE]))
+                offset += self.UUID_SIZE
+            else:
+                ids.append(None)
+        fields = self._unpack_fields(data, offset, size, flags)
+        
+        msg = ACLMessage.__new__(ACLMessage)
+        index = 0
+        if ids[0] is None:
+            ids[0] = fields[index]
+            index += 1
+        if ids[1] is None:
+            ids[1] = fields[index]
+            index += 1
+        if flags & self.HAS_IN_REPLY_TO and ids[2] is None:
+            ids[2] = fields[index]
+            index += 1
+        msg._conversation_id, msg._reply_with, msg.in_reply_to = ids
+        
+        values = []
+        for table, code in zip(self.tables, codes):
+            if code == LITERAL_CODE:
+                values.append(fields[index])
+                index += 1
+            else:
+                values.append(table[code])
+        msg.performative, msg.language, msg.ontology, msg.protocol = values
+        
+        if flags & self.LITERAL_TIMESTAMP:
+            msg._timestamp = fields[index]
+            msg._timestamp_ns = None
+            index += 1
+        else:
+            msg._timestamp = None
+            msg._timestamp_ns = timestamp_ns
+        
+        msg.sender = fields[index]
+        msg.receivers = fields[index + 1:]
+        msg.priority = PRIORITIES[(flags >> self.PRIORITY_SHIFT) & self.PRIORITY_MASK]
+        msg.content = json.loads(str(data[offset + size:], 'utf-8'))
+        return msg
+
+
+ACLMessage.register_codec(JsonCodec())
+ACLMessage.register_codec(BinaryCodec())
+DEFAULT_CODECS = ("binary", "json")
+
+
+def negotiate_codec(offered: List[int], supported: List[int]) -> int:
+    for codec_id in offered:
+        if codec_id in supported and codec_id in ACLMessage.codecs:
+            return codec_id
+    return JSON_CODEC_ID
+
+
+def decode_message(data, codec: int = JSON_CODEC_ID, compression: Optional[str] = None) -> ACLMessage:
+    if isinstance(data, ACLMessage):
+        return data
+    return ACLMessage.decode(decompress_payload(data, compression), codec)
+
+
+FRAME_HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+class FrameError(Exception):
+    pass
+
+
+def encode_frame(payload: bytes) -> bytes:
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FrameError(f"Frame of {len(payload)} bytes exceeds limit of {MAX_FRAME_SIZE}")
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class FrameReader:
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray()
+    
+    def feed(self, data: bytes) -> List[bytes]:
+        self.buffer += data
+        frames = []
+        offset = 0
+        available = len(self.buffer)
+        while available - offset >= FRAME_HEADER.size:
+            (length,) = FRAME_HEADER.unpack_from(self.buffer, offset)
+            if length > self.max_frame_size:
+                raise FrameError(f"Incoming frame of {length} bytes exceeds limit of {self.max_frame_size}")
+            end = offset + FRAME_HEADER.size + length
+            if end > available:
+                break
+            frames.append(bytes(self.buffer[offset + FRAME_HEADER.size:end]))
+            offset = end
+        if offset:
+            del self.buffer[:offset]
+        return frames
+    
+    def pending(self) -> int:
+        return len(self.buffer)
+
+
+def read_frames(client_socket: socket.socket, chunk_size: int = 65536):
+    reader = FrameReader()
+    while True:
+        data = client_socket.recv(chunk_size)
+        if not data:
+            if reader.pending():
+                raise FrameError(f"Connection closed with {reader.pending()} bytes of a partial frame")
+            return
+        for frame in reader.feed(data):
+            yield frame
+
+
+async def read_frame(reader: asyncio.StreamReader, max_frame_size: int = MAX_FRAME_SIZE) -> Optional[bytes]:
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise FrameError(f"Connection closed with {len(e.partial)} bytes of a partial frame header")
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > max_frame_size:
+        raise FrameError(f"Incoming frame of {length} bytes exceeds limit of {max_frame_size}")
+    try:
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError as e:
+        raise FrameError(f"Connection closed after {len(e.partial)} of {length} frame bytes")
+
+
+def encode_message(message_json: str) -> bytes:
+    return encode_frame(message_json.encode('utf-8'))
+
+
+def read_messages(client_socket: socket.socket):
+    for frame in read_frames(client_socket):
+        yield frame.decode('utf-8')
+
+
+ENVELOPE_VERSION = 5
+ENVELOPE_HEADER = struct.Struct("!BBBBBHHB")
+RECEIVER_SEPARATOR = "\n"
+PERFORMATIVE_CODES = {performative: code for code, performative in enumerate(PERFORMATIVES)}
+FLAG_CONTROL = 0x01
+FLAG_BATCH = 0x02
+FLAG_FORWARDED = 0x04
+FLAG_ZLIB = 0x08
+FLAG_LZMA = 0x10
+COMPRESSION_FLAGS = {"zlib": FLAG_ZLIB, "lzma": FLAG_LZMA}
+COMPRESSION_MASK = FLAG_ZLIB | FLAG_LZMA
+
+
+def check_compression(compression: Optional[str]) -> Optional[str]:
+    if compression is not None and compression not in COMPRESSION_FLAGS:
+        raise ValueError(f"Unknown compression: {compression}")
+    return compression
+
+
+def flag_compression(flags: int) -> Optional[str]:
+    for compression, flag in COMPRESSION_FLAGS.items():
+        if flags & flag:
+            return compression
+    return None
+
+
+def compress_payload(payload: bytes, compression: Optional[str], threshold: int = 0) -> tuple:
+    if compression is None or len(payload) < threshold:
+        return payload, 0
+    compressed = zlib.compress(payload) if compression == "zlib" else lzma.compress(payload)
+    if len(compressed) >= len(payload):
+        return payload, 0
+    return compressed, COMPRESSION_FLAGS[compression]
+
+
+def decompress_payload(payload, compression: Optional[str]):
+    if compression is None:
+        return payload
+    decompressor = zlib.decompressobj() if compression == "zlib" else lzma.LZMADecompressor()
+    try:
+        data = decompressor.decompress(payload, MAX_FRAME_SIZE)
+    except (zlib.error, lzma.LZMAError) as e:
+        raise FrameError(f"Corrupt {compression} payload: {e}")
+    if not decompressor.eof:
+        raise FrameError(f"{compression} payload is truncated or inflates beyond {MAX_FRAME_SIZE} bytes")
+    return data
+
+
+class Envelope:
+    __slots__ = ("flags", "codec", "priority", "performative", "sender", "receivers", "conversation_id", "payload")
+    
+    def __init__(self, flags: int, codec: int, priority: int, performative: Optional[str], sender: str,
+                 receivers: List[str], conversation_id: str, payload: memoryview):
+        self.flags = flags
+        self.codec = codec
+        self.priority = priority
+        self.performative = performative
+        self.sender = sender
+        self.receivers = receivers
+        self.conversation_id = conversation_id
+        self.payload = payload
+    
+    @property
+    def compression(self) -> Optional[str]:
+        return flag_compression(self.flags)
+    
+    def inflate(self):
+        return decompress_payload(self.payload, self.compression)
+
+
+def encode_envelope(sender: str, receivers: List[str], payload: bytes, flags: int = 0,
+                    codec: int = JSON_CODEC_ID, conversation_id: str = "",
+                    priority: int = DEFAULT_PRIORITY_LEVEL, performative: Optional[str] = None) -> bytes:
+    sender_bytes = sender.encode('utf-8')
+    receiver_bytes = RECEIVER_SEPARATOR.join(receivers).encode('utf-8')
+    conversation_bytes = conversation_id.encode('utf-8')[:255]
+    header = ENVELOPE_HEADER.pack(ENVELOPE_VERSION, flags, codec, priority,
+                                  PERFORMATIVE_CODES.get(performative, LITERAL_CODE), len(sender_bytes),
+                                  len(receiver_bytes), len(conversation_bytes))
+    length = len(header) + len(sender_bytes) + len(receiver_bytes) + len(conversation_bytes) + len(payload)
+    if length > MAX_FRAME_SIZE:
+        raise FrameError(f"Frame of {length} bytes exceeds limit of {MAX_FRAME_SIZE}")
+    return b"".join((FRAME_HEADER.pack(length), header, sender_bytes, receiver_bytes, conversation_bytes, payload))
+
+
+def decode_envelope(frame) -> Envelope:
+    view = memoryview(frame)
+    if len(view) < ENVELOPE_HEADER.size:
+        raise FrameError(f"Frame of {len(view)} bytes is too short for an envelope")
+    version, flags, codec, priority, performative, sender_length, receivers_length, conversation_length = \
+        ENVELOPE_HEADER.unpack_from(view)
+    if version != ENVELOPE_VERSION:
+        raise FrameError(f"Unsupported envelope version {version}")
+    offset = ENVELOPE_HEADER.size
+    sender = str(view[offset:offset + sender_length], 'utf-8')
+    offset += sender_length
+    receivers = str(view[offset:offset + receivers_length], 'utf-8').split(RECEIVER_SEPARATOR) if receivers_length else []
+    offset += receivers_length
+    conversation_id = str(view[offset:offset + conversation_length], 'utf-8')
+    offset += conversation_length
+    performative = PERFORMATIVES[performative] if performative < len(PERFORMATIVES) else None
+    return Envelope(flags, codec, priority, performative, sender, receivers, conversation_id, view[offset:])
+
+
+def transcode_frame(frame, codec: int):
+    envelope = decode_envelope(frame)
+    if envelope.codec == codec or envelope.flags & FLAG_CONTROL:
+        return frame
+    payload = ACLMessage.decode(envelope.inflate(), envelope.codec).encode(codec)
+    payload, compressed = compress_payload(payload, envelope.compression)
+    flags = envelope.flags & ~COMPRESSION_MASK | compressed
+    encoded = encode_envelope(envelope.sender, envelope.receivers, payload, flags, codec, envelope.conversation_id,
+                              envelope.priority, envelope.performative)
+    return memoryview(encoded)[FRAME_HEADER.size:]
+
+
+def encode_control(message: Dict) -> bytes:
+    return encode_envelope("", [], json.dumps(message).encode('utf-8'), flags=FLAG_CONTROL)
+
+
+def decode_control(envelope: Envelope) -> Dict:
+    return json.loads(str(envelope.payload, 'utf-8'))
+
+
+def encode_batch(sender: str, frames: List[bytes]) -> bytes:
+    return encode_envelope(sender, [], b"".join(frames), flags=FLAG_BATCH)
+
+
+def decode_batch(envelope: Envelope) -> List[memoryview]:
+    view = envelope.payload
+    frames = []
+    offset = 0
+    while offset < len(view):
+        if len(view) - offset < FRAME_HEADER.size:
+            raise FrameError("Truncated frame header in batch")
+        (length,) = FRAME_HEADER.unpack_from(view, offset)
+        offset += FRAME_HEADER.size
+        if len(view) - offset < length:
+            raise FrameError(f"Truncated frame in batch: expected {length} bytes")
+        frames.append(view[offset:offset + length])
+        offset += length
+    return frames
+
+
+def codec_ids(codecs) -> List[int]:
+    return [ACLMessage.codec_names[codec] if isinstance(codec, str) else codec for codec in codecs]
+
+
+def answer_control(envelope: Envelope, writer: asyncio.StreamWriter, supported: List[int]):
+    request = decode_control(envelope)
+    if request.get("type") == "hello":
+        codec = negotiate_codec(request.get("codecs", []), supported)
+        writer.write(encode_control({"type": "hello", "codec": codec}))
+
+
+def handshake_codec(sock: socket.socket, offered: List[int], timeout: float) -> int:
+    sock.sendall(encode_control({"type": "hello", "codecs": offered}))
+    sock.settimeout(timeout)
+    reader = FrameReader()
+    frames = []
+    while not frames:
+        data = sock.recv(4096)
+        if not data:
+            raise ConnectionError("Peer closed the connection during the codec handshake")
+        frames = reader.feed(data)
+    sock.settimeout(None)
+    return decode_control(decode_envelope(frames[0])).get("codec", JSON_CODEC_ID)
+
+
+TRANSPORTS = ("auto", "inproc", "unix", "tcp")
+LOCAL_HOSTS = {"", "localhost", "127.0.0.1", "::1"}
+INPROC_PORT_BASE = 65536
+_inproc_ports = itertools.count(INPROC_PORT_BASE)
+_local_endpoints = {}
+_local_endpoints_lock = threading.Lock()
+
+
+def check_transport(transport: str) -> str:
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown transport: {transport}")
+    if transport == "unix" and not hasattr(socket, "AF_UNIX"):
+        raise ValueError("Unix domain sockets are not available on this platform")
+    if transport == "auto" and not hasattr(socket, "AF_UNIX"):
+        return "inproc"
+    return transport
+
+
+def is_local_host(host: str) -> bool:
+    return host in LOCAL_HOSTS or host == socket.gethostname()
+
+
+def endpoint_key(host: str, port: int) -> tuple:
+    return ("localhost" if is_local_host(host) else host, port)
+
+
+def bind_local_endpoint(host: str, port: int, owner):
+    with _local_endpoints_lock:
+        _local_endpoints[endpoint_key(host, port)] = owner
+
+
+def unbind_local_endpoint(host: str, port: int, owner):
+    with _local_endpoints_lock:
+        key = endpoint_key(host, port)
+        if _local_endpoints.get(key) is owner:
+            del _local_endpoints[key]
+
+
+def local_endpoint(host: str, port: int):
+    return _local_endpoints.get(endpoint_key(host, port))
+
+
+def unix_socket_path(host: str, port: int) -> str:
+    return os.path.join(tempfile.gettempdir(), f"acl-{endpoint_key(host, port)[0]}-{port}.sock")
+
+
+def remove_stale_unix_socket(path: str):
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise OSError(f"Unix socket {path} is already in use")
+    finally:
+        probe.close()
+
+
+def connect_socket(destination: tuple, timeout: float, unix: bool = False) -> socket.socket:
+    host, port = destination
+    if unix and is_local_host(host):
+        path = unix_socket_path(host, port)
+        if os.path.exists(path):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            try:
+                sock.connect(path)
+                sock.settimeout(None)
+                return sock
+            except OSError:
+                sock.close()
+    sock = socket.create_connection(destination, timeout=timeout)
+    sock.settimeout(None)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+class ConnectionPool:
+    def __init__(self, max_idle_per_destination: int = 4, idle_timeout: float = 30.0, connect_timeout: float = 5.0,
+                 handshake=None, unix: bool = False):
+        self.max_idle_per_destination = max_idle_per_destination
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.handshake = handshake
+        self.unix = unix
+        self.idle_connections = {}
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0, "evictions": 0}
+    
+    def _connect(self, destination: tuple) -> socket.socket:
+        sock = connect_socket(destination, self.connect_timeout, self.unix)
+        if self.handshake is not None:
+            try:
+                session = self.handshake(sock)
+            except (OSError, FrameError, ValueError):
+                sock.close()
+                raise
+            with self.lock:
+                self.sessions[destination] = session
+        with self.lock:
+            self.stats["connects"] += 1
+        return sock
+    
+    def session(self, host: str, port: int):
+        destination = (host, port)
+        if destination not in self.sessions:
+            self.release(host, port, self.acquire(host, port))
+        return self.sessions.get(destination)
+    
+    @staticmethod
+    def is_alive(sock: socket.socket) -> bool:
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+            if readable:
+                return sock.recv(1, socket.MSG_PEEK) != b""
+        except (OSError, ValueError):
+            return False
+        return True
+    
+    def acquire(self, host: str, port: int) -> socket.socket:
+        destination = (host, port)
+        now = time.monotonic()
+        stale = []
+        sock = None
+        with self.lock:
+            connections = self.idle_connections.get(destination, [])
+            while connections:
+                candidate, last_used = connections.pop()
+                if now - last_used > self.idle_timeout or not self.is_alive(candidate):
+                    stale.append(candidate)
+                    continue
+                sock = candidate
+                self.stats["reuses"] += 1
+                break
+            self.stats["evictions"] += len(stale)
+        for candidate in stale:
+            candidate.close()
+        if sock is None:
+            sock = self._connect(destination)
+        return sock
+    
+    def release(self, host: str, port: int, sock: socket.socket):
+        with self.lock:
+            connections = self.idle_connections.setdefault((host, port), [])
+            if len(connections) < self.max_idle_per_destination:
+                connections.append((sock, time.monotonic()))
+                return
+        sock.close()
+    
+    def send(self, host: str, port: int, data: bytes):
+        sock = self.acquire(host, port)
+        try:
+            sock.sendall(data)
+        except OSError:
+            sock.close()
+            with self.lock:
+                self.stats["reconnects"] += 1
+            sock = self._connect((host, port))
+            try:
+                sock.sendall(data)
+            except OSError:
+                sock.close()
+                raise
+        self.release(host, port, sock)
+    
+    def evict_idle(self):
+        now = time.monotonic()
+        expired = []
+        with self.lock:
+            for destination, connections in self.idle_connections.items():
+                keep = []
+                for sock, last_used in connections:
+                    if now - last_used > self.idle_timeout:
+                        expired.append(sock)
+                    else:
+                        keep.append((sock, last_used))
+                self.idle_connections[destination] = keep
+            self.stats["evictions"] += len(expired)
+        for sock in expired:
+            sock.close()
+        return len(expired)
+    
+    def close(self):
+        with self.lock:
+            connections = [sock for idle in self.idle_connections.values() for sock, _ in idle]
+            self.idle_connections.clear()
+        for sock in connections:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+
+class SendBatcher:
+    def __init__(self, name: str, send, max_batch: int = 32, linger_us: int = 500,
+                 max_bytes: int = 1024 * 1024):
+        self.name = name
+        self.send = send
+        self.max_batch = max_batch
+        self.linger = linger_us / 1e6
+        self.max_bytes = max_bytes
+        self.frames = []
+        self.size = 0
+        self.deadline = None
+        self.closed = False
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.thread = None
+        self.stats = {"batches": 0, "messages": 0, "full": 0, "lingered": 0}
+    
+    def add(self, frame: bytes):
+        with self.lock:
+            self.frames.append(frame)
+            self.size += len(frame)
+            full = len(self.frames) >= self.max_batch or self.size >= self.max_bytes
+            if not self.closed and not full:
+                if len(self.frames) == 1:
+                    self.deadline = time.monotonic() + self.linger
+                    if self.thread is None:
+                        self.thread = threading.Thread(target=self._run, name=f"{self.name}-batcher", daemon=True)
+                        self.thread.start()
+                    self.wakeup.notify()
+                return
+            if full:
+                self.stats["full"] += 1
+        self.flush()
+    
+    def flush(self):
+        with self.send_lock:
+            with self.lock:
+                if not self.frames:
+                    return
+                frames = self.frames
+                self.frames = []
+                self.size = 0
+                self.deadline = None
+                self.stats["batches"] += 1
+                self.stats["messages"] += len(frames)
+            self.send(frames[0] if len(frames) == 1 else encode_batch(self.name, frames))
+    
+    def _run(self):
+        while True:
+            with self.lock:
+                if self.closed:
+                    return
+                if not self.frames:
+                    self.wakeup.wait()
+                    continue
+                remaining = self.deadline - time.monotonic()
+                if remaining > 0:
+                    self.wakeup.wait(remaining)
+                    continue
+                self.stats["lingered"] += 1
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[{self.name}] Failed to send batch: {e}")
+    
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.wakeup.notify()
+        self.flush()
+
+
+class EventLoopThread:
+    def __init__(self, name: str = "agent-platform-loop"):
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self.thread = None
+        self.lock = threading.Lock()
+    
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.loop.run_forever, name=self.name)
+                self.thread.daemon = True
+                self.thread.start()
+        return self
+    
+    def run(self, coro, timeout: Optional[float] = None):
+        if self.thread is not None and threading.current_thread() is self.thread:
+            raise RuntimeError("EventLoopThread.run() cannot block the loop it is waiting on")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+    
+    def call_soon(self, callback, *args):
+        self.loop.call_soon_threadsafe(callback, *args)
+    
+    def in_loop(self) -> bool:
+        return threading.current_thread() is self.thread
+
+
+_default_loop_thread = None
+_default_loop_lock = threading.Lock()
+
+
+def get_event_loop_thread() -> EventLoopThread:
+    global _default_loop_thread
+    with _default_loop_lock:
+        if _default_loop_thread is None:
+            _default_loop_thread = EventLoopThread().start()
+        return _default_loop_thread
+
+
+MAX_IOVEC = 64
+
+
+class SocketWriter:
+    def __init__(self, loop: asyncio.AbstractEventLoop, sock: socket.socket, codec: int = JSON_CODEC_ID):
+        self.loop = loop
+        self.sock = sock
+        self.codec = codec
+        self.buffers = deque()
+        self.buffered = 0
+        self.writing = False
+        self.closed = False
+        self.last_used = time.monotonic()
+        self.drain_waiter = None
+        self.drain_limit = 0
+        loop.add_reader(sock.fileno(), self._on_readable)
+    
+    def write_frame(self, frame, codec: int = JSON_CODEC_ID):
+        if codec != self.codec:
+            frame = transcode_frame(frame, self.codec)
+        self.write(FRAME_HEADER.pack(len(frame)), frame)
+    
+    def write(self, *buffers):
+        if self.closed:
+            raise ConnectionError("write to closed connection")
+        for buffer in buffers:
+            view = memoryview(buffer)
+            if view.nbytes:
+                self.buffers.append(view)
+                self.buffered += view.nbytes
+        self.last_used = time.monotonic()
+        if not self.writing:
+            self._flush()
+    
+    def _flush(self):
+        while self.buffers:
+            try:
+                sent = self.sock.sendmsg(list(itertools.islice(self.buffers, MAX_IOVEC)))
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                self.close()
+                return
+            self.buffered -= sent
+            while sent:
+                head = self.buffers[0]
+                if head.nbytes <= sent:
+                    sent -= head.nbytes
+                    self.buffers.popleft()
+                else:
+                    self.buffers[0] = head[sent:]
+                    sent = 0
+        if self.buffers and not self.writing:
+            self.loop.add_writer(self.sock.fileno(), self._flush)
+            self.writing = True
+        elif not self.buffers and self.writing:
+            self.loop.remove_writer(self.sock.fileno())
+            self.writing = False
+        if self.drain_waiter is not None and self.buffered <= self.drain_limit:
+            self._wake_drain()
+    
+    def _wake_drain(self):
+        if self.drain_waiter is not None and not self.drain_waiter.done():
+            self.drain_waiter.set_result(None)
+        self.drain_waiter = None
+    
+    async def drain(self, limit: int = 0):
+        while self.buffered > limit and not self.closed:
+            self.drain_limit = limit
+            self.drain_waiter = self.loop.create_future()
+            await self.drain_waiter
+    
+    def _on_readable(self):
+        try:
+            data = self.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.close()
+    
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.loop.remove_reader(self.sock.fileno())
+        if self.writing:
+            self.loop.remove_writer(self.sock.fileno())
+            self.writing = False
+        self.sock.close()
+        self.buffers.clear()
+        self.buffered = 0
+        self._wake_drain()
+
+
+class AsyncConnectionPool:
+    def __init__(self, idle_timeout: float = 30.0, connect_timeout: float = 5.0, pooled: bool = True,
+                 codecs: Optional[List[int]] = None, unix: bool = False):
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.pooled = pooled
+        self.codecs = codecs
+        self.unix = unix
+        self.connections = {}
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0, "evictions": 0, "failures": 0}
+    
+    async def writer(self, host: str, port: int) -> SocketWriter:
+        destination = (host, port)
+        writer = self.connections.get(destination)
+        if writer is not None:
+            if not writer.closed:
+                self.stats["reuses"] += 1
+                return writer
+            del self.connections[destination]
+            self.stats["reconnects"] += 1
+        try:
+            sock = await self._open(destination)
+            try:
+                codec = await self._handshake(sock) if self.codecs else JSON_CODEC_ID
+            except BaseException:
+                sock.close()
+                raise
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+        writer = SocketWriter(asyncio.get_running_loop(), sock, codec)
+        self.connections[destination] = writer
+        return writer
+    
+    async def _open(self, destination: tuple) -> socket.socket:
+        if self.unix and is_local_host(destination[0]):
+            path = unix_socket_path(*destination)
+            if os.path.exists(path):
+                try:
+                    return await self._connect(socket.AF_UNIX, path)
+                except OSError:
+                    pass
+        return await self._connect(socket.AF_INET, destination)
+    
+    async def _connect(self, family: int, address) -> socket.socket:
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        if family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, address), self.connect_timeout)
+        except BaseException:
+            sock.close()
+            raise
+        self.stats["connects"] += 1
+        return sock
+    
+    async def _handshake(self, sock: socket.socket) -> int:
+        loop = asyncio.get_running_loop()
+        await loop.sock_sendall(sock, encode_control({"type": "hello", "codecs": self.codecs}))
+        reader = FrameReader()
+        
+        async def read_reply():
+            while True:
+                data = await loop.sock_recv(sock, 4096)
+                if not data:
+                    raise ConnectionError("Peer closed the connection during the codec handshake")
+                frames = reader.feed(data)
+                if frames:
+                    return frames[0]
+        
+        reply = await asyncio.wait_for(read_reply(), self.connect_timeout)
+        return decode_control(decode_envelope(reply)).get("codec", JSON_CODEC_ID)
+    
+    async def send_once(self, host: str, port: int, frame, codec: int = JSON_CODEC_ID):
+        frame = transcode_frame(frame, JSON_CODEC_ID) if codec != JSON_CODEC_ID else frame
+        try:
+            sock = await self._open((host, port))
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+        try:
+            await asyncio.get_running_loop().sock_sendall(sock, FRAME_HEADER.pack(len(frame)) + bytes(frame))
+        finally:
+            sock.close()
+    
+    def evict_idle(self) -> int:
+        now = time.monotonic()
+        expired = [destination for destination, writer in self.connections.items()
+                   if writer.closed or (not writer.buffers and now - writer.last_used > self.idle_timeout)]
+        for destination in expired:
+            self.connections.pop(destination).close()
+        self.stats["evictions"] += len(expired)
+        return len(expired)
+    
+    def close(self):
+        for writer in self.connections.values():
+            writer.close()
+        self.connections.clear()
+
+
+class MultiLevelQueue:
+    def __init__(self, levels: int = len(PRIORITIES), starvation_limit: int = 32):
+        self.levels = [deque() for _ in range(levels)]
+        self.starvation_limit = starvation_limit
+        self.passed_over = [0] * levels
+        self.size = 0
+        self.stats = {"aged": 0}
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def append(self, item, level: int = DEFAULT_PRIORITY_LEVEL):
+        self.levels[min(max(level, 0), len(self.levels) - 1)].append(item)
+        self.size += 1
+    
+    def _next_level(self) -> int:
+        first = None
+        for level, queue in enumerate(self.levels):
+            if not queue:
+                continue
+            if first is None:
+                first = level
+            elif self.passed_over[level] >= self.starvation_limit:
+                return level
+        if first is None:
+            raise IndexError("pop from an empty MultiLevelQueue")
+        return first
+    
+    def peek(self):
+        return self.levels[self._next_level()][0]
+    
+    def popleft(self):
+        chosen = self._next_level()
+        for level in range(chosen + 1, len(self.levels)):
+            if self.levels[level]:
+                self.passed_over[level] += 1
+        if self.passed_over[chosen] >= self.starvation_limit:
+            self.stats["aged"] += 1
+        self.passed_over[chosen] = 0
+        self.size -= 1
+        return self.levels[chosen].popleft()
+    
+    def evict(self, predicate, min_level: int = 0):
+        for level in range(len(self.levels) - 1, min_level - 1, -1):
+            queue = self.levels[level]
+            for index, item in enumerate(queue):
+                if predicate(item):
+                    del queue[index]
+                    self.size -= 1
+                    return item
+        return None
+    
+    def drain(self) -> list:
+        items = [item for queue in self.levels for item in queue]
+        self.clear()
+        return items
+    
+    def clear(self):
+        for queue in self.levels:
+            queue.clear()
+        self.passed_over = [0] * len(self.levels)
+        self.size = 0
+
+
+SHED_POLICIES = ("drop-oldest-inform", "reject-new")
+
+
+class BoundedOutbox(ABC):
+    def __init__(self, destination: tuple, capacity: int = 4096, policy: str = "drop-oldest-inform",
+                 on_reject=None):
+        if policy not in SHED_POLICIES:
+            raise ValueError(f"Unknown shed policy: {policy}")
+        self.destination = destination
+        self.capacity = capacity
+        self.policy = policy
+        self.pause_depth = max(1, capacity * 3 // 4)
+        self.resume_depth = capacity // 4
+        self.on_reject = on_reject
+        self.queue = MultiLevelQueue()
+        self.ready = asyncio.Event()
+        self.resumed = asyncio.Event()
+        self.resumed.set()
+        self.accepting = threading.Event()
+        self.accepting.set()
+        self.stalled = False
+        self.task = None
+        self.stats = {"enqueued": 0, "delivered": 0, "failed": 0, "shed": 0, "rejected": 0, "paused": 0}
+    
+    @abstractmethod
+    def performative(self, item) -> Optional[str]:
+        ...
+    
+    @abstractmethod
+    async def run(self):
+        ...
+    
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+    
+    def offer(self, item, priority: int = DEFAULT_PRIORITY_LEVEL, bounded: bool = True) -> bool:
+        if bounded and len(self.queue) >= self.capacity:
+            evicted = None
+            if self.policy == "drop-oldest-inform":
+                evicted = self.queue.evict(lambda queued: self.performative(queued) == "inform", priority)
+            if evicted is None:
+                self.stats["rejected"] += 1
+                self._reject(item, "overloaded")
+                return False
+            self.stats["shed"] += 1
+        self.queue.append(item, priority)
+        self.stats["enqueued"] += 1
+        if len(self.queue) >= self.pause_depth and self.resumed.is_set():
+            self.resumed.clear()
+            self.accepting.clear()
+            self.stats["paused"] += 1
+        self.ready.set()
+        return True
+    
+    def take(self):
+        item = self.queue.popleft()
+        if not self.resumed.is_set() and len(self.queue) <= self.resume_depth:
+            self._resume()
+        return item
+    
+    def congested(self) -> bool:
+        return not self.resumed.is_set() and not self.stalled
+    
+    def drop_all(self, reason: str) -> int:
+        items = self.queue.drain()
+        self.stats["failed"] += len(items)
+        for item in items:
+            self._reject(item, reason)
+        self._resume()
+        return len(items)
+    
+    def _reject(self, item, reason: str):
+        if self.on_reject is not None and self.performative(item) == "request":
+            self.on_reject(item, reason)
+    
+    def _resume(self):
+        self.stalled = False
+        self.resumed.set()
+        self.accepting.set()
+    
+    def depth(self) -> int:
+        return len(self.queue)
+    
+    def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.queue.clear()
+        self._resume()
+
+
+class Outbox(BoundedOutbox):
+    def __init__(self, destination: tuple, pool: AsyncConnectionPool, retry_delay: float = 1.0,
+                 high_water: int = 64 * 1024, **kwargs):
+        super().__init__(destination, **kwargs)
+        self.pool = pool
+        self.retry_delay = retry_delay
+        self.high_water = high_water
+        self.start()
+    
+    def performative(self, item) -> Optional[str]:
+        return item[2]
+    
+    def put(self, frame, codec: int = JSON_CODEC_ID, priority: int = DEFAULT_PRIORITY_LEVEL,
+            performative: Optional[str] = None, bounded: bool = True) -> bool:
+        return self.offer((frame, codec, performative), priority, bounded)
+    
+    async def run(self):
+        host, port = self.destination
+        while True:
+            if not self.queue:
+                self.ready.clear()
+                await self.ready.wait()
+                continue
+            try:
+                if self.pool.pooled:
+                    await self._drain_to(await self.pool.writer(host, port))
+                else:
+                    frame, codec, _ = self.queue.peek()
+                    await self.pool.send_once(host, port, frame, codec)
+                    self.take()
+                    self.stats["delivered"] += 1
+            except (OSError, FrameError, ValueError, asyncio.TimeoutError) as e:
+                dropped = self.drop_all("unreachable")
+                print(f"[TRANSPORT] Failed to send {dropped} message(s) to {host}:{port}: {e!r}")
+                await asyncio.sleep(self.retry_delay)
+    
+    async def _drain_to(self, writer: SocketWriter):
+        while self.queue and not writer.closed:
+            frame, codec, _ = self.take()
+            writer.write_frame(frame, codec)
+            self.stats["delivered"] += 1
+            if writer.buffered > self.high_water:
+                await writer.drain(self.high_water // 2)
+
+
+class LocalOutbox(BoundedOutbox):
+    def __init__(self, destination: tuple, agent, **kwargs):
+        super().__init__(destination, **kwargs)
+        self.agent = agent
+        self.start()
+    
+    def performative(self, item) -> Optional[str]:
+        return item.performative
+    
+    def put(self, msg: ACLMessage, bounded: bool = True) -> bool:
+        return self.offer(msg, priority_level(msg.priority), bounded)
+    
+    async def run(self):
+        while True:
+            if not self.queue:
+                self.ready.clear()
+                await self.ready.wait()
+                continue
+            msg = self.take()
+            try:
+                await self.agent.deliver(msg)
+                self.stats["delivered"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"[TRANSPORT] Failed to deliver to {self.agent.name}: {e!r}")
+
+
+_spill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="message-log-spill")
+
+
+class MessageLog:
+    def __init__(self, name: str = "messages", capacity: int = 10000, spill_dir: Optional[str] = None,
+                 segment_bytes: int = 16 * 1024 * 1024, max_segments: Optional[int] = None):
+        self.name = name
+        self.instance = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.capacity = max(1, capacity)
+        self.spill_dir = spill_dir
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.entries = deque()
+        self.spilling = deque()
+        self.spill_future = None
+        self.segments = []
+        self.current = None
+        self.spilled = 0
+        self.discarded = 0
+        self.lock = threading.Lock()
+    
+    def append(self, entry: Dict):
+        with self.lock:
+            self.entries.append(entry)
+            if len(self.entries) > self.capacity:
+                for _ in range(max(1, self.capacity // 4)):
+                    self.spilling.append(self.entries.popleft())
+                if self.spill_future is None:
+                    self.spill_future = _spill_executor.submit(self._spill)
+    
+    def __len__(self) -> int:
+        return self.spilled - self.discarded + len(self.spilling) + len(self.entries)
+    
+    def __iter__(self):
+        with self.lock:
+            segments = [(path, size) for path, size, _ in self.segments]
+            in_memory = list(self.spilling) + list(self.entries)
+        for path, size in segments:
+            try:
+                yield from self._read_segment(path, size)
+            except FileNotFoundError:
+                continue
+        yield from in_memory
+    
+    def tail(self, count: int) -> List[Dict]:
+        with self.lock:
+            if count <= len(self.entries):
+                return list(self.entries)[len(self.entries) - count:]
+        return list(deque(self, maxlen=count))
+    
+    def flush(self):
+        with self.lock:
+            future = self.spill_future
+        if future is not None:
+            future.result()
+    
+    def close(self):
+        self.flush()
+        with self.lock:
+            if self.current is not None:
+                self.current.close()
+                self.current = None
+    
+    def _spill(self):
+        try:
+            while True:
+                with self.lock:
+                    if not self.spilling:
+                        self.spill_future = None
+                        return
+                    batch = list(self.spilling)
+                written = size = 0
+                for entry in batch:
+                    if self.current is None or self.segments[-1][1] + size >= self.segment_bytes:
+                        self._commit(written, size)
+                        written = size = 0
+                        self._rotate()
+                    record = self._encode_entry(entry)
+                    self.current.write(record)
+                    written += 1
+                    size += len(record)
+                self._commit(written, size)
+        except Exception as e:
+            with self.lock:
+                dropped = len(self.spilling)
+                self.spilling.clear()
+                self.spill_future = None
+            print(f"[TRANSPORT] Failed to spill {dropped} {self.name} log entries: {e!r}")
+    
+    def _commit(self, written: int, size: int):
+        if not written:
+            return
+        self.current.flush()
+        with self.lock:
+            self.segments[-1][1] += size
+            self.segments[-1][2] += written
+            self.spilled += written
+            for _ in range(written):
+                self.spilling.popleft()
+    
+    def _rotate(self):
+        if self.current is not None:
+            self.current.close()
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix=f"acl-{self.name}-")
+            weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"{self.name}-{self.instance}-{self.spilled:012d}.log")
+        self.current = open(path, "wb")
+        expired = []
+        with self.lock:
+            self.segments.append([path, 0, 0])
+            if self.max_segments is not None:
+                while len(self.segments) > self.max_segments:
+                    expired_path, _, entry_count = self.segments.pop(0)
+                    expired.append(expired_path)
+                    self.discarded += entry_count
+        for expired_path in expired:
+            try:
+                os.remove(expired_path)
+            except FileNotFoundError:
+                pass
+    
+    @staticmethod
+    def _encode_entry(entry: Dict) -> bytes:
+        metadata = {key: value for key, value in entry.items() if key != "message"}
+        message = entry.get("message", b"")
+        if isinstance(message, ACLMessage):
+            message = message.to_json()
+        if isinstance(message, str):
+            metadata["message_type"] = "str"
+            message = message.encode('utf-8')
+        return encode_frame(json.dumps(metadata).encode('utf-8')) + encode_frame(bytes(message))
+    
+    @staticmethod
+    def _read_segment(path: str, size: int):
+        reader = FrameReader()
+        metadata = None
+        remaining = size
+        with open(path, "rb") as segment:
+            while remaining > 0:
+                chunk = segment.read(min(65536, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                for frame in reader.feed(chunk):
+                    if metadata is None:
+                        metadata = json.loads(frame)
+                        continue
+                    entry = metadata
+                    entry["message"] = frame.decode('utf-8') if entry.pop("message_type", None) == "str" else frame
+                    metadata = None
+                    yield entry
+
+
+async def start_servers(handler, host: str, port: int, transport: str, backlog: int):
+    servers = []
+    unix_path = None
+    if transport in ("auto", "tcp"):
+        server = await asyncio.start_server(handler, host, port, backlog=backlog)
+        servers.append(server)
+        port = server.sockets[0].getsockname()[1]
+    elif port == 0:
+        if transport == "unix":
+            raise ValueError("The unix transport needs an explicit port to derive its socket path")
+        port = next(_inproc_ports)
+    if transport in ("auto", "unix"):
+        unix_path = unix_socket_path(host, port)
+        try:
+            remove_stale_unix_socket(unix_path)
+            servers.append(await asyncio.start_unix_server(handler, unix_path, backlog=backlog))
+        except BaseException:
+            stop_servers(servers, None)
+            raise
+    return port, unix_path, servers
+
+
+def remove_unix_socket(path: Optional[str]):
+    if path is not None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def stop_servers(servers: list, unix_path: Optional[str]):
+    for server in servers:
+        server.close()
+    remove_unix_socket(unix_path)
+
+
+class HashRing:
+    def __init__(self, nodes=(), replicas: int = 64):
+        self.replicas = replicas
+        self.nodes = set()
+        self.keys = []
+        self.owners = []
+        self.cache = {}
+        for node in nodes:
+            self.add(node)
+    
+    def __len__(self) -> int:
+        return len(self.nodes)
+    
+    def __contains__(self, node: str) -> bool:
+        return node in self.nodes
+    
+    @staticmethod
+    def hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), "big")
+    
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for replica in range(self.replicas):
+            point = self.hash(f"{node}#{replica}")
+            index = bisect.bisect(self.keys, point)
+            self.keys.insert(index, point)
+            self.owners.insert(index, node)
+        self.cache.clear()
     
-    def set_reply_to(self, reply_with: str):
-        self.in_reply_to = reply_with
+    def remove(self, node: str):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        points = [(point, owner) for point, owner in zip(self.keys, self.owners) if owner != node]
+        self.keys = [point for point, _ in points]
+        self.owners = [owner for _, owner in points]
+        self.cache.clear()
     
-    def to_json(self) -> str:
-        return json.dumps({
-            "performative": self.performative,
-            "sender": self.sender,
-            "receivers": self.receivers,
-            "content": self.content,
-            "conversation_id": self.conversation_id,
-            "reply_with": self.reply_with,
-            "in_reply_to": self.in_reply_to,
-            "language": self.language,
-            "ontology": self.ontology,
-            "protocol": self.protocol,
-            "timestamp": self.timestamp
-        })
+    def owner(self, key: str) -> Optional[str]:
+        owner = self.cache.get(key)
+        if owner is None and self.keys:
+            owner = self.owners[bisect.bisect(self.keys, self.hash(key)) % len(self.keys)]
+            self.cache[key] = owner
+        return owner
+
+
+SERVICE_PREFIXES = ("any", "all")
+
+
+class CapabilityIndex:
+    def __init__(self):
+        self.loads = {}
+        self.buckets = {}
+        self.min_load = 0
     
-    @classmethod
-    def from_json(cls, json_str: str):
-        data = json.loads(json_str)
-        msg = cls(
-            performative=data["performative"],
-            sender=data["sender"],
-            receivers=data["receivers"],
-            content=data["content"]
-        )
-        msg.conversation_id = data["conversation_id"]
-        msg.reply_with = data["reply_with"]
-        msg.in_reply_to = data["in_reply_to"]
-        msg.language = data["language"]
-        msg.ontology = data["ontology"]
-        msg.protocol = data["protocol"]
-        msg.timestamp = data["timestamp"]
-        return msg
+    def __len__(self) -> int:
+        return len(self.loads)
+    
+    def add(self, agent_name: str, load: int = 0):
+        if agent_name in self.loads:
+            return
+        self.loads[agent_name] = load
+        self.buckets.setdefault(load, {})[agent_name] = None
+        if len(self.loads) == 1 or load < self.min_load:
+            self.min_load = load
+    
+    def remove(self, agent_name: str):
+        load = self.loads.pop(agent_name, None)
+        if load is None:
+            return
+        self._take(agent_name, load)
+        if load == self.min_load:
+            self._advance()
+    
+    def adjust(self, agent_name: str, delta: int):
+        load = self.loads.get(agent_name)
+        if load is None:
+            return
+        new_load = max(0, load + delta)
+        self._take(agent_name, load)
+        self.loads[agent_name] = new_load
+        self.buckets.setdefault(new_load, {})[agent_name] = None
+        if new_load < self.min_load:
+            self.min_load = new_load
+        elif load == self.min_load:
+            self._advance()
+    
+    def least_loaded(self) -> Optional[str]:
+        bucket = self.buckets.get(self.min_load)
+        return next(iter(bucket)) if bucket else None
+    
+    def _take(self, agent_name: str, load: int):
+        bucket = self.buckets[load]
+        del bucket[agent_name]
+        if not bucket:
+            del self.buckets[load]
+    
+    def _advance(self):
+        if not self.loads:
+            self.min_load = 0
+            return
+        while self.min_load not in self.buckets:
+            self.min_load += 1
+
+
+COMPLETING_PERFORMATIVES = ("inform", "failure", "refuse", "not-understood")
+
+
+class DirectoryFacilitator:
+    def __init__(self, in_flight_ttl: float = 30.0):
+        self.in_flight_ttl = in_flight_ttl
+        self.services = {}
+        self.agent_services = {}
+        self.in_flight = {}
+        self.expiry = deque()
+        self.addresses = {}
+        self.stats = {"resolved_any": 0, "resolved_all": 0, "unresolved": 0, "completed": 0, "expired": 0}
+    
+    def register(self, agent_name: str, capabilities):
+        self.deregister(agent_name)
+        capabilities = list(capabilities or [])
+        self.agent_services[agent_name] = capabilities
+        for capability in capabilities:
+            self.services.setdefault(capability, CapabilityIndex()).add(agent_name)
+        self.addresses.clear()
+    
+    def deregister(self, agent_name: str):
+        for capability in self.agent_services.pop(agent_name, []):
+            index = self.services.get(capability)
+            if index is not None:
+                index.remove(agent_name)
+                if not index:
+                    del self.services[capability]
+        self.addresses.clear()
+    
+    def search(self, capability: str) -> List[str]:
+        index = self.services.get(capability)
+        return list(index.loads) if index is not None else []
+    
+    def parse(self, receiver: str) -> Optional[tuple]:
+        address = self.addresses.get(receiver)
+        if address is None:
+            prefix, separator, capability = receiver.partition(":")
+            address = (prefix, capability) if separator and prefix in SERVICE_PREFIXES else ()
+            self.addresses[receiver] = address
+        return address or None
+    
+    def _adjust(self, agent_name: str, delta: int):
+        for capability in self.agent_services.get(agent_name, ()):
+            self.services[capability].adjust(agent_name, delta)
+    
+    def _expire(self, now: float):
+        while self.expiry and self.expiry[0][0] <= now:
+            deadline, key = self.expiry.popleft()
+            if self.in_flight.get(key) == deadline:
+                del self.in_flight[key]
+                self._adjust(key[0], -1)
+                self.stats["expired"] += 1
+    
+    def route(self, sender: str, conversation_id: str, receivers: List[str],
+              performative: Optional[str] = None) -> List[str]:
+        if self.in_flight:
+            self._expire(time.monotonic())
+            if performative in COMPLETING_PERFORMATIVES and \
+                    self.in_flight.pop((sender, conversation_id), None) is not None:
+                self._adjust(sender, -1)
+                self.stats["completed"] += 1
+        if not self.services:
+            return receivers
+        resolved = None
+        for position, receiver in enumerate(receivers):
+            address = self.parse(receiver)
+            if address is None:
+                if resolved is not None:
+                    resolved.append(receiver)
+                continue
+            if resolved is None:
+                resolved = receivers[:position]
+            mode, capability = address
+            index = self.services.get(capability)
+            if index is None:
+                self.stats["unresolved"] += 1
+                print(f"[TRANSPORT] No agent offers {capability}")
+                continue
+            if mode == "all":
+                self.stats["resolved_all"] += 1
+                resolved.extend(index.loads)
+                continue
+            agent_name = index.least_loaded()
+            self.stats["resolved_any"] += 1
+            resolved.append(agent_name)
+            key = (agent_name, conversation_id)
+            if key not in self.in_flight:
+                deadline = time.monotonic() + self.in_flight_ttl
+                self.in_flight[key] = deadline
+                self.expiry.append((deadline, key))
+                self._adjust(agent_name, 1)
+        if resolved is None:
+            return receivers
+        print(f"[TRANSPORT] Resolved {receivers} to {resolved}")
+        return resolved
+    
+    def loads(self, capability: str) -> Dict[str, int]:
+        index = self.services.get(capability)
+        return dict(index.loads) if index is not None else {}
+
+
+MAX_REGISTER_HOPS = 2
+REGISTER_RETRY_DELAY = 0.5
+
+
+def shard_address(address: str) -> tuple:
+    host, _, port = address.rpartition(":")
+    return host, int(port)
 
 
 class MessageTransportService:
-    def __init__(self, host: str = "localhost", port: int = 5000):
+    def __init__(self, host: str = "localhost", port: int = 5000, pooled: bool = True,
+                 loop_thread: Optional[EventLoopThread] = None, codecs=DEFAULT_CODECS,
+                 log_capacity: int = 10000, log_dir: Optional[str] = None, transport: str = "auto",
+                 outbox_capacity: int = 4096, shed_policy: str = "drop-oldest-inform", pause_timeout: float = 1.0,
+                 compression: Optional[str] = None, compression_threshold: int = 4096):
+        if shed_policy not in SHED_POLICIES:
+            raise ValueError(f"Unknown shed policy: {shed_policy}")
         self.host = host
         self.port = port
+        self.transport = check_transport(transport)
         self.agents = {}
-        self.message_log = []
-        self.server_socket = None
+        self.directory = DirectoryFacilitator()
+        self.message_log = MessageLog("mts", log_capacity, log_dir)
+        self.servers = []
+        self.unix_path = None
         self.running = False
+        self.loop_thread = loop_thread or get_event_loop_thread()
+        self.codecs = codec_ids(codecs)
+        self.compression = check_compression(compression)
+        self.compression_threshold = compression_threshold
+        self.pool = AsyncConnectionPool(pooled=pooled, codecs=self.codecs, unix=self.transport != "tcp")
+        self.outboxes = {}
+        self.outbox_capacity = outbox_capacity
+        self.shed_policy = shed_policy
+        self.pause_timeout = pause_timeout
+        self.overload = {"failure_replies": 0, "paused_reads": 0, "paused_posts": 0, "stalled": 0}
+        self.clients = set()
+        self.eviction_task = None
+        self.address = None
+        self.ring = HashRing()
+        self.joined = threading.Event()
+        self.unowned = {}
+        self.unowned_retry = None
+        self.peer_services = {}
+        self.services_pending = False
     
     def start(self):
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen(10)
+        self.loop_thread.start()
+        self.loop_thread.run(self._start_server())
         self.running = True
         
-        print(f"Message Transport Service started on {self.host}:{self.port}")
-        
-        def accept_connections():
-            while self.running:
-                try:
-                    client_socket, address = self.server_socket.accept()
-                    thread = threading.Thread(target=self.handle_client, args=(client_socket, address))
-                    thread.daemon = True
-                    thread.start()
-                except:
-                    break
-        
-        thread = threading.Thread(target=accept_connections)
-        thread.daemon = True
-        thread.start()
+        print(f"Message Transport Service started on {self.host}:{self.port} ({self.transport})")
+    
+    async def _start_server(self):
+        self.port, self.unix_path, self.servers = await start_servers(self.handle_client, self.host, self.port,
+                                                                      self.transport, 1024)
+        self.address = f"{self.host}:{self.port}"
+        self.ring.add(self.address)
+        if self.unix_path is not None:
+            weakref.finalize(self, remove_unix_socket, self.unix_path)
+        if self.transport in ("auto", "inproc"):
+            bind_local_endpoint(self.host, self.port, self)
+        self.eviction_task = asyncio.ensure_future(self._evict_idle_connections())
+    
+    async def _evict_idle_connections(self):
+        while True:
+            await asyncio.sleep(self.pool.idle_timeout / 2)
+            self.pool.evict_idle()
     
     def stop(self):
+        if self.running:
+            self.loop_thread.run(self._stop_server())
         self.running = False
-        if self.server_socket:
-            self.server_socket.close()
     
-    def register_agent(self, agent_name: str, host: str, port: int):
-        self.agents[agent_name] = {"host": host, "port": port}
-        print(f"Agent '{agent_name}' registered at {host}:{port}")
+    async def _stop_server(self):
+        if len(self.ring) > 1:
+            await self._leave()
+        unbind_local_endpoint(self.host, self.port, self)
+        stop_servers(self.servers, self.unix_path)
+        if self.eviction_task:
+            self.eviction_task.cancel()
+        if self.unowned_retry is not None:
+            self.unowned_retry.cancel()
+            self.unowned_retry = None
+        for writer in list(self.clients):
+            writer.close()
+        for outbox in self.outboxes.values():
+            outbox.close()
+        self.outboxes.clear()
+        self.pool.close()
+    
+    def register_agent(self, agent_name: str, host: str, port: int, capabilities: Optional[List[str]] = None):
+        agent_info = {"host": host, "port": port, "capabilities": list(capabilities or [])}
+        owner = self.ring.owner(agent_name)
+        if owner is None or owner == self.address:
+            self._add_agent(agent_name, agent_info)
+            return
+        agents = {agent_name: agent_info}
+        if self.loop_thread.in_loop():
+            self._register_remote(agents)
+        else:
+            self.loop_thread.call_soon(self._register_remote, agents)
+    
+    def _add_agent(self, agent_name: str, agent_info: Dict):
+        self.agents[agent_name] = agent_info
+        self.directory.register(agent_name, agent_info.get("capabilities"))
+        self._share_services()
+        print(f"Agent '{agent_name}' registered at {agent_info['host']}:{agent_info['port']}")
+    
+    def _remove_agent(self, agent_name: str) -> Dict:
+        agent_info = self.agents.pop(agent_name)
+        self._refresh_services([agent_name])
+        self._share_services()
+        return agent_info
+    
+    def _share_services(self):
+        if len(self.ring) > 1 and not self.services_pending:
+            self.services_pending = True
+            self.loop_thread.call_soon(self._send_services)
+    
+    def _send_services(self):
+        self.services_pending = False
+        agents = {agent_name: agent_info.get("capabilities", []) for agent_name, agent_info in self.agents.items()}
+        message = {"type": "services", "shard": self.address, "agents": agents}
+        for shard in self.ring.nodes - {self.address}:
+            self.send_control(shard, message)
+    
+    def _set_peer_services(self, shard: str, agents: Dict):
+        previous = self.peer_services.pop(shard, {})
+        if agents:
+            self.peer_services[shard] = agents
+        self._refresh_services(set(previous) | set(agents))
+    
+    def _refresh_services(self, agent_names):
+        for agent_name in agent_names:
+            if agent_name in self.agents:
+                continue
+            capabilities = next((agents[agent_name] for agents in self.peer_services.values()
+                                 if agent_name in agents), None)
+            if capabilities is None:
+                self.directory.deregister(agent_name)
+            elif self.directory.agent_services.get(agent_name) != capabilities:
+                self.directory.register(agent_name, capabilities)
+    
+    def join(self, seed_host: str, seed_port: int, timeout: float = 5.0) -> bool:
+        self.joined.clear()
+        self.loop_thread.call_soon(self.send_control, f"{seed_host}:{seed_port}",
+                                   {"type": "join", "shard": self.address})
+        joined = self.joined.wait(timeout)
+        print(f"[TRANSPORT] Shard {self.address} joined via {seed_host}:{seed_port}: {sorted(self.ring.nodes)}")
+        return joined
+    
+    def send_control(self, shard: str, message: Dict):
+        host, port = shard_address(shard)
+        self.outbox(host, port).put(memoryview(encode_control(message))[FRAME_HEADER.size:],
+                                    priority=PRIORITY_LEVELS["critical"], bounded=False)
+    
+    def handle_control(self, envelope: Envelope, writer: asyncio.StreamWriter):
+        request = decode_control(envelope)
+        kind = request.get("type")
+        if kind == "hello":
+            answer_control(envelope, writer, self.codecs)
+        elif kind == "join":
+            self.ring.add(request["shard"])
+            members = {"type": "members", "shards": sorted(self.ring.nodes)}
+            for shard in self.ring.nodes - {self.address}:
+                self.send_control(shard, members)
+            self._rebalance()
+            self._share_services()
+        elif kind == "members":
+            self._set_members(request["shards"])
+        elif kind == "register":
+            self._register_remote(request["agents"], request.get("hops", 0))
+        elif kind == "services":
+            self._set_peer_services(request["shard"], request["agents"])
+    
+    def _set_members(self, shards: List[str]):
+        for shard in self.ring.nodes - set(shards):
+            self.ring.remove(shard)
+            self._set_peer_services(shard, {})
+        for shard in shards:
+            self.ring.add(shard)
+        self.joined.set()
+        print(f"[TRANSPORT] Shard {self.address} members: {sorted(self.ring.nodes)}")
+        self._rebalance()
+        self._share_services()
+    
+    def _register_remote(self, agents: Dict, hops: int = 0):
+        moved = {}
+        for agent_name, agent_info in agents.items():
+            owner = self.ring.owner(agent_name)
+            if owner is None or owner == self.address:
+                self.unowned.pop(agent_name, None)
+                self._add_agent(agent_name, agent_info)
+            elif hops >= MAX_REGISTER_HOPS:
+                self.unowned[agent_name] = agent_info
+            else:
+                moved.setdefault(owner, {})[agent_name] = agent_info
+        for owner, owned in moved.items():
+            print(f"[TRANSPORT] Handing {len(owned)} agent(s) to shard {owner}")
+            self.send_control(owner, {"type": "register", "agents": owned, "hops": hops + 1})
+        if self.unowned and self.unowned_retry is None:
+            print(f"[TRANSPORT] Shard {self.address} holding {len(self.unowned)} registration(s) "
+                  f"until the shard views agree")
+            self.unowned_retry = self.loop_thread.loop.call_later(REGISTER_RETRY_DELAY, self._retry_unowned)
+    
+    def _retry_unowned(self):
+        self.unowned_retry = None
+        agents, self.unowned = self.unowned, {}
+        self._register_remote(agents)
     
-    def handle_client(self, client_socket: socket.socket, address):
+    def _rebalance(self):
+        moved = {}
+        for agent_name in list(self.agents):
+            if self.ring.owner(agent_name) != self.address:
+                moved[agent_name] = self._remove_agent(agent_name)
+        moved.update(self.unowned)
+        self.unowned.clear()
+        if moved:
+            self._register_remote(moved)
+    
+    async def _leave(self, timeout: float = 5.0):
+        shards = sorted(self.ring.nodes - {self.address})
+        self.ring.remove(self.address)
+        for shard in shards:
+            self.send_control(shard, {"type": "members", "shards": shards})
+        self._rebalance()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not any(outbox.depth() for outbox in self.outboxes.values()) and \
+                    not any(writer.buffered for writer in self.pool.connections.values()):
+                break
+            await asyncio.sleep(0.01)
+        print(f"[TRANSPORT] Shard {self.address} left; {len(shards)} shard(s) remain")
+    
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.clients.add(writer)
         try:
-            data = client_socket.recv(8192).decode('utf-8')
-            if data:
-                self.route_message(data)
-        except Exception as e:
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                if frame[1] & FLAG_CONTROL:
+                    self.handle_control(decode_envelope(frame), writer)
+                    continue
+                if frame[1] & FLAG_BATCH:
+                    congested = []
+                    for inner in decode_batch(decode_envelope(frame)):
+                        congested.extend(self.route_frame(inner))
+                else:
+                    congested = self.route_frame(frame)
+                if congested:
+                    await self._pause_reading(congested)
+        except (FrameError, OSError) as e:
             print(f"Error handling client: {e}")
         finally:
-            client_socket.close()
+            self.clients.discard(writer)
+            writer.close()
+    
+    async def _pause_reading(self, outboxes: List[BoundedOutbox]):
+        self.overload["paused_reads"] += 1
+        outboxes = set(outboxes)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(outbox.resumed.wait() for outbox in outboxes)),
+                                   self.pause_timeout)
+        except asyncio.TimeoutError:
+            for outbox in outboxes:
+                if outbox.congested():
+                    outbox.stalled = True
+                    self.overload["stalled"] += 1
+    
+    def post(self, msg: ACLMessage):
+        if self.loop_thread.in_loop():
+            self.route_object(msg)
+            return
+        self.loop_thread.call_soon(self.route_object, msg)
+        for receiver in msg.receivers:
+            agent_info = self.agents.get(receiver)
+            outbox = self.outboxes.get((agent_info["host"], agent_info["port"])) if agent_info else None
+            if outbox is not None and outbox.congested():
+                self.loop_thread.call_soon(self._count_overload, "paused_posts")
+                if not outbox.accepting.wait(self.pause_timeout):
+                    self.loop_thread.call_soon(self._stall, outbox)
+    
+    def _count_overload(self, counter: str):
+        self.overload[counter] += 1
+    
+    def _stall(self, outbox: BoundedOutbox):
+        if outbox.congested():
+            outbox.stalled = True
+            self.overload["stalled"] += 1
+    
+    def overload_stats(self) -> Dict:
+        outboxes = list(self.outboxes.values())
+        totals = dict(self.overload)
+        for counter in ("shed", "rejected", "failed", "paused"):
+            totals[counter] = sum(outbox.stats[counter] for outbox in outboxes)
+        totals["depth"] = sum(outbox.depth() for outbox in outboxes)
+        totals["destinations"] = {
+            f"{host}:{port}": dict(outbox.stats, depth=outbox.depth(), stalled=outbox.stalled)
+            for (host, port), outbox in list(self.outboxes.items())
+        }
+        return totals
+    
+    def _reject(self, item, reason: str):
+        if isinstance(item, ACLMessage):
+            msg = item
+        else:
+            envelope = decode_envelope(item[0])
+            msg = ACLMessage.decode(envelope.inflate(), envelope.codec)
+        failure = ACLMessage(
+            performative="failure",
+            sender="mts",
+            receivers=[msg.sender],
+            content={"status": "failed", "reason": reason, "request": msg.content},
+            priority=msg.priority
+        )
+        failure.conversation_id = msg.conversation_id
+        failure.set_reply_to(msg.reply_with)
+        self.overload["failure_replies"] += 1
+        print(f"[TRANSPORT] Rejected request from {msg.sender}: {reason}")
+        self.route_object(failure, bounded=False)
+    
+    def queue_depths(self) -> Dict[str, int]:
+        depths = {}
+        for agent_name, agent_info in list(self.agents.items()):
+            outbox = self.outboxes.get((agent_info["host"], agent_info["port"]))
+            depths[agent_name] = outbox.depth() if outbox is not None else 0
+        return depths
     
     def route_message(self, message_json: str):
         try:
             msg = ACLMessage.from_json(message_json)
-            
-            log_entry = {
-                "timestamp": datetime.now().isoformat(),
-                "direction": "INCOMING",
-                "message": message_json
-            }
-            self.message_log.append(log_entry)
-            
-            print(f"\n[TRANSPORT] Routing message from {msg.sender} to {msg.receivers}")
-            
-            for receiver in msg.receivers:
-                if receiver in self.agents:
-                    agent_info = self.agents[receiver]
-                    self.send_to_agent(agent_info["host"], agent_info["port"], message_json)
-                else:
-                    print(f"[TRANSPORT] Unknown receiver: {receiver}")
+            frame = encode_envelope(msg.sender, msg.receivers, message_json.encode('utf-8'),
+                                    conversation_id=msg.conversation_id, priority=priority_level(msg.priority),
+                                    performative=msg.performative)
         except Exception as e:
             print(f"[TRANSPORT] Error routing message: {e}")
+            return
+        frame = memoryview(frame)[FRAME_HEADER.size:]
+        if self.loop_thread.in_loop():
+            self.route_frame(frame)
+        else:
+            self.loop_thread.call_soon(self.route_frame, frame)
     
-    def send_to_agent(self, host: str, port: int, message_json: str):
+    def route_frame(self, frame: bytes):
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.connect((host, port))
-            sock.send(message_json.encode('utf-8'))
-            sock.close()
+            envelope = decode_envelope(frame)
+        except (FrameError, UnicodeDecodeError) as e:
+            print(f"[TRANSPORT] Error routing message: {e}")
+            return []
+        
+        log_entry = {
+            "timestamp": datetime.now().isoformat(),
+            "direction": "INCOMING",
+            "message": envelope.payload,
+            "codec": envelope.codec,
+            "compression": envelope.compression
+        }
+        self.message_log.append(log_entry)
+        
+        print(f"\n[TRANSPORT] Routing message from {envelope.sender} to {envelope.receivers}")
+        
+        receivers = self.directory.route(envelope.sender, envelope.conversation_id, envelope.receivers,
+                                         envelope.performative)
+        return self._dispatch(receivers, frame, envelope, None, bool(envelope.flags & FLAG_FORWARDED))
+    
+    def route_object(self, msg: ACLMessage, bounded: bool = True):
+        log_entry = {
+            "timestamp": datetime.now().isoformat(),
+            "direction": "INCOMING",
+            "message": msg,
+            "codec": JSON_CODEC_ID
+        }
+        self.message_log.append(log_entry)
+        
+        print(f"\n[TRANSPORT] Routing message from {msg.sender} to {msg.receivers}")
+        
+        receivers = self.directory.route(msg.sender, msg.conversation_id, msg.receivers, msg.performative)
+        self._dispatch(receivers, None, None, msg, bounded=bounded)
+    
+    def _dispatch(self, receivers: List[str], frame, envelope: Optional[Envelope], msg: Optional[ACLMessage],
+                  forwarded: bool = False, bounded: bool = True) -> List[BoundedOutbox]:
+        remote = {}
+        congested = []
+        for receiver in receivers:
+            agent_info = self.agents.get(receiver)
+            if agent_info is None:
+                owner = self.ring.owner(receiver)
+                if not forwarded and owner is not None and owner != self.address:
+                    remote.setdefault(owner, []).append(receiver)
+                else:
+                    print(f"[TRANSPORT] Unknown receiver: {receiver}")
+                continue
+            host, port = agent_info["host"], agent_info["port"]
+            try:
+                if isinstance(self.outbox(host, port), LocalOutbox):
+                    if msg is None:
+                        msg = ACLMessage.decode(envelope.inflate(), envelope.codec)
+                elif frame is None:
+                    frame, envelope = self._encode(msg)
+            except Exception as e:
+                print(f"[TRANSPORT] Failed to send to {host}:{port}: {e}")
+                continue
+            outbox = self.send_to_agent(host, port, frame, envelope, msg, bounded)
+            if outbox is not None and outbox.congested():
+                congested.append(outbox)
+        for shard, shard_receivers in remote.items():
+            try:
+                if envelope is None:
+                    frame, envelope = self._encode(msg)
+                outbox = self.forward(shard, shard_receivers, envelope, bounded)
+            except Exception as e:
+                print(f"[TRANSPORT] Failed to forward to shard {shard}: {e}")
+                continue
+            if outbox.congested():
+                congested.append(outbox)
+        return congested
+    
+    def _encode(self, msg: ACLMessage) -> tuple:
+        codec = self.codecs[0] if self.codecs else JSON_CODEC_ID
+        payload, flags = compress_payload(msg.encode(codec), self.compression, self.compression_threshold)
+        frame = memoryview(encode_envelope(msg.sender, msg.receivers, payload, flags, codec=codec,
+                                           conversation_id=msg.conversation_id,
+                                           priority=priority_level(msg.priority),
+                                           performative=msg.performative))[FRAME_HEADER.size:]
+        return frame, decode_envelope(frame)
+    
+    def forward(self, shard: str, receivers: List[str], envelope: Envelope, bounded: bool = True) -> BoundedOutbox:
+        frame = encode_envelope(envelope.sender, receivers, envelope.payload, envelope.flags | FLAG_FORWARDED,
+                                envelope.codec, envelope.conversation_id, envelope.priority, envelope.performative)
+        host, port = shard_address(shard)
+        outbox = self.outbox(host, port)
+        outbox.put(memoryview(frame)[FRAME_HEADER.size:], envelope.codec, envelope.priority, envelope.performative,
+                   bounded)
+        
+        log_entry = {
+            "timestamp": datetime.now().isoformat(),
+            "direction": "FORWARDED",
+            "destination": shard,
+            "message": envelope.payload,
+            "codec": envelope.codec,
+            "compression": envelope.compression
+        }
+        self.message_log.append(log_entry)
+        return outbox
+    
+    def outbox(self, host: str, port: int) -> BoundedOutbox:
+        outbox = self.outboxes.get((host, port))
+        if outbox is None:
+            agent = local_endpoint(host, port) if self.transport in ("auto", "inproc") else None
+            limits = {"capacity": self.outbox_capacity, "policy": self.shed_policy, "on_reject": self._reject}
+            if isinstance(agent, Agent):
+                outbox = LocalOutbox((host, port), agent, **limits)
+            else:
+                outbox = Outbox((host, port), self.pool, **limits)
+            self.outboxes[(host, port)] = outbox
+        return outbox
+    
+    def send_to_agent(self, host: str, port: int, frame: bytes, envelope: Optional[Envelope] = None,
+                      msg: Optional[ACLMessage] = None, bounded: bool = True) -> Optional[BoundedOutbox]:
+        try:
+            outbox = self.outbox(host, port)
+            if isinstance(outbox, LocalOutbox):
+                if msg is None:
+                    envelope = envelope or decode_envelope(frame)
+                    msg = ACLMessage.decode(envelope.inflate(), envelope.codec)
+                accepted = outbox.put(msg.copy(), bounded)
+                message, codec, compression = msg, JSON_CODEC_ID, None
+            else:
+                if envelope is None:
+                    envelope = decode_envelope(frame)
+                accepted = outbox.put(frame, envelope.codec, envelope.priority, envelope.performative, bounded)
+                message, codec, compression = envelope.payload, envelope.codec, envelope.compression
+            if not accepted:
+                return outbox
             
             log_entry = {
                 "timestamp": datetime.now().isoformat(),
                 "direction": "OUTGOING",
                 "destination": f"{host}:{port}",
-                "message": message_json
+                "message": message,
+                "codec": codec,
+                "compression": compression
             }
             self.message_log.append(log_entry)
-            
+            return outbox
+        
         except Exception as e:
             print(f"[TRANSPORT] Failed to send to {host}:{port}: {e}")
+            return None
+
+
+REPLY_PERFORMATIVES = ("agree", "refuse", "inform", "failure")
+FINAL_REPLY_PERFORMATIVES = ("refuse", "inform", "failure")
+
+
+class CorrelationTable:
+    def __init__(self, ttl: float = 30.0, scheduler=None):
+        self.ttl = ttl
+        self.scheduler = scheduler
+        self.pending = {}
+        self.deadlines = []
+        self.next_sweep = None
+        self.timer = 0
+        self.lock = threading.Lock()
+        self.stats = {"registered": 0, "resolved": 0, "expired": 0, "unmatched": 0, "sweeps": 0}
+    
+    def __len__(self) -> int:
+        return len(self.pending)
+    
+    def register(self, reply_with: str, timeout: Optional[float] = None,
+                 performatives=REPLY_PERFORMATIVES) -> Future:
+        future = Future()
+        deadline = time.monotonic() + (self.ttl if timeout is None else timeout)
+        with self.lock:
+            self.pending[reply_with] = (future, deadline, frozenset(performatives))
+            heapq.heappush(self.deadlines, (deadline, reply_with))
+            self.stats["registered"] += 1
+            reschedule = self.next_sweep is None or deadline < self.next_sweep
+            if reschedule:
+                self.next_sweep = deadline
+                self.timer += 1
+                timer = self.timer
+        if reschedule and self.scheduler is not None:
+            self.scheduler(deadline - time.monotonic(), lambda: self._on_timer(timer))
+        return future
+    
+    def resolve(self, msg: ACLMessage) -> bool:
+        if not msg.in_reply_to:
+            return False
+        with self.lock:
+            entry = self.pending.get(msg.in_reply_to)
+            if entry is None or msg.performative not in entry[2]:
+                self.stats["unmatched"] += 1
+                return False
+            del self.pending[msg.in_reply_to]
+            self.stats["resolved"] += 1
+        future = entry[0]
+        if future.set_running_or_notify_cancel():
+            future.set_result(msg)
+        return True
+    
+    def sweep(self) -> int:
+        now = time.monotonic()
+        expired = []
+        with self.lock:
+            while self.deadlines and self.deadlines[0][0] <= now:
+                deadline, reply_with = heapq.heappop(self.deadlines)
+                entry = self.pending.get(reply_with)
+                if entry is not None and entry[1] == deadline:
+                    del self.pending[reply_with]
+                    expired.append((reply_with, entry[0]))
+            self.next_sweep = self.deadlines[0][0] if self.deadlines else None
+            self.stats["expired"] += len(expired)
+            self.stats["sweeps"] += 1
+        for reply_with, future in expired:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(TimeoutError(f"No reply to {reply_with}"))
+        return len(expired)
+    
+    def _on_timer(self, timer: int):
+        with self.lock:
+            if timer != self.timer:
+                return
+        self.sweep()
+        with self.lock:
+            if timer != self.timer or self.next_sweep is None:
+                return
+            self.timer += 1
+            timer = self.timer
+            delay = max(0.0, self.next_sweep - time.monotonic())
+        self.scheduler(delay, lambda: self._on_timer(timer))
+
+
+class MessageStatistics:
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.Lock()
+        self.totals = {"sent": 0, "received": 0}
+        self.performatives = {"sent": {}, "received": {}}
+        self.ontologies = {"sent": {}, "received": {}}
+        self.peers = {"sent": {}, "received": {}}
+    
+    def record(self, direction: str, msg: ACLMessage):
+        peers = msg.receivers if direction == "sent" else (msg.sender,)
+        ontology = msg.ontology or "none"
+        with self.lock:
+            self.totals[direction] += 1
+            counts = self.performatives[direction]
+            counts[msg.performative] = counts.get(msg.performative, 0) + 1
+            counts = self.ontologies[direction]
+            counts[ontology] = counts.get(ontology, 0) + 1
+            counts = self.peers[direction]
+            for peer in peers:
+                counts[peer] = counts.get(peer, 0) + 1
+    
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {
+                "agent": self.name,
+                "sent": {
+                    "total": self.totals["sent"],
+                    "performatives": dict(self.performatives["sent"]),
+                    "ontologies": dict(self.ontologies["sent"]),
+                    "receivers": dict(self.peers["sent"])
+                },
+                "received": {
+                    "total": self.totals["received"],
+                    "performatives": dict(self.performatives["received"]),
+                    "ontologies": dict(self.ontologies["received"]),
+                    "senders": dict(self.peers["received"])
+                }
+            }
+
+
+def aggregate_statistics(snapshots: List[Dict]) -> Dict:
+    summary = {"sent": 0, "received": 0, "performatives": {}, "ontologies": {}, "pairs": {}, "agents": {}}
+    for snapshot in snapshots:
+        summary["agents"][snapshot["agent"]] = snapshot
+        summary["sent"] += snapshot["sent"]["total"]
+        summary["received"] += snapshot["received"]["total"]
+        for performative, count in snapshot["sent"]["performatives"].items():
+            summary["performatives"][performative] = summary["performatives"].get(performative, 0) + count
+        for ontology, count in snapshot["sent"]["ontologies"].items():
+            summary["ontologies"][ontology] = summary["ontologies"].get(ontology, 0) + count
+        for receiver, count in snapshot["sent"]["receivers"].items():
+            pair = f"{snapshot['agent']}->{receiver}"
+            summary["pairs"][pair] = summary["pairs"].get(pair, 0) + count
+    return summary
+
+
+class MailboxEntry:
+    __slots__ = ("priority", "performative", "item")
+    
+    def __init__(self, priority: int, performative: Optional[str], item: tuple):
+        self.priority = priority
+        self.performative = performative
+        self.item = item
+
+
+class Mailbox:
+    def __init__(self, handler, capacity: int = 1024, workers: int = 8, mode: str = "threads",
+                 executor: Optional[Executor] = None, starvation_limit: int = 32, policy: str = "block",
+                 on_reject=None):
+        if mode not in ("threads", "asyncio"):
+            raise ValueError(f"Unknown mailbox mode: {mode}")
+        if policy != "block" and policy not in SHED_POLICIES:
+            raise ValueError(f"Unknown mailbox policy: {policy}")
+        self.handler = handler
+        self.capacity = capacity
+        self.workers = workers
+        self.mode = mode
+        self.executor = executor
+        self.policy = policy
+        self.on_reject = on_reject
+        self.slots = asyncio.Semaphore(capacity)
+        self.idle = workers
+        self.ready = MultiLevelQueue(starvation_limit=starvation_limit)
+        self.lanes = {}
+        self.informs = deque()
+        self.spent_informs = 0
+        self.depth = 0
+        self.stats = {"accepted": 0, "handled": 0, "errors": 0, "max_depth": 0, "shed": 0, "rejected": 0}
+    
+    async def put(self, key: str, *item, priority: int = DEFAULT_PRIORITY_LEVEL, performative: Optional[str] = None):
+        if self.policy == "block":
+            await self.slots.acquire()
+        elif self.depth >= self.capacity:
+            await asyncio.sleep(0)
+            if self.depth >= self.capacity and not self._make_room(priority):
+                self.stats["rejected"] += 1
+                if self.on_reject is not None and performative == "request":
+                    asyncio.ensure_future(self._reject(item))
+                return
+        self.depth += 1
+        self.stats["accepted"] += 1
+        self.stats["max_depth"] = max(self.stats["max_depth"], self.depth)
+        entry = MailboxEntry(priority, performative, item)
+        if performative == "inform" and self.policy == "drop-oldest-inform":
+            self.informs.append(entry)
+        lane = self.lanes.get(key)
+        if lane is not None:
+            lane.append(entry)
+            return
+        self.lanes[key] = deque([entry])
+        if self.idle:
+            self.idle -= 1
+            asyncio.ensure_future(self._run_lanes(key))
+        else:
+            self.ready.append(key, priority)
+    
+    def _make_room(self, priority: int) -> bool:
+        if self.policy != "drop-oldest-inform":
+            return False
+        for index, entry in enumerate(self.informs):
+            if entry.item is not None and entry.priority >= priority:
+                del self.informs[index]
+                entry.item = None
+                self.depth -= 1
+                self.stats["shed"] += 1
+                return True
+        return False
+    
+    async def _run_lanes(self, key: str):
+        while True:
+            lane = self.lanes[key]
+            entry = lane.popleft()
+            if entry.item is not None:
+                item, entry.item = entry.item, None
+                if entry.performative == "inform" and self.policy == "drop-oldest-inform":
+                    self._forget_inform()
+                await self._run_item(item)
+            if lane:
+                self.ready.append(key, lane[0].priority)
+            else:
+                del self.lanes[key]
+            if not self.ready:
+                self.idle += 1
+                return
+            key = self.ready.popleft()
+    
+    def _forget_inform(self):
+        self.spent_informs += 1
+        while self.informs and self.informs[0].item is None:
+            self.informs.popleft()
+            self.spent_informs -= 1
+        if self.spent_informs > len(self.informs) // 2:
+            self.informs = deque(entry for entry in self.informs if entry.item is not None)
+            self.spent_informs = 0
+    
+    async def _run_item(self, item: tuple):
+        try:
+            await self._invoke(item)
+            self.stats["handled"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[MAILBOX] Handler failed: {e!r}")
+        finally:
+            self.depth -= 1
+            if self.policy == "block":
+                self.slots.release()
+    
+    async def _reject(self, item: tuple):
+        try:
+            await self._invoke(item, self.on_reject)
+        except Exception as e:
+            print(f"[MAILBOX] Reject handler failed: {e!r}")
+    
+    async def _invoke(self, item: tuple, handler=None):
+        handler = handler or self.handler
+        if self.mode == "asyncio":
+            result = handler(*item)
+            if asyncio.iscoroutine(result):
+                await result
+        else:
+            await asyncio.get_running_loop().run_in_executor(self.executor, handler, *item)
 
 
 class Agent:
-    def __init__(self, name: str, mts_host: str = "localhost", mts_port: int = 5000):
+    def __init__(self, name: str, mts_host: str = "localhost", mts_port: int = 5000, pooled: bool = True,
+                 loop_thread: Optional[EventLoopThread] = None, codecs=DEFAULT_CODECS,
+                 log_capacity: int = 1000, log_dir: Optional[str] = None, mailbox_capacity: int = 1024,
+                 handler_workers: int = 8, handler_mode: str = "threads", handler_executor: Optional[Executor] = None,
+                 transport: str = "auto", batch_size: int = 1, batch_linger_us: int = 500, request_ttl: float = 30.0,
+                 overload_policy: str = "block", compression: Optional[str] = None,
+                 compression_threshold: int = 4096):
         self.name = name
         self.mts_host = mts_host
         self.mts_port = mts_port
-        self.server_socket = None
+        self.transport = check_transport(transport)
+        self.listen_host = None
+        self.listen_port = None
+        self.servers = []
+        self.unix_path = None
         self.running = False
+        self.codecs = codec_ids(codecs)
+        self.compression = check_compression(compression)
+        self.compression_threshold = compression_threshold
+        self.pool = ConnectionPool(handshake=self._handshake, unix=self.transport != "tcp") if pooled else None
+        self.eviction_task = None
+        self.batcher = SendBatcher(name, self._transmit, batch_size, batch_linger_us) if batch_size > 1 else None
+        self.loop_thread = loop_thread or get_event_loop_thread()
+        self.connections = set()
+        self.handler_pool = None
+        if handler_executor is None and handler_mode == "threads":
+            handler_executor = self.handler_pool = ThreadPoolExecutor(max_workers=handler_workers,
+                                                                      thread_name_prefix=f"{name}-handler")
+        self.mailbox = Mailbox(self.receive_message, mailbox_capacity, handler_workers, handler_mode,
+                               handler_executor, policy=overload_policy, on_reject=self._reject_request)
         self.message_handlers = {
             "inform": self.handle_inform,
             "request": self.handle_request,
@@ -163,73 +2570,192 @@ class Agent:
             "refuse": self.handle_refuse,
             "failure": self.handle_failure
         }
-        self.received_messages = []
-        self.sent_messages = []
+        self.received_messages = MessageLog(f"{name}-received", log_capacity, log_dir)
+        self.sent_messages = MessageLog(f"{name}-sent", log_capacity, log_dir)
         self.knowledge_base = {}
         self.active_conversations = {}
-        
+        self.correlations = CorrelationTable(request_ttl, self._schedule)
+        self.statistics = MessageStatistics(name)
+    
     def start(self, listen_host: str = "localhost", listen_port: int = None):
         if listen_port is None:
             listen_port = 6000 + hash(self.name) % 1000
         
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server_socket.bind((listen_host, listen_port))
-        self.server_socket.listen(5)
+        self.loop_thread.start()
+        listen_port = self.loop_thread.run(self._start_server(listen_host, listen_port))
         self.running = True
         
         print(f"Agent '{self.name}' listening on {listen_host}:{listen_port}")
         
-        def listen_for_messages():
-            while self.running:
-                try:
-                    client_socket, address = self.server_socket.accept()
-                    data = client_socket.recv(8192).decode('utf-8')
-                    if data:
-                        self.receive_message(data)
-                    client_socket.close()
-                except:
-                    break
-        
-        thread = threading.Thread(target=listen_for_messages)
-        thread.daemon = True
-        thread.start()
-        
         return listen_port
     
+    async def _start_server(self, listen_host: str, listen_port: int) -> int:
+        listen_port, self.unix_path, self.servers = await start_servers(self.handle_connection, listen_host,
+                                                                        listen_port, self.transport, 128)
+        self.listen_host, self.listen_port = listen_host, listen_port
+        if self.unix_path is not None:
+            weakref.finalize(self, remove_unix_socket, self.unix_path)
+        if self.transport in ("auto", "inproc"):
+            bind_local_endpoint(listen_host, listen_port, self)
+        if self.pool:
+            self.eviction_task = asyncio.ensure_future(self._evict_idle_connections())
+        return listen_port
+    
+    async def _evict_idle_connections(self):
+        while True:
+            await asyncio.sleep(self.pool.idle_timeout / 2)
+            self.pool.evict_idle()
+    
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections.add(writer)
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                envelope = decode_envelope(frame)
+                if envelope.flags & FLAG_CONTROL:
+                    answer_control(envelope, writer, self.codecs)
+                    continue
+                payload = envelope.inflate()
+                payload = str(payload, 'utf-8') if envelope.codec == JSON_CODEC_ID else payload
+                await self.mailbox.put(envelope.conversation_id or envelope.sender, payload, envelope.codec,
+                                       priority=envelope.priority, performative=envelope.performative)
+        except (FrameError, UnicodeDecodeError) as e:
+            print(f"[{self.name}] Dropping connection: {e}")
+        except OSError:
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+    
     def stop(self):
+        if self.batcher:
+            try:
+                self.batcher.close()
+            except Exception as e:
+                print(f"[{self.name}] Failed to send batch: {e}")
+        if self.running:
+            self.loop_thread.run(self._stop_server())
         self.running = False
-        if self.server_socket:
-            self.server_socket.close()
+        if self.pool:
+            self.pool.close()
+        if self.handler_pool:
+            self.handler_pool.shutdown(wait=False)
+    
+    async def _stop_server(self):
+        unbind_local_endpoint(self.listen_host, self.listen_port, self)
+        stop_servers(self.servers, self.unix_path)
+        if self.eviction_task:
+            self.eviction_task.cancel()
+        for writer in list(self.connections):
+            writer.close()
+    
+    def _handshake(self, sock: socket.socket) -> int:
+        return handshake_codec(sock, self.codecs, self.pool.connect_timeout)
+    
+    def _schedule(self, delay: float, callback):
+        self.loop_thread.call_soon(self.loop_thread.loop.call_later, delay, callback)
+    
+    async def deliver(self, msg: ACLMessage):
+        put = self.mailbox.put(msg.conversation_id or msg.sender, msg, JSON_CODEC_ID,
+                               priority=priority_level(msg.priority), performative=msg.performative)
+        if self.loop_thread.in_loop():
+            await put
+        else:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(put, self.loop_thread.loop))
+    
+    def _reject_request(self, message, codec: int = JSON_CODEC_ID):
+        msg = decode_message(message, codec)
+        reply = ACLMessage(
+            performative="failure",
+            sender=self.name,
+            receivers=[msg.sender],
+            content={"status": "failed", "reason": "overloaded", "request": msg.content},
+            priority=msg.priority
+        )
+        reply.conversation_id = msg.conversation_id
+        reply.set_reply_to(msg.reply_with)
+        self.send_message(reply)
     
     def send_message(self, msg: ACLMessage):
         try:
             msg.sender = self.name
             
-            message_json = msg.to_json()
-            
-            self.sent_messages.append({
-                "timestamp": datetime.now().isoformat(),
-                "message": message_json
-            })
-            
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.connect((self.mts_host, self.mts_port))
-            sock.send(message_json.encode('utf-8'))
-            sock.close()
+            mts = local_endpoint(self.mts_host, self.mts_port) if self.transport in ("auto", "inproc") else None
+            if isinstance(mts, MessageTransportService):
+                self.sent_messages.append({
+                    "timestamp": datetime.now().isoformat(),
+                    "message": msg,
+                    "codec": JSON_CODEC_ID
+                })
+                mts.post(msg)
+            else:
+                self._send_frame(msg)
+            self.statistics.record("sent", msg)
             
             print(f"[{self.name}] Sent {msg.performative} to {msg.receivers}")
-            
+        
         except Exception as e:
             print(f"[{self.name}] Failed to send message: {e}")
     
-    def receive_message(self, message_json: str):
+    def register(self):
+        mts = local_endpoint(self.mts_host, self.mts_port) if self.transport in ("auto", "inproc") else None
+        if isinstance(mts, MessageTransportService):
+            mts.register_agent(self.name, self.listen_host, self.listen_port, self.services())
+            return
+        agents = {self.name: {"host": self.listen_host, "port": self.listen_port, "capabilities": self.services()}}
+        self._transmit(encode_control({"type": "register", "agents": agents}))
+    
+    def request(self, msg: ACLMessage, timeout: Optional[float] = None,
+                performatives=REPLY_PERFORMATIVES) -> Future:
+        future = self.correlations.register(msg.reply_with, timeout, performatives)
+        self.active_conversations[msg.conversation_id] = {
+            "agent": msg.receivers,
+            "status": "requested",
+            "content": msg.content
+        }
+        self.send_message(msg)
+        return future
+    
+    def _send_frame(self, msg: ACLMessage):
+        codec = self.pool.session(self.mts_host, self.mts_port) if self.pool else JSON_CODEC_ID
+        payload, flags = compress_payload(msg.encode(codec), self.compression, self.compression_threshold)
+        
+        self.sent_messages.append({
+            "timestamp": datetime.now().isoformat(),
+            "message": payload,
+            "codec": codec,
+            "compression": flag_compression(flags)
+        })
+        
+        priority = priority_level(msg.priority)
+        frame = encode_envelope(msg.sender, msg.receivers, payload, flags, codec, msg.conversation_id, priority,
+                                msg.performative)
+        if self.batcher:
+            self.batcher.add(frame)
+            if priority == PRIORITY_LEVELS["critical"]:
+                self.batcher.flush()
+        else:
+            self._transmit(frame)
+    
+    def _transmit(self, frame: bytes):
+        if self.pool:
+            self.pool.send(self.mts_host, self.mts_port, frame)
+        else:
+            sock = connect_socket((self.mts_host, self.mts_port), None, self.transport != "tcp")
+            sock.sendall(frame)
+            sock.close()
+    
+    def receive_message(self, message_json: str, codec: int = JSON_CODEC_ID):
         try:
-            msg = ACLMessage.from_json(message_json)
+            msg = decode_message(message_json, codec)
+            self.statistics.record("received", msg)
             
             self.received_messages.append({
                 "timestamp": datetime.now().isoformat(),
-                "message": message_json
+                "message": message_json,
+                "codec": codec
             })
             
             print(f"[{self.name}] Received {msg.performative} from {msg.sender}")
@@ -238,7 +2764,9 @@ class Agent:
                 self.message_handlers[msg.performative](msg)
             else:
                 print(f"[{self.name}] No handler for performative: {msg.performative}")
-                
+            
+            self.correlations.resolve(msg)
+        
         except Exception as e:
             print(f"[{self.name}] Error receiving message: {e}")
     
@@ -262,6 +2790,8 @@ class Agent:
                 receivers=[msg.sender],
                 content={"status": "accepted", "request": msg.content}
             )
+            reply.conversation_id = msg.conversation_id
+            reply.priority = msg.priority
             reply.set_reply_to(msg.reply_with)
             self.send_message(reply)
             
@@ -273,6 +2803,8 @@ class Agent:
                 receivers=[msg.sender],
                 content={"result": "action_completed", "details": msg.content}
             )
+            inform.conversation_id = msg.conversation_id
+            inform.priority = msg.priority
             inform.set_reply_to(msg.reply_with)
             self.send_message(inform)
         else:
@@ -282,6 +2814,8 @@ class Agent:
                 receivers=[msg.sender],
                 content={"status": "refused", "reason": "cannot_perform", "request": msg.content}
             )
+            reply.conversation_id = msg.conversation_id
+            reply.priority = msg.priority
             reply.set_reply_to(msg.reply_with)
             self.send_message(reply)
     
@@ -312,14 +2846,17 @@ class Agent:
     def can_perform_request(self, request: Any) -> bool:
         return True
     
+    def services(self) -> List[str]:
+        return []
+    
     def perform_action(self, request: Any):
         print(f"[{self.name}] Performing action: {request}")
         time.sleep(1)
 
 
 class RescueAgent(Agent):
-    def __init__(self, name: str, role: str, mts_host: str = "localhost", mts_port: int = 5000):
-        super().__init__(name, mts_host, mts_port)
+    def __init__(self, name: str, role: str, mts_host: str = "localhost", mts_port: int = 5000, **kwargs):
+        super().__init__(name, mts_host, mts_port, **kwargs)
         self.role = role
         self.capabilities = {
             "coordinator": ["assign_task", "request_status", "deploy_team", "coordinate_rescue"],
@@ -330,7 +2867,7 @@ class RescueAgent(Agent):
         self.status = "idle"
         self.location = (0, 0)
         self.assigned_tasks = []
-        
+    
     def handle_request(self, msg: ACLMessage):
         super().handle_request(msg)
         
@@ -349,6 +2886,9 @@ class RescueAgent(Agent):
                 if self.role == "coordinator":
                     self.coordinate_rescue(msg.content)
     
+    def services(self) -> List[str]:
+        return list(self.capabilities.get(self.role, []))
+    
     def can_perform_request(self, request: Any) -> bool:
         if isinstance(request, dict):
             action = request.get("action")
@@ -359,21 +2899,21 @@ class RescueAgent(Agent):
     def perform_action(self, request: Any):
         if not isinstance(request, dict):
             return
-            
+        
         action = request.get("action")
         
         if action == "search_area":
             self.status = "searching"
             print(f"[{self.name}] Searching area: {request.get('area')}")
-            
+        
         elif action == "treat_victim":
             self.status = "treating"
             print(f"[{self.name}] Treating victim at {request.get('location')}")
-            
+        
         elif action == "evacuate_victim":
             self.status = "evacuating"
             print(f"[{self.name}] Evacuating victim from {request.get('location')}")
-            
+        
         elif action == "assign_task":
             self.status = "assigning"
             print(f"[{self.name}] Assigning task to {request.get('target_agent')}")
@@ -387,13 +2927,14 @@ class RescueAgent(Agent):
         request = ACLMessage(
             performative="request",
             sender=self.name,
-            receivers=["medic_agent"],
+            receivers=["any:treat_victim"],
             content={
                 "action": "treat_victim",
                 "location": victim_info.get("location"),
                 "victim_id": victim_info.get("victim_id"),
-                "priority": victim_info.get("priority", "normal")
-            }
+                "priority": victim_info.get("priority", DEFAULT_PRIORITY)
+            },
+            priority=victim_info.get("priority", DEFAULT_PRIORITY)
         )
         self.send_message(request)
 
@@ -424,10 +2965,10 @@ def run_agent_communication_demo():
     
     time.sleep(1)
     
-    mts.register_agent("coordinator_agent", "localhost", 6001)
-    mts.register_agent("searcher_agent", "localhost", 6002)
-    mts.register_agent("medic_agent", "localhost", 6003)
-    mts.register_agent("transporter_agent", "localhost", 6004)
+    mts.register_agent("coordinator_agent", "localhost", 6001, coordinator.services())
+    mts.register_agent("searcher_agent", "localhost", 6002, searcher.services())
+    mts.register_agent("medic_agent", "localhost", 6003, medic.services())
+    mts.register_agent("transporter_agent", "localhost", 6004, transporter.services())
     
     time.sleep(2)
     
@@ -444,11 +2985,11 @@ def run_agent_communication_demo():
             "area": "sector_7",
             "priority": "high",
             "grid_size": "10x10"
-        }
+        },
+        priority="high"
     )
-    coordinator.send_message(request_msg)
-    
-    time.sleep(3)
+    reply = coordinator.request(request_msg, timeout=10, performatives=FINAL_REPLY_PERFORMATIVES).result()
+    print(f"[coordinator_agent] Request {request_msg.reply_with} concluded with {reply.performative}")
     
     print("\n" + "=" * 70)
     print("SCENARIO 2: INFORM PERFORMATIVE")
@@ -465,7 +3006,8 @@ def run_agent_communication_demo():
             "condition": "conscious",
             "priority": "critical",
             "timestamp": datetime.now().isoformat()
-        }
+        },
+        priority="critical"
     )
     searcher.send_message(inform_msg)
     
@@ -525,9 +3067,8 @@ def run_agent_communication_demo():
             "reason": "aerial_support"
         }
     )
-    coordinator.send_message(invalid_request)
-    
-    time.sleep(3)
+    reply = coordinator.request(invalid_request, timeout=10).result()
+    print(f"[coordinator_agent] Request {invalid_request.reply_with} concluded with {reply.performative}")
     
     print("\n" + "=" * 70)
     print("AGENT COMMUNICATION SUMMARY")
@@ -546,9 +3087,9 @@ def run_agent_communication_demo():
     print("MESSAGE TRANSPORT SERVICE LOG")
     print("=" * 70)
     
-    for i, entry in enumerate(mts.message_log[-10:]):
+    for i, entry in enumerate(mts.message_log.tail(10)):
         try:
-            msg = ACLMessage.from_json(entry["message"])
+            msg = decode_message(entry["message"], entry.get("codec", JSON_CODEC_ID), entry.get("compression"))
             print(f"{i+1}. {entry['direction']:8} | {msg.performative:7} | {msg.sender:15} -> {msg.receivers}")
         except:
             pass
@@ -573,7 +3114,7 @@ def save_message_logs(mts, agents, filename="fipa_acl_message_logs.txt"):
             f.write("Message:\n")
             
             try:
-                msg = ACLMessage.from_json(entry["message"])
+                msg = decode_message(entry["message"], entry.get("codec", JSON_CODEC_ID), entry.get("compression"))
                 f.write(f"  Performative: {msg.performative}\n")
                 f.write(f"  Sender: {msg.sender}\n")
                 f.write(f"  Receivers: {msg.receivers}\n")
@@ -593,7 +3134,7 @@ def save_message_logs(mts, agents, filename="fipa_acl_message_logs.txt"):
             f.write("\nSENT MESSAGES:\n")
             for i, sent in enumerate(agent.sent_messages):
                 try:
-                    msg = ACLMessage.from_json(sent["message"])
+                    msg = decode_message(sent["message"], sent.get("codec", JSON_CODEC_ID), sent.get("compression"))
                     f.write(f"  {i+1}. [{sent['timestamp']}] {msg.performative} -> {msg.receivers}\n")
                 except:
                     f.write(f"  {i+1}. {sent}\n")
@@ -601,7 +3142,7 @@ def save_message_logs(mts, agents, filename="fipa_acl_message_logs.txt"):
             f.write("\nRECEIVED MESSAGES:\n")
             for i, recv in enumerate(agent.received_messages):
                 try:
-                    msg = ACLMessage.from_json(recv["message"])
+                    msg = decode_message(recv["message"], recv.get("codec", JSON_CODEC_ID), recv.get("compression"))
                     f.write(f"  {i+1}. [{recv['timestamp']}] {msg.performative} from {msg.sender}\n")
                 except:
                     f.write(f"  {i+1}. {recv}\n")
@@ -609,11 +3150,13 @@ def save_message_logs(mts, agents, filename="fipa_acl_message_logs.txt"):
     print(f"\nMessage logs saved to {filename}")
 
 
-def generate_message_statistics(agents):
+def generate_message_statistics(agents, filename=None):
     print("\n" + "=" * 70)
     print("FIPA-ACL MESSAGE STATISTICS")
     print("=" * 70)
     
+    summary = aggregate_statistics([agent.statistics.snapshot() for agent in agents])
+    
     stats = {
         "inform": 0,
         "request": 0,
@@ -621,15 +3164,8 @@ def generate_message_statistics(agents):
         "refuse": 0,
         "failure": 0
     }
-    
-    for agent in agents:
-        for sent in agent.sent_messages:
-            try:
-                msg = ACLMessage.from_json(sent["message"])
-                if msg.performative in stats:
-                    stats[msg.performative] += 1
-            except:
-                pass
+    for perf in stats:
+        stats[perf] = summary["performatives"].get(perf, 0)
     
     print(f"\nPerformative Distribution:")
     for perf, count in stats.items():
@@ -637,6 +3173,13 @@ def generate_message_statistics(agents):
     
     total = sum(stats.values())
     print(f"\nTotal Messages Exchanged: {total}")
+    
+    if filename:
+        with open(filename, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Message statistics saved to {filename}")
+    
+    return summary
 
 
 if __name__ == "__main__":
@@ -652,7 +3195,7 @@ if __name__ == "__main__":
         
         if agents:
             save_message_logs(mts, agents, "fipa_acl_message_logs.txt")
-            generate_message_statistics(agents)
+            generate_message_statistics(agents, "fipa_acl_message_stats.json")
         
         print("\n" + "=" * 70)
         print("LAB 4 COMPLETED SUCCESSFULLY")
@@ -660,7 +3203,8 @@ if __name__ == "__main__":
         print("\nDeliverables generated:")
         print("1. Agent Communication Code (this file)")
         print("2. Message Logs (fipa_acl_message_logs.txt)")
-        
+        print("3. Message Statistics (fipa_acl_message_stats.json)")
+    
     finally:
         if agents:
             for agent in agents:
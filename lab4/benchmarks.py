@@ -0,0 +1,1372 @@
+import os
+import json
+import time
+import uuid
+import random
+import tracemalloc
+import argparse
+import socket
+import threading
+import multiprocessing
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from agent_platform import (
+    ACLMessage, Agent, BINARY_CODEC_ID, ConnectionPool, FINAL_REPLY_PERFORMATIVES, FRAME_HEADER, HashRing,
+    JSON_CODEC_ID, MessageTransportService, RescueAgent, aggregate_statistics, compress_payload, decode_envelope,
+    decode_message, decompress_payload, encode_envelope, encode_message, read_messages
+)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class LatencyHistogram:
+    def __init__(self, significant_bits: int = 7):
+        self.sub_bucket_count = 1 << significant_bits
+        self.sub_bucket_half = self.sub_bucket_count // 2
+        self.significant_bits = significant_bits
+        self.counts = [0] * self.sub_bucket_count
+        self.total = 0
+        self.max = 0
+        self.sum = 0
+        self.lock = threading.Lock()
+    
+    def _index(self, value: int) -> int:
+        exponent = max(0, value.bit_length() - self.significant_bits)
+        return exponent * self.sub_bucket_half + (value >> exponent)
+    
+    def _highest_equivalent(self, index: int) -> int:
+        if index < self.sub_bucket_count:
+            return index
+        exponent = index // self.sub_bucket_half - 1
+        sub_bucket = index - exponent * self.sub_bucket_half
+        return (sub_bucket << exponent) + (1 << exponent) - 1
+    
+    def record(self, value_us: int):
+        value_us = max(0, int(value_us))
+        index = self._index(value_us)
+        with self.lock:
+            if index >= len(self.counts):
+                self.counts.extend([0] * (index + 1 - len(self.counts)))
+            self.counts[index] += 1
+            self.total += 1
+            self.sum += value_us
+            self.max = max(self.max, value_us)
+    
+    def value_at(self, pct: float) -> int:
+        with self.lock:
+            target = max(1, int(round(pct / 100.0 * self.total)))
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if count and seen >= target:
+                    return min(self._highest_equivalent(index), self.max)
+        return 0
+    
+    def summary_ms(self) -> Dict:
+        return {
+            "count": self.total,
+            "mean": round(self.sum / self.total / 1000, 3) if self.total else 0.0,
+            "p50": round(self.value_at(50) / 1000, 3),
+            "p95": round(self.value_at(95) / 1000, 3),
+            "p99": round(self.value_at(99) / 1000, 3),
+            "p999": round(self.value_at(99.9) / 1000, 3),
+            "max": round(self.max / 1000, 3)
+        }
+
+
+@contextlib.contextmanager
+def quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+class SinkAgent(Agent):
+    def __init__(self, name: str, expected: int, **kwargs):
+        super().__init__(name, **kwargs)
+        self.expected = expected
+        self.latencies = []
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+    
+    def receive_message(self, message_json: str, codec: int = JSON_CODEC_ID):
+        received_ns = time.perf_counter_ns()
+        msg = ACLMessage.decode(message_json, codec)
+        with self.lock:
+            self.latencies.append((received_ns - msg.content["sent_ns"]) / 1e6)
+            if len(self.latencies) >= self.expected:
+                self.done.set()
+
+
+def benchmark_connection_pooling(messages: int = 1000, pooled: bool = True) -> Dict:
+    with quiet():
+        mts = MessageTransportService(port=0, pooled=pooled, transport="tcp")
+        mts.start()
+        sink = SinkAgent("sink_agent", messages, mts_port=mts.port, pooled=pooled, transport="tcp")
+        sender = Agent("load_agent", mts_port=mts.port, pooled=pooled, transport="tcp")
+        sink_port = sink.start(listen_port=0)
+        mts.register_agent("sink_agent", "localhost", sink_port)
+        
+        send_latencies = []
+        started = time.perf_counter()
+        for i in range(messages):
+            msg = ACLMessage("inform", "load_agent", ["sink_agent"], {"seq": i, "sent_ns": time.perf_counter_ns()})
+            before = time.perf_counter_ns()
+            sender.send_message(msg)
+            send_latencies.append((time.perf_counter_ns() - before) / 1e6)
+        completed = sink.done.wait(timeout=60)
+        elapsed = time.perf_counter() - started
+        
+        sender.stop()
+        sink.stop()
+        mts.stop()
+    
+    return {
+        "mode": "pooled" if pooled else "per_message",
+        "messages": messages,
+        "delivered": len(sink.latencies),
+        "completed": completed,
+        "msgs_per_sec": round(len(sink.latencies) / elapsed, 1),
+        "send_p99_ms": round(percentile(send_latencies, 99), 3),
+        "e2e_p50_ms": round(percentile(sink.latencies, 50), 3),
+        "e2e_p99_ms": round(percentile(sink.latencies, 99), 3)
+    }
+
+
+def benchmark_send_batching(batch_size: int, linger_us: int, bursts: int = 40, burst_size: int = 50,
+                            pause_ms: float = 5.0) -> Dict:
+    messages = bursts * burst_size
+    with quiet():
+        mts = MessageTransportService(port=0, transport="tcp")
+        mts.start()
+        sink = SinkAgent("sink_agent", messages, mts_port=mts.port, transport="tcp")
+        sender = Agent("load_agent", mts_port=mts.port, transport="tcp", batch_size=batch_size,
+                       batch_linger_us=linger_us)
+        mts.register_agent("sink_agent", "localhost", sink.start(listen_port=0))
+        
+        send_seconds = 0.0
+        started = time.perf_counter()
+        for burst in range(bursts):
+            before = time.perf_counter()
+            for i in range(burst_size):
+                msg = ACLMessage("inform", "load_agent", ["sink_agent"], {"seq": i, "sent_ns": time.perf_counter_ns()})
+                sender.send_message(msg)
+            send_seconds += time.perf_counter() - before
+            time.sleep(pause_ms / 1000)
+        completed = sink.done.wait(timeout=60)
+        elapsed = time.perf_counter() - started - bursts * pause_ms / 1000
+        
+        sender.stop()
+        sink.stop()
+        mts.stop()
+    
+    return {
+        "batch_size": batch_size,
+        "linger_us": linger_us,
+        "messages": messages,
+        "completed": completed,
+        "frames_sent": sender.batcher.stats["batches"] if sender.batcher else messages,
+        "send_msgs_per_sec": round(messages / send_seconds, 1),
+        "delivered_msgs_per_sec": round(len(sink.latencies) / elapsed, 1),
+        "e2e_p50_ms": round(percentile(sink.latencies, 50), 3),
+        "e2e_p99_ms": round(percentile(sink.latencies, 99), 3)
+    }
+
+
+class ThreadedMessageTransportService:
+    def __init__(self, host: str = "localhost", port: int = 0):
+        self.host = host
+        self.port = port
+        self.agents = {}
+        self.pool = ConnectionPool()
+        self.server_socket = None
+        self.running = False
+    
+    def start(self):
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((self.host, self.port))
+        self.server_socket.listen(1024)
+        self.port = self.server_socket.getsockname()[1]
+        self.running = True
+        threading.Thread(target=accept_loop, args=(self, self.handle_client), daemon=True).start()
+    
+    def stop(self):
+        self.running = False
+        self.server_socket.close()
+        self.pool.close()
+    
+    def register_agent(self, agent_name: str, host: str, port: int):
+        self.agents[agent_name] = {"host": host, "port": port}
+    
+    def handle_client(self, client_socket: socket.socket):
+        for message_json in read_messages(client_socket):
+            self.route_message(message_json)
+    
+    def route_message(self, message_json: str):
+        for receiver in json.loads(message_json)["receivers"]:
+            agent_info = self.agents.get(receiver)
+            if agent_info:
+                self.pool.send(agent_info["host"], agent_info["port"], encode_message(message_json))
+
+
+class ThreadedAgent:
+    def __init__(self, name: str, mts_port: int):
+        self.name = name
+        self.mts_port = mts_port
+        self.pool = ConnectionPool()
+        self.server_socket = None
+        self.running = False
+        self.on_message = None
+    
+    def start(self) -> int:
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.bind(("localhost", 0))
+        self.server_socket.listen(5)
+        self.running = True
+        threading.Thread(target=accept_loop, args=(self, self.handle_connection), daemon=True).start()
+        return self.server_socket.getsockname()[1]
+    
+    def stop(self):
+        self.running = False
+        self.server_socket.close()
+        self.pool.close()
+    
+    def handle_connection(self, client_socket: socket.socket):
+        for message_json in read_messages(client_socket):
+            self.on_message(message_json)
+    
+    def send_message(self, msg: ACLMessage):
+        msg.sender = self.name
+        self.pool.send("localhost", self.mts_port, encode_message(msg.to_json()))
+
+
+def accept_loop(owner, handler):
+    def serve(client_socket: socket.socket):
+        try:
+            handler(client_socket)
+        except OSError:
+            pass
+        finally:
+            client_socket.close()
+    
+    while owner.running:
+        try:
+            client_socket, _ = owner.server_socket.accept()
+        except OSError:
+            break
+        threading.Thread(target=serve, args=(client_socket,), daemon=True).start()
+
+
+class LatencyRecorder:
+    def __init__(self, expected: int):
+        self.expected = expected
+        self.latencies = []
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+    
+    def record(self, message_json, codec: int = JSON_CODEC_ID):
+        received_ns = time.perf_counter_ns()
+        sent_ns = decode_message(message_json, codec).content["sent_ns"]
+        with self.lock:
+            self.latencies.append((received_ns - sent_ns) / 1e6)
+            if len(self.latencies) >= self.expected:
+                self.done.set()
+
+
+class RecordingAgent(Agent):
+    def __init__(self, name: str, recorder: LatencyRecorder, **kwargs):
+        super().__init__(name, **kwargs)
+        self.recorder = recorder
+    
+    def receive_message(self, message_json: str, codec: int = JSON_CODEC_ID):
+        self.recorder.record(message_json, codec)
+
+
+def settle_threads(timeout: float = 10.0) -> int:
+    deadline = time.monotonic() + timeout
+    count = threading.active_count()
+    while time.monotonic() < deadline:
+        time.sleep(0.2)
+        current = threading.active_count()
+        if current == count:
+            break
+        count = current
+    return count
+
+
+def benchmark_transport_scaling(agent_count: int, messages_per_agent: int = 20, threaded: bool = False) -> Dict:
+    expected = agent_count * messages_per_agent
+    recorder = LatencyRecorder(expected)
+    baseline_threads = settle_threads()
+    peak_threads = [baseline_threads]
+    monitoring = threading.Event()
+    
+    def monitor_threads():
+        while True:
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+            if monitoring.wait(0.02):
+                break
+    
+    threading.Thread(target=monitor_threads, daemon=True).start()
+    
+    with quiet():
+        setup_started = time.perf_counter()
+        if threaded:
+            mts = ThreadedMessageTransportService()
+            mts.start()
+            agents = [ThreadedAgent(f"agent_{i}", mts.port) for i in range(agent_count)]
+            for agent in agents:
+                agent.on_message = recorder.record
+        else:
+            mts = MessageTransportService(port=0, transport="tcp")
+            mts.start()
+            agents = [RecordingAgent(f"agent_{i}", recorder, mts_port=mts.port, transport="tcp")
+                      for i in range(agent_count)]
+        for agent in agents:
+            if threaded:
+                port = agent.start()
+            else:
+                port = agent.start(listen_port=0)
+            mts.register_agent(agent.name, "localhost", port)
+        setup_seconds = time.perf_counter() - setup_started
+        
+        def drive(index: int):
+            agent = agents[index]
+            receiver = agents[(index + 1) % agent_count].name
+            for seq in range(messages_per_agent):
+                agent.send_message(ACLMessage("inform", agent.name, [receiver], {"seq": seq, "sent_ns": time.perf_counter_ns()}))
+        
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(8, agent_count)) as drivers:
+            list(drivers.map(drive, range(agent_count)))
+        completed = recorder.done.wait(timeout=120)
+        elapsed = time.perf_counter() - started
+        peak_threads[0] = max(peak_threads[0], threading.active_count())
+        monitoring.set()
+        
+        for agent in agents:
+            agent.stop()
+        mts.stop()
+    
+    return {
+        "mode": "threaded" if threaded else "asyncio",
+        "agents": agent_count,
+        "messages": expected,
+        "delivered": len(recorder.latencies),
+        "completed": completed,
+        "setup_seconds": round(setup_seconds, 3),
+        "msgs_per_sec": round(len(recorder.latencies) / elapsed, 1),
+        "e2e_p50_ms": round(percentile(recorder.latencies, 50), 3),
+        "e2e_p99_ms": round(percentile(recorder.latencies, 99), 3),
+        "extra_threads": peak_threads[0] - baseline_threads
+    }
+
+
+def benchmark_multicast_fanout(receivers: int = 8, messages: int = 500, stuck: bool = False) -> Dict:
+    recorder = LatencyRecorder(receivers * messages)
+    stuck_socket = None
+    with quiet():
+        mts = MessageTransportService(port=0, transport="tcp")
+        mts.start()
+        agents = [RecordingAgent(f"agent_{i}", recorder, mts_port=mts.port, transport="tcp") for i in range(receivers)]
+        for agent in agents:
+            mts.register_agent(agent.name, "localhost", agent.start(listen_port=0))
+        names = [agent.name for agent in agents]
+        if stuck:
+            stuck_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            stuck_socket.bind(("localhost", 0))
+            stuck_socket.listen(1)
+            mts.register_agent("stuck_agent", "localhost", stuck_socket.getsockname()[1])
+            names.append("stuck_agent")
+        sender = Agent("fanout_agent", mts_port=mts.port, transport="tcp")
+        
+        started = time.perf_counter()
+        for seq in range(messages):
+            sender.send_message(ACLMessage("inform", sender.name, names, {"seq": seq, "sent_ns": time.perf_counter_ns()}))
+        completed = recorder.done.wait(timeout=60)
+        elapsed = time.perf_counter() - started
+        depths = mts.queue_depths()
+        
+        sender.stop()
+        for agent in agents:
+            agent.stop()
+        mts.stop()
+        if stuck_socket is not None:
+            stuck_socket.close()
+    
+    return {
+        "receivers": receivers,
+        "stuck_receiver": stuck,
+        "deliveries": len(recorder.latencies),
+        "completed": completed,
+        "deliveries_per_sec": round(len(recorder.latencies) / elapsed, 1),
+        "e2e_p50_ms": round(percentile(recorder.latencies, 50), 3),
+        "e2e_p99_ms": round(percentile(recorder.latencies, 99), 3),
+        "stuck_queue_depth": depths.get("stuck_agent", 0)
+    }
+
+
+class SlowHandlerAgent(RecordingAgent):
+    def __init__(self, name: str, recorder: LatencyRecorder, handler_ms: float, **kwargs):
+        super().__init__(name, recorder, **kwargs)
+        self.handler_ms = handler_ms
+    
+    def receive_message(self, message_json: str, codec: int = JSON_CODEC_ID):
+        msg = decode_message(message_json, codec)
+        if msg.content.get("slow"):
+            time.sleep(self.handler_ms / 1000)
+        self.recorder.record(msg)
+
+
+def benchmark_mailbox(workers: int, conversations: int = 16, messages: int = 10, handler_ms: float = 20.0) -> Dict:
+    recorder = LatencyRecorder(conversations * messages + messages)
+    with quiet():
+        mts = MessageTransportService(port=0, transport="tcp")
+        mts.start()
+        receiver = SlowHandlerAgent("slow_agent", recorder, handler_ms, mts_port=mts.port, handler_workers=workers,
+                                    transport="tcp")
+        mts.register_agent(receiver.name, "localhost", receiver.start(listen_port=0))
+        sender = Agent("load_agent", mts_port=mts.port, transport="tcp")
+        
+        started = time.perf_counter()
+        for seq in range(messages):
+            for conversation in range(conversations):
+                msg = ACLMessage("request", sender.name, [receiver.name], {"slow": True, "sent_ns": time.perf_counter_ns()})
+                msg.conversation_id = f"conversation_{conversation}"
+                sender.send_message(msg)
+            ping = ACLMessage("query-if", sender.name, [receiver.name], {"slow": False, "sent_ns": time.perf_counter_ns()})
+            sender.send_message(ping)
+        completed = recorder.done.wait(timeout=120)
+        elapsed = time.perf_counter() - started
+        
+        sender.stop()
+        receiver.stop()
+        mts.stop()
+    
+    return {
+        "handler_workers": workers,
+        "conversations": conversations,
+        "handler_ms": handler_ms,
+        "completed": completed,
+        "messages_per_sec": round(len(recorder.latencies) / elapsed, 1),
+        "e2e_p50_ms": round(percentile(recorder.latencies, 50), 3),
+        "e2e_p99_ms": round(percentile(recorder.latencies, 99), 3),
+        "max_mailbox_depth": receiver.mailbox.stats["max_depth"]
+    }
+
+
+class PriorityAgent(Agent):
+    def __init__(self, name: str, recorder: LatencyRecorder, expected: int, handler_ms: float, **kwargs):
+        super().__init__(name, **kwargs)
+        self.recorder = recorder
+        self.expected = expected
+        self.handler_ms = handler_ms
+        self.handled = 0
+        self.drained = threading.Event()
+    
+    def receive_message(self, message_json: str, codec: int = JSON_CODEC_ID):
+        msg = decode_message(message_json, codec)
+        if msg.content.get("critical"):
+            self.recorder.record(msg)
+        else:
+            time.sleep(self.handler_ms / 1000)
+        self.handled += 1
+        if self.handled >= self.expected:
+            self.drained.set()
+
+
+def benchmark_priority(backlog: int, prioritized: bool, critical: int = 20, handler_ms: float = 0.5,
+                       interval_ms: float = 10.0, transport: str = "tcp") -> Dict:
+    recorder = LatencyRecorder(critical)
+    with quiet():
+        mts = MessageTransportService(port=0, transport=transport)
+        mts.start()
+        receiver = PriorityAgent("coordinator_agent", recorder, backlog + critical, handler_ms, mts_port=mts.port,
+                                 handler_workers=1, mailbox_capacity=backlog + critical, transport=transport)
+        mts.register_agent(receiver.name, "localhost", receiver.start(listen_port=0))
+        sender = Agent("searcher_agent", mts_port=mts.port, transport=transport)
+        
+        for seq in range(backlog):
+            msg = ACLMessage("inform", sender.name, [receiver.name], {"type": "position_update", "seq": seq},
+                             priority="low" if prioritized else "normal")
+            sender.send_message(msg)
+        for seq in range(critical):
+            report = ACLMessage("inform", sender.name, [receiver.name],
+                                {"type": "victim_found", "critical": True, "sent_ns": time.perf_counter_ns()},
+                                priority="critical" if prioritized else "normal")
+            sender.send_message(report)
+            time.sleep(interval_ms / 1000)
+        completed = recorder.done.wait(timeout=120)
+        drained = receiver.drained.wait(timeout=120)
+        
+        sender.stop()
+        receiver.stop()
+        mts.stop()
+    
+    return {
+        "scheduling": "priority" if prioritized else "fifo",
+        "backlog": backlog,
+        "handler_ms": handler_ms,
+        "completed": completed and drained,
+        "critical_p50_ms": round(percentile(recorder.latencies, 50), 3),
+        "critical_p99_ms": round(percentile(recorder.latencies, 99), 3),
+        "max_mailbox_depth": receiver.mailbox.stats["max_depth"],
+        "aged": receiver.mailbox.ready.stats["aged"]
+    }
+
+
+class ResponderAgent(Agent):
+    def __init__(self, name: str, action_ms: float, capabilities: List[str] = (), **kwargs):
+        super().__init__(name, **kwargs)
+        self.action_ms = action_ms
+        self.capabilities = list(capabilities)
+        self.handled = 0
+    
+    def services(self) -> List[str]:
+        return self.capabilities
+    
+    def perform_action(self, request):
+        self.handled += 1
+        time.sleep(self.action_ms / 1000)
+
+
+def benchmark_request_reply(requests: int = 200, concurrent: bool = True, action_ms: float = 10.0) -> Dict:
+    latencies = []
+    with quiet():
+        mts = MessageTransportService(port=0, transport="tcp")
+        mts.start()
+        requester = Agent("requester_agent", mts_port=mts.port, transport="tcp")
+        responder = ResponderAgent("responder_agent", action_ms, mts_port=mts.port, transport="tcp")
+        mts.register_agent(requester.name, "localhost", requester.start(listen_port=0))
+        mts.register_agent(responder.name, "localhost", responder.start(listen_port=0))
+        
+        def issue(seq):
+            msg = ACLMessage("request", requester.name, [responder.name], {"seq": seq})
+            future = requester.request(msg, timeout=60, performatives=FINAL_REPLY_PERFORMATIVES)
+            future.add_done_callback(lambda _, sent_ns=time.perf_counter_ns():
+                                     latencies.append((time.perf_counter_ns() - sent_ns) / 1e6))
+            return future
+        
+        started = time.perf_counter()
+        if concurrent:
+            futures = [issue(seq) for seq in range(requests)]
+            replies = [future.result() for future in futures]
+        else:
+            replies = [issue(seq).result() for seq in range(requests)]
+        elapsed = time.perf_counter() - started
+        
+        requester.stop()
+        responder.stop()
+        mts.stop()
+    
+    return {
+        "mode": "concurrent" if concurrent else "sequential",
+        "requests": requests,
+        "informs": sum(1 for reply in replies if reply.performative == "inform"),
+        "action_ms": action_ms,
+        "requests_per_sec": round(requests / elapsed, 1),
+        "reply_p50_ms": round(percentile(latencies, 50), 3),
+        "reply_p99_ms": round(percentile(latencies, 99), 3),
+        "pending_after": len(requester.correlations)
+    }
+
+
+class FloodedAgent(ResponderAgent):
+    def __init__(self, name: str, handler_ms: float, **kwargs):
+        super().__init__(name, 0.0, **kwargs)
+        self.handler_ms = handler_ms
+        self.informs = 0
+    
+    def handle_inform(self, msg: ACLMessage):
+        self.informs += 1
+        time.sleep(self.handler_ms / 1000)
+
+
+def benchmark_overload(policy: Optional[str], capacity: int = 256, sensors: int = 4, rate: float = 2000.0,
+                       duration: float = 3.0, handler_ms: float = 1.0, request_interval_ms: float = 20.0,
+                       transport: str = "tcp") -> Dict:
+    latencies = []
+    outcomes = {"inform": 0, "failure": 0, "refuse": 0, "timeout": 0}
+    sent = [0] * sensors
+    stop = threading.Event()
+    with quiet():
+        mts = MessageTransportService(port=0, transport=transport, outbox_capacity=capacity if policy else 1 << 30,
+                                      shed_policy=policy or "drop-oldest-inform")
+        mts.start()
+        receiver = FloodedAgent("coordinator_agent", handler_ms, mts_port=mts.port, handler_workers=1,
+                                mailbox_capacity=64, overload_policy=policy or "block", transport=transport)
+        requester = Agent("medic_agent", mts_port=mts.port, transport=transport)
+        mts.register_agent(receiver.name, "localhost", receiver.start(listen_port=0))
+        mts.register_agent(requester.name, "localhost", requester.start(listen_port=0))
+        senders = [Agent(f"sensor_{index}", mts_port=mts.port, transport=transport) for index in range(sensors)]
+        
+        def flood(index: int):
+            interval = sensors / rate
+            next_send = time.perf_counter()
+            while not stop.is_set():
+                reading = ACLMessage("inform", senders[index].name, [receiver.name],
+                                     {"type": "sensor_reading", "seq": sent[index]})
+                senders[index].send_message(reading)
+                sent[index] += 1
+                next_send += interval
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        
+        threads = [threading.Thread(target=flood, args=(index,), daemon=True) for index in range(sensors)]
+        for thread in threads:
+            thread.start()
+        futures = []
+        started = time.perf_counter()
+        while time.perf_counter() - started < duration:
+            msg = ACLMessage("request", requester.name, [receiver.name], {"action": "status_report"})
+            future = requester.request(msg, timeout=duration + 5, performatives=FINAL_REPLY_PERFORMATIVES)
+            future.add_done_callback(lambda _, sent_ns=time.perf_counter_ns():
+                                     latencies.append((time.perf_counter_ns() - sent_ns) / 1e6))
+            futures.append(future)
+            time.sleep(request_interval_ms / 1000)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        for future in futures:
+            try:
+                outcomes[future.result().performative] += 1
+            except TimeoutError:
+                outcomes["timeout"] += 1
+        overload = mts.overload_stats()
+        deadline = time.monotonic() + 30
+        while (receiver.mailbox.depth or any(mts.queue_depths().values())) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        
+        for agent in senders + [requester, receiver]:
+            agent.stop()
+        mts.stop()
+    
+    return {
+        "policy": policy or "unbounded",
+        "capacity": capacity if policy else None,
+        "informs_sent": sum(sent),
+        "informs_handled": receiver.informs,
+        "requests": len(futures),
+        "outcomes": outcomes,
+        "reply_p50_ms": round(percentile(latencies, 50), 3),
+        "reply_p99_ms": round(percentile(latencies, 99), 3),
+        "shed": overload["shed"],
+        "rejected": overload["rejected"],
+        "mts_failure_replies": overload["failure_replies"],
+        "mailbox_shed": receiver.mailbox.stats["shed"],
+        "mailbox_rejected": receiver.mailbox.stats["rejected"],
+        "paused_reads": overload["paused_reads"],
+        "paused_posts": overload["paused_posts"],
+        "stalled": overload["stalled"]
+    }
+
+
+def benchmark_capability_routing(responders: int = 4, requests: int = 200, action_ms: float = 20.0,
+                                 any_capable: bool = True) -> Dict:
+    latencies = []
+    with quiet():
+        mts = MessageTransportService(port=0)
+        mts.start()
+        requester = Agent("requester_agent", mts_port=mts.port)
+        mts.register_agent(requester.name, "localhost", requester.start(listen_port=0))
+        agents = [ResponderAgent(f"medic_{i}", action_ms, ["treat_victim"], mts_port=mts.port, handler_workers=1)
+                  for i in range(responders)]
+        for agent in agents:
+            mts.register_agent(agent.name, "localhost", agent.start(listen_port=0), agent.services())
+        receiver = "any:treat_victim" if any_capable else agents[0].name
+        
+        started = time.perf_counter()
+        futures = []
+        for seq in range(requests):
+            msg = ACLMessage("request", requester.name, [receiver], {"action": "treat_victim", "seq": seq})
+            future = requester.request(msg, timeout=120, performatives=FINAL_REPLY_PERFORMATIVES)
+            future.add_done_callback(lambda _, sent_ns=time.perf_counter_ns():
+                                     latencies.append((time.perf_counter_ns() - sent_ns) / 1e6))
+            futures.append(future)
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - started
+        
+        requester.stop()
+        for agent in agents:
+            agent.stop()
+        mts.stop()
+    
+    return {
+        "receiver": receiver,
+        "responders": responders,
+        "requests": requests,
+        "action_ms": action_ms,
+        "requests_per_sec": round(requests / elapsed, 1),
+        "reply_p50_ms": round(percentile(latencies, 50), 3),
+        "reply_p99_ms": round(percentile(latencies, 99), 3),
+        "handled_per_agent": [agent.handled for agent in agents]
+    }
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(("localhost", 0))
+        return probe.getsockname()[1]
+
+
+def benchmark_transport(transport: str, messages: int = 5000) -> Dict:
+    recorder = LatencyRecorder(messages)
+    with quiet():
+        mts = MessageTransportService(port=free_port() if transport == "unix" else 0, transport=transport)
+        mts.start()
+        receiver = RecordingAgent("receiver_agent", recorder, mts_port=mts.port, transport=transport)
+        receiver_port = receiver.start(listen_port=free_port() if transport == "unix" else 0)
+        mts.register_agent(receiver.name, "localhost", receiver_port)
+        sender = Agent("load_agent", mts_port=mts.port, transport=transport)
+        
+        started = time.perf_counter()
+        for seq in range(messages):
+            sender.send_message(ACLMessage("inform", sender.name, [receiver.name], {"seq": seq, "sent_ns": time.perf_counter_ns()}))
+        completed = recorder.done.wait(timeout=120)
+        elapsed = time.perf_counter() - started
+        
+        sender.stop()
+        receiver.stop()
+        mts.stop()
+    
+    return {
+        "transport": transport,
+        "messages": len(recorder.latencies),
+        "completed": completed,
+        "messages_per_sec": round(len(recorder.latencies) / elapsed, 1),
+        "e2e_p50_ms": round(percentile(recorder.latencies, 50), 3),
+        "e2e_p99_ms": round(percentile(recorder.latencies, 99), 3)
+    }
+
+
+def run_shard(port: int, seed_port: int, ready, stop):
+    with quiet():
+        mts = MessageTransportService(port=port, transport="tcp")
+        mts.start()
+        if seed_port:
+            mts.join("localhost", seed_port)
+        ready.set()
+        stop.wait()
+        mts.stop()
+
+
+def drive_shards(agents: List[RecordingAgent], messages: int, ring: HashRing) -> Dict:
+    recorder = LatencyRecorder(messages)
+    for agent in agents:
+        agent.recorder = recorder
+    forwarded = 0
+    started = time.perf_counter()
+    for seq in range(messages):
+        sender = agents[seq % len(agents)]
+        receiver = agents[(seq * 7 + 3) % len(agents)]
+        if ring.owner(receiver.name) != f"localhost:{sender.mts_port}":
+            forwarded += 1
+        sender.send_message(ACLMessage("inform", sender.name, [receiver.name], {"seq": seq, "sent_ns": time.perf_counter_ns()}))
+    completed = recorder.done.wait(timeout=30)
+    elapsed = time.perf_counter() - started
+    return {
+        "shards": len(ring),
+        "delivered": len(recorder.latencies),
+        "dropped": messages - len(recorder.latencies),
+        "completed": completed,
+        "forwarded_fraction": round(forwarded / messages, 3),
+        "msgs_per_sec": round(len(recorder.latencies) / elapsed, 1),
+        "e2e_p50_ms": round(percentile(recorder.latencies, 50), 3),
+        "e2e_p99_ms": round(percentile(recorder.latencies, 99), 3)
+    }
+
+
+def benchmark_sharding(shards: int = 3, agent_count: int = 24, messages: int = 2000) -> Dict:
+    context = multiprocessing.get_context("spawn")
+    ports = [free_port() for _ in range(shards)]
+    stops = [context.Event() for _ in range(shards)]
+    processes = []
+    
+    def launch(index: int):
+        ready = context.Event()
+        process = context.Process(target=run_shard, args=(ports[index], ports[0] if index else 0, ready, stops[index]),
+                                  daemon=True)
+        process.start()
+        ready.wait(timeout=30)
+        processes.append(process)
+    
+    attached = max(1, shards - 1)
+    for index in range(attached):
+        launch(index)
+    results = {"shards": shards, "agents": agent_count, "messages": messages}
+    with quiet():
+        agents = [RecordingAgent(f"agent_{i}", None, mts_port=ports[i % attached], transport="tcp")
+                  for i in range(agent_count)]
+        for agent in agents:
+            agent.start(listen_port=0)
+            agent.register()
+        time.sleep(0.5)
+        if shards > 1:
+            launch(shards - 1)
+            time.sleep(0.5)
+        results["all_shards"] = drive_shards(agents, messages, HashRing(f"localhost:{port}" for port in ports))
+        if shards > 1:
+            stops[-1].set()
+            processes[-1].join(timeout=10)
+            time.sleep(0.5)
+            results["after_leave"] = drive_shards(agents, messages,
+                                                  HashRing(f"localhost:{port}" for port in ports[:-1]))
+        for agent in agents:
+            agent.stop()
+    for stop in stops:
+        stop.set()
+    for process in processes:
+        process.join(timeout=10)
+    return results
+
+
+ROLES = ("coordinator", "searcher", "medic", "transporter")
+
+
+class LoadAgent(RescueAgent):
+    def __init__(self, name: str, role: str, histogram: LatencyHistogram, action_ms: float = 0.0, **kwargs):
+        super().__init__(name, role, **kwargs)
+        self.histogram = histogram
+        self.action_ms = action_ms
+        self.generated = 0
+        self.by_performative = {}
+    
+    def receive_message(self, message_json, codec: int = JSON_CODEC_ID):
+        received_ns = time.time_ns()
+        msg = decode_message(message_json, codec)
+        if msg.timestamp_ns is not None:
+            self.histogram.record((received_ns - msg.timestamp_ns) // 1000)
+        with self.histogram.lock:
+            self.by_performative[msg.performative] = self.by_performative.get(msg.performative, 0) + 1
+            if isinstance(msg.content, dict) and "loadgen_seq" in msg.content:
+                self.generated += 1
+        super().receive_message(msg, codec)
+    
+    def perform_action(self, request):
+        if self.action_ms:
+            time.sleep(self.action_ms / 1000)
+
+
+def generate_message(agents: List[LoadAgent], seq: int, request_fraction: float, rng: random.Random) -> tuple:
+    sender, receiver = rng.sample(agents, 2)
+    if rng.random() < request_fraction:
+        action = rng.choice(receiver.capabilities[receiver.role])
+        msg = ACLMessage("request", sender.name, [receiver.name], {"action": action, "loadgen_seq": seq})
+    else:
+        msg = ACLMessage("inform", sender.name, [receiver.name],
+                         {"type": "status_update", "status": "idle", "loadgen_seq": seq})
+    return sender, msg
+
+
+def run_open_loop(agents: List[LoadAgent], rate: float, duration: float, request_fraction: float,
+                  rng: random.Random) -> int:
+    interval_ns = int(1e9 / rate)
+    started_ns = time.time_ns()
+    total = int(rate * duration)
+    for seq in range(total):
+        intended_ns = started_ns + seq * interval_ns
+        delay = (intended_ns - time.time_ns()) / 1e9
+        if delay > 0:
+            time.sleep(delay)
+        sender, msg = generate_message(agents, seq, request_fraction, rng)
+        msg.timestamp_ns = intended_ns
+        sender.send_message(msg)
+    return total
+
+
+def run_closed_loop(agents: List[LoadAgent], concurrency: int, duration: float, request_fraction: float,
+                    seed: int) -> int:
+    deadline = time.monotonic() + duration
+    counter = iter(range(1 << 62))
+    lock = threading.Lock()
+    
+    def worker(index: int) -> int:
+        rng = random.Random(seed + index)
+        sent = 0
+        while time.monotonic() < deadline:
+            with lock:
+                seq = next(counter)
+            sender, msg = generate_message(agents, seq, request_fraction, rng)
+            if msg.performative == "request":
+                try:
+                    sender.request(msg, timeout=10, performatives=FINAL_REPLY_PERFORMATIVES).result()
+                except TimeoutError:
+                    pass
+            else:
+                sender.send_message(msg)
+            sent += 1
+        return sent
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return sum(executor.map(worker, range(concurrency)))
+
+
+def benchmark_load(agent_count: int = 8, mode: str = "open", rate: float = 1000.0, concurrency: int = 8,
+                   duration: float = 5.0, request_fraction: float = 0.3, action_ms: float = 0.0,
+                   transport: str = "auto", seed: int = 1) -> Dict:
+    histogram = LatencyHistogram()
+    rng = random.Random(seed)
+    with quiet():
+        mts = MessageTransportService(port=0, transport=transport)
+        mts.start()
+        agents = [LoadAgent(f"agent_{i}", ROLES[i % len(ROLES)], histogram, action_ms, mts_port=mts.port,
+                            transport=transport) for i in range(agent_count)]
+        for agent in agents:
+            mts.register_agent(agent.name, "localhost", agent.start(listen_port=0))
+        
+        started = time.perf_counter()
+        if mode == "open":
+            sent = run_open_loop(agents, rate, duration, request_fraction, rng)
+        else:
+            sent = run_closed_loop(agents, concurrency, duration, request_fraction, seed)
+        generated_seconds = time.perf_counter() - started
+        drain_deadline = time.monotonic() + 10
+        while sum(agent.generated for agent in agents) < sent and time.monotonic() < drain_deadline:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        
+        for agent in agents:
+            agent.stop()
+        mts.stop()
+    
+    delivered = sum(agent.generated for agent in agents)
+    by_performative = {}
+    for agent in agents:
+        for performative, count in agent.by_performative.items():
+            by_performative[performative] = by_performative.get(performative, 0) + count
+    return {
+        "mode": mode,
+        "transport": transport,
+        "agents": agent_count,
+        "target_rate": rate if mode == "open" else None,
+        "concurrency": concurrency if mode == "closed" else None,
+        "request_fraction": request_fraction,
+        "duration_s": round(generated_seconds, 3),
+        "sent": sent,
+        "delivered": delivered,
+        "dropped": sent - delivered,
+        "handler_invocations": histogram.total,
+        "throughput_msgs_per_sec": round(histogram.total / elapsed, 1),
+        "latency_ms": histogram.summary_ms(),
+        "by_performative": by_performative
+    }
+
+
+def reparse_statistics(agents: List[Agent]) -> Dict[str, int]:
+    stats = {}
+    for agent in agents:
+        for sent in agent.sent_messages:
+            msg = decode_message(sent["message"], sent.get("codec", JSON_CODEC_ID), sent.get("compression"))
+            stats[msg.performative] = stats.get(msg.performative, 0) + 1
+    return stats
+
+
+def benchmark_statistics(history: int, agent_count: int = 4) -> Dict:
+    messages = list(rescue_messages().values())
+    agents = [Agent(f"agent_{i}", log_capacity=history + 1) for i in range(agent_count)]
+    for seq in range(history):
+        agent = agents[seq % agent_count]
+        msg = messages[seq % len(messages)]
+        agent.sent_messages.append({"timestamp": datetime.now().isoformat(), "message": msg.to_json(),
+                                    "codec": JSON_CODEC_ID})
+        agent.statistics.record("sent", msg)
+    
+    started = time.perf_counter()
+    reparsed = reparse_statistics(agents)
+    reparse_ms = (time.perf_counter() - started) * 1000
+    
+    started = time.perf_counter()
+    summary = aggregate_statistics([agent.statistics.snapshot() for agent in agents])
+    snapshot_ms = (time.perf_counter() - started) * 1000
+    
+    for agent in agents:
+        agent.sent_messages.close()
+        agent.received_messages.close()
+    return {
+        "history": history,
+        "reparse_ms": round(reparse_ms, 3),
+        "snapshot_ms": round(snapshot_ms, 3),
+        "counts_match": reparsed == summary["performatives"],
+        "record_us": round(time_per_call(lambda: agents[0].statistics.record("sent", messages[0]), 20000), 3)
+    }
+
+
+def rescue_payload(size_bytes: int) -> Dict:
+    victim = {"victim_id": "V000", "location": [23, 45], "condition": "injured", "priority": "normal"}
+    victims = []
+    while len(json.dumps(victims)) < size_bytes:
+        victims.append(dict(victim, victim_id=f"V{len(victims):05d}"))
+    return {"type": "victim_batch", "sector": "sector_7", "victims": victims}
+
+
+def benchmark_envelope_routing(size_bytes: int, iterations: int = 2000) -> Dict:
+    msg = ACLMessage("inform", "searcher_agent", ["coordinator_agent", "medic_agent"], rescue_payload(size_bytes))
+    message_json = msg.to_json()
+    frame = memoryview(encode_envelope(msg.sender, msg.receivers, message_json.encode('utf-8')))[FRAME_HEADER.size:]
+    
+    started = time.perf_counter()
+    for _ in range(iterations):
+        parsed = ACLMessage.from_json(message_json)
+        for receiver in parsed.receivers:
+            encode_message(message_json)
+    decode_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    for _ in range(iterations):
+        envelope = decode_envelope(frame)
+        for receiver in envelope.receivers:
+            FRAME_HEADER.pack(len(frame))
+    envelope_seconds = time.perf_counter() - started
+    
+    return {
+        "payload_bytes": len(message_json),
+        "decode_route_us": round(decode_seconds / iterations * 1e6, 2),
+        "envelope_route_us": round(envelope_seconds / iterations * 1e6, 2)
+    }
+
+
+def rescue_messages() -> Dict[str, ACLMessage]:
+    victim_found = ACLMessage("inform", "searcher_agent", ["coordinator_agent"], {
+        "type": "victim_found", "location": [23, 45], "victim_id": "V001",
+        "condition": "conscious", "priority": "critical"
+    })
+    search_request = ACLMessage("request", "coordinator_agent", ["searcher_agent"], {
+        "action": "search_area", "area": "sector_7", "priority": "high", "grid_size": "10x10"
+    })
+    agree = ACLMessage("agree", "medic_agent", ["coordinator_agent"], {
+        "status": "accepted", "request": {"action": "treat_victim", "location": [23, 45]}
+    })
+    agree.set_reply_to(search_request.reply_with)
+    victim_batch = ACLMessage("inform", "searcher_agent", ["coordinator_agent", "medic_agent"], rescue_payload(8192))
+    inventory = ACLMessage("inform", "transporter_agent", ["coordinator_agent"], {
+        "type": "inventory_snapshot",
+        "supplies": {f"item_{i}": {"quantity": i * 3, "location": [i % 17, i % 23]} for i in range(200)}
+    })
+    return {
+        "victim_found": victim_found,
+        "search_request": search_request,
+        "agree_reply": agree,
+        "victim_batch_8k": victim_batch,
+        "inventory_snapshot": inventory
+    }
+
+
+def area_scan_payload(size_bytes: int) -> Dict:
+    cells = []
+    while len(json.dumps(cells)) < size_bytes:
+        index = len(cells)
+        cells.append({"cell": [index % 64, index // 64], "terrain": "rubble" if index % 7 else "clear",
+                      "thermal": 20 + index % 5, "searched": index % 3 == 0})
+    return {"type": "area_scan", "area": "sector_7", "cells": cells}
+
+
+def inventory_payload(size_bytes: int) -> Dict:
+    supplies = {}
+    while len(json.dumps(supplies)) < size_bytes:
+        index = len(supplies)
+        supplies[f"item_{index}"] = {"quantity": index * 3 % 40, "location": [index % 17, index % 23],
+                                     "status": "available"}
+    return {"type": "inventory_snapshot", "supplies": supplies}
+
+
+COMPRESSION_PAYLOADS = {
+    "area_scan": area_scan_payload,
+    "victim_batch": rescue_payload,
+    "inventory_snapshot": inventory_payload
+}
+
+
+def benchmark_compression(kind: str, size_bytes: int, compression: Optional[str], iterations: int = 200) -> Dict:
+    msg = ACLMessage("inform", "searcher_agent", ["coordinator_agent"], COMPRESSION_PAYLOADS[kind](size_bytes))
+    payload = msg.encode(BINARY_CODEC_ID)
+    runs = max(10, iterations * 8192 // max(8192, len(payload)))
+    compressed, flags = compress_payload(payload, compression)
+    compress_us = time_per_call(lambda: compress_payload(payload, compression), runs)
+    decompress_us = time_per_call(lambda: decompress_payload(compressed, compression if flags else None), runs)
+    return {
+        "payload": kind,
+        "compression": compression or "none",
+        "raw_bytes": len(payload),
+        "wire_bytes": len(compressed),
+        "ratio": round(len(payload) / len(compressed), 2),
+        "compress_us": round(compress_us, 1) if compression else 0.0,
+        "decompress_us": round(decompress_us, 1) if compression else 0.0,
+        "us_per_kb_saved": round((compress_us + decompress_us) / max(1, (len(payload) - len(compressed)) / 1024), 2)
+        if compression else 0.0
+    }
+
+
+def benchmark_compressed_delivery(size_bytes: int, compression: Optional[str], messages: int = 200) -> Dict:
+    recorder = LatencyRecorder(messages)
+    with quiet():
+        mts = MessageTransportService(port=0, transport="tcp")
+        mts.start()
+        receiver = RecordingAgent("coordinator_agent", recorder, mts_port=mts.port, transport="tcp")
+        mts.register_agent(receiver.name, "localhost", receiver.start(listen_port=0))
+        sender = Agent("searcher_agent", mts_port=mts.port, transport="tcp", compression=compression)
+        content = area_scan_payload(size_bytes)
+        
+        started = time.perf_counter()
+        for seq in range(messages):
+            sender.send_message(ACLMessage("inform", sender.name, [receiver.name],
+                                           dict(content, seq=seq, sent_ns=time.perf_counter_ns())))
+        completed = recorder.done.wait(timeout=120)
+        elapsed = time.perf_counter() - started
+        logged = sum(len(entry["message"]) for entry in mts.message_log)
+        
+        sender.stop()
+        receiver.stop()
+        mts.stop()
+    
+    return {
+        "compression": compression or "none",
+        "payload_bytes": size_bytes,
+        "completed": completed,
+        "messages_per_sec": round(messages / elapsed, 1),
+        "e2e_p50_ms": round(percentile(recorder.latencies, 50), 3),
+        "e2e_p99_ms": round(percentile(recorder.latencies, 99), 3),
+        "mts_log_bytes": logged
+    }
+
+
+def time_per_call(func, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def benchmark_codecs(iterations: int = 5000) -> List[Dict]:
+    results = []
+    for label, msg in rescue_messages().items():
+        for codec in ACLMessage.codecs.values():
+            encoded = msg.encode(codec.codec_id)
+            runs = max(50, iterations * 256 // max(256, len(encoded)))
+            results.append({
+                "message": label,
+                "codec": codec.name,
+                "bytes": len(encoded),
+                "encode_us": round(time_per_call(lambda: codec.encode(msg), runs), 2),
+                "decode_us": round(time_per_call(lambda: codec.decode(encoded), runs), 2)
+            })
+    return results
+
+
+class LegacyACLMessage:
+    def __init__(self, performative: str, sender: str, receivers: List[str], content=None):
+        self.performative = performative
+        self.sender = sender
+        self.receivers = receivers
+        self.content = content
+        self.conversation_id = str(uuid.uuid4())
+        self.reply_with = str(uuid.uuid4())
+        self.in_reply_to = None
+        self.language = "json"
+        self.ontology = "rescue_ontology"
+        self.protocol = "fipa-request"
+        self.timestamp = datetime.now().isoformat()
+    
+    @classmethod
+    def from_json(cls, json_str: str):
+        data = json.loads(json_str)
+        msg = cls(data["performative"], data["sender"], data["receivers"], data["content"])
+        msg.conversation_id = data["conversation_id"]
+        msg.reply_with = data["reply_with"]
+        msg.in_reply_to = data["in_reply_to"]
+        msg.language = data["language"]
+        msg.ontology = data["ontology"]
+        msg.protocol = data["protocol"]
+        msg.timestamp = data["timestamp"]
+        return msg
+
+
+def measure_allocation(factory, count: int) -> Dict:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    held = [factory(i) for i in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    
+    started = time.perf_counter()
+    for i in range(count):
+        factory(i)
+    elapsed = time.perf_counter() - started
+    return {"bytes_per_message": round((after - before) / count, 1), "us_per_message": round(elapsed / count * 1e6, 3)}
+
+
+def benchmark_message_allocation(count: int = 50000) -> List[Dict]:
+    receivers = ["coordinator_agent"]
+    content = {"type": "victim_found", "location": [23, 45], "victim_id": "V001"}
+    message_json = ACLMessage("inform", "searcher_agent", receivers, content).to_json()
+    results = []
+    for label, cls in (("legacy_dict", LegacyACLMessage), ("slots_lazy", ACLMessage)):
+        construct = measure_allocation(lambda i: cls("inform", "searcher_agent", receivers, content), count)
+        parse = measure_allocation(lambda i: cls.from_json(message_json), count)
+        results.append({
+            "implementation": label,
+            "construct_bytes": construct["bytes_per_message"],
+            "construct_us": construct["us_per_message"],
+            "from_json_bytes": parse["bytes_per_message"],
+            "from_json_us": parse["us_per_message"]
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agent platform benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    
+    pooling = subparsers.add_parser("pooling", help="pooled connections vs one socket per message")
+    pooling.add_argument("--messages", type=int, default=1000)
+    
+    batching = subparsers.add_parser("batching", help="send-side batching: throughput vs latency per batch window")
+    batching.add_argument("--windows", nargs="+", default=["1:0", "8:100", "32:500", "128:2000"],
+                          help="batch_size:linger_us pairs")
+    batching.add_argument("--bursts", type=int, default=40)
+    batching.add_argument("--burst-size", type=int, default=50)
+    
+    scaling = subparsers.add_parser("scaling", help="asyncio transport vs thread-per-connection transport")
+    scaling.add_argument("--agents", type=int, nargs="+", default=[10, 100, 1000])
+    scaling.add_argument("--messages-per-agent", type=int, default=20)
+    
+    fanout = subparsers.add_parser("fanout", help="multicast delivery with and without a stuck receiver")
+    fanout.add_argument("--receivers", type=int, default=8)
+    fanout.add_argument("--messages", type=int, default=500)
+    
+    mailbox = subparsers.add_parser("mailbox", help="slow handlers: one handler worker vs a worker pool")
+    mailbox.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    mailbox.add_argument("--conversations", type=int, default=16)
+    mailbox.add_argument("--messages", type=int, default=10)
+    mailbox.add_argument("--handler-ms", type=float, default=20.0)
+    
+    transport = subparsers.add_parser("transport", help="co-located agents over TCP, Unix sockets and in-process queues")
+    transport.add_argument("--transports", nargs="+", default=["tcp", "unix", "inproc"])
+    transport.add_argument("--messages", type=int, default=5000)
+    
+    priority = subparsers.add_parser("priority", help="critical-message latency as a low-priority backlog grows")
+    priority.add_argument("--backlogs", type=int, nargs="+", default=[100, 1000, 4000])
+    priority.add_argument("--critical", type=int, default=20)
+    priority.add_argument("--handler-ms", type=float, default=0.5)
+    priority.add_argument("--transport", choices=["auto", "inproc", "unix", "tcp"], default="tcp")
+    
+    requests = subparsers.add_parser("requests", help="request/reply futures: sequential vs concurrent requests")
+    requests.add_argument("--requests", type=int, default=200)
+    requests.add_argument("--action-ms", type=float, default=10.0)
+    
+    sharding = subparsers.add_parser("sharding", help="N MTS processes on loopback sharing a consistent-hash directory")
+    sharding.add_argument("--shards", type=int, nargs="+", default=[1, 3])
+    sharding.add_argument("--agents", type=int, default=24)
+    sharding.add_argument("--messages", type=int, default=2000)
+    
+    load = subparsers.add_parser("load", help="MTS plus N RescueAgents under an open- or closed-loop request/inform mix")
+    load.add_argument("--agents", type=int, default=8)
+    load.add_argument("--mode", choices=["open", "closed"], default="open")
+    load.add_argument("--rate", type=float, default=1000.0, help="target messages/sec (open loop)")
+    load.add_argument("--concurrency", type=int, default=8, help="outstanding requests (closed loop)")
+    load.add_argument("--duration", type=float, default=5.0)
+    load.add_argument("--request-fraction", type=float, default=0.3)
+    load.add_argument("--action-ms", type=float, default=0.0)
+    load.add_argument("--transport", choices=["auto", "inproc", "unix", "tcp"], default="auto")
+    load.add_argument("--seed", type=int, default=1)
+    
+    overload = subparsers.add_parser("overload", help="sensor flood against a slow agent: unbounded vs shed policies")
+    overload.add_argument("--capacity", type=int, default=256)
+    overload.add_argument("--sensors", type=int, default=4)
+    overload.add_argument("--rate", type=float, default=2000.0, help="aggregate sensor informs/sec")
+    overload.add_argument("--duration", type=float, default=3.0)
+    overload.add_argument("--handler-ms", type=float, default=1.0)
+    overload.add_argument("--transport", choices=["auto", "inproc", "unix", "tcp"], default="tcp")
+    
+    directory = subparsers.add_parser("directory", help="requests to one named agent vs any:capability routing")
+    directory.add_argument("--responders", type=int, default=4)
+    directory.add_argument("--requests", type=int, default=200)
+    directory.add_argument("--action-ms", type=float, default=20.0)
+    
+    statistics = subparsers.add_parser("statistics", help="re-parsing message history vs live counters")
+    statistics.add_argument("--history", type=int, nargs="+", default=[1000, 10000, 100000])
+    
+    routing = subparsers.add_parser("routing", help="MTS routing cost: full JSON decode vs envelope header")
+    routing.add_argument("--sizes", type=int, nargs="+", default=[256, 8192, 65536, 1048576])
+    
+    codecs = subparsers.add_parser("codecs", help="encode/decode cost and size per ACLMessage codec")
+    codecs.add_argument("--iterations", type=int, default=5000)
+    
+    compression = subparsers.add_parser("compression", help="CPU cost vs bytes saved per payload compression")
+    compression.add_argument("--sizes", type=int, nargs="+", default=[1024, 8192, 32768, 131072])
+    compression.add_argument("--iterations", type=int, default=200)
+    compression.add_argument("--delivery", action="store_true", help="also time delivery through the MTS over TCP")
+    
+    allocation = subparsers.add_parser("allocation", help="ACLMessage construction and from_json cost (tracemalloc)")
+    allocation.add_argument("--count", type=int, default=50000)
+    
+    args = parser.parse_args(argv)
+    
+    if args.benchmark == "pooling":
+        results = [
+            benchmark_connection_pooling(args.messages, pooled=False),
+            benchmark_connection_pooling(args.messages, pooled=True)
+        ]
+    elif args.benchmark == "batching":
+        results = []
+        for window in args.windows:
+            batch_size, linger_us = (int(value) for value in window.split(":"))
+            results.append(benchmark_send_batching(batch_size, linger_us, args.bursts, args.burst_size))
+    elif args.benchmark == "scaling":
+        results = []
+        for agent_count in args.agents:
+            for threaded in (True, False):
+                results.append(benchmark_transport_scaling(agent_count, args.messages_per_agent, threaded))
+    elif args.benchmark == "fanout":
+        results = [benchmark_multicast_fanout(args.receivers, args.messages, stuck) for stuck in (False, True)]
+    elif args.benchmark == "mailbox":
+        results = [benchmark_mailbox(workers, args.conversations, args.messages, args.handler_ms) for workers in args.workers]
+    elif args.benchmark == "transport":
+        results = [benchmark_transport(name, args.messages) for name in args.transports]
+    elif args.benchmark == "priority":
+        results = [benchmark_priority(backlog, prioritized, args.critical, args.handler_ms, transport=args.transport)
+                   for backlog in args.backlogs for prioritized in (False, True)]
+    elif args.benchmark == "requests":
+        results = [benchmark_request_reply(args.requests, concurrent, args.action_ms) for concurrent in (False, True)]
+    elif args.benchmark == "sharding":
+        results = [benchmark_sharding(shards, args.agents, args.messages) for shards in args.shards]
+    elif args.benchmark == "load":
+        results = benchmark_load(args.agents, args.mode, args.rate, args.concurrency, args.duration,
+                                 args.request_fraction, args.action_ms, args.transport, args.seed)
+    elif args.benchmark == "overload":
+        results = [benchmark_overload(policy, args.capacity, args.sensors, args.rate, args.duration, args.handler_ms,
+                                      transport=args.transport) for policy in (None, "drop-oldest-inform", "reject-new")]
+    elif args.benchmark == "directory":
+        results = [benchmark_capability_routing(args.responders, args.requests, args.action_ms, any_capable)
+                   for any_capable in (False, True)]
+    elif args.benchmark == "statistics":
+        results = [benchmark_statistics(history) for history in args.history]
+    elif args.benchmark == "routing":
+        results = [benchmark_envelope_routing(size, iterations=max(20, 2000000 // size)) for size in args.sizes]
+    elif args.benchmark == "codecs":
+        results = benchmark_codecs(args.iterations)
+    elif args.benchmark == "compression":
+        results = [benchmark_compression(kind, size, compression, args.iterations)
+                   for kind in COMPRESSION_PAYLOADS for size in args.sizes for compression in (None, "zlib", "lzma")]
+        if args.delivery:
+            results += [benchmark_compressed_delivery(size, compression)
+                        for size in args.sizes for compression in (None, "zlib", "lzma")]
+    elif args.benchmark == "allocation":
+        results = benchmark_message_allocation(args.count)
+    
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()